@@ -1,39 +1,70 @@
 #!/usr/bin/env python3
 import os
-from binance.client import Client
+import time
+import argparse
+from binance_http import ResilientClient
 from dotenv import load_dotenv
 from datetime import datetime
+from portfolio import Portfolio, PriceSnapshot
 
 def log(message):
     """Affiche un log avec timestamp."""
     print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
 
-def list_shitcoins(client):
+# Liste des grandes cryptos à exclure
+MAJOR_COINS = {"BTC", "ETH", "BNB", "USDT", "BUSD", "USDC", "TUSD", "PAX"}
+
+def list_shitcoins(client, portfolio=None):
     """
     Récupère les actifs de votre compte Binance et retourne une liste
     des crypto-monnaies considérées comme 'shitcoins' (c'est-à-dire
     excluant les grandes cryptos majeures).
+
+    Avec un `portfolio` alimenté par le flux utilisateur, la lecture est
+    locale : get_account() n'est appelé qu'en cas de trou dans le flux.
     """
-    # Récupération des informations du compte
-    account_info = client.get_account()
-    balances = account_info.get("balances", [])
-    
-    # Liste des grandes cryptos à exclure
-    major_coins = {"BTC", "ETH", "BNB", "USDT", "BUSD", "USDC", "TUSD", "PAX"}
+    if portfolio is None:
+        portfolio = Portfolio(client)
+    portfolio.ensure_fresh()
     
     shitcoins = []
-    for asset in balances:
-        asset_name = asset["asset"]
-        free = float(asset["free"])
-        locked = float(asset["locked"])
+    for asset_name, (free, locked) in portfolio.balances.items():
         total = free + locked
         # Considérer uniquement les actifs avec un solde non nul et hors major coins
-        if total > 0 and asset_name not in major_coins:
+        if total > 0 and asset_name not in MAJOR_COINS:
             shitcoins.append((asset_name, total))
     
     return shitcoins
 
-def main():
+def value_shitcoins(client, portfolio):
+    """
+    Valorise les 'shitcoins' en USDT à partir d'un seul instantané de prix.
+
+    :return: (liste de (actif, quantité, prix, valeur) par valeur décroissante, valeur totale)
+    """
+    portfolio.ensure_fresh()
+    snapshot = PriceSnapshot(client.get_all_tickers())
+    rows, _ = portfolio.valuation(snapshot)
+    rows = [row for row in rows if row[0] not in MAJOR_COINS]
+    total = sum(value for _, _, _, value in rows if value == value)  # NaN exclus
+    return rows, total
+
+def print_shitcoins(shitcoins, total):
+    if shitcoins:
+        log("Voici la liste des crypto 'shitcoins' que vous possédez :")
+        for coin, amount, price, value in shitcoins:
+            valued = f"{value:.2f} USDT" if value == value else "non coté"
+            print(f" - {coin}: {amount} ({valued})")
+        log(f"Valeur totale : {total:.2f} USDT")
+    else:
+        log("Aucun actif considéré comme 'shitcoin' n'a été trouvé dans votre compte.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Liste et valorise les 'shitcoins' du compte Binance")
+    parser.add_argument("--watch", type=float, metavar="SECONDES",
+                        help="Suivre le flux utilisateur et réafficher la liste à cet intervalle")
+    args = parser.parse_args(argv)
+
     # Chargement des variables d'environnement
     load_dotenv("creds.env")
     BINANCE_API_KEY = os.environ.get("BINANCE_API_KEY")
@@ -42,17 +73,25 @@ def main():
         raise Exception("Merci de définir BINANCE_API_KEY et BINANCE_API_SECRET dans creds.env")
     
     # Initialisation du client Binance (testnet peut être désactivé si besoin)
-    client = Client(BINANCE_API_KEY, BINANCE_API_SECRET, testnet=True)
+    client = ResilientClient(BINANCE_API_KEY, BINANCE_API_SECRET, testnet=True)
     
     log("Récupération des actifs de votre compte...")
-    shitcoins = list_shitcoins(client)
-    
-    if shitcoins:
-        log("Voici la liste des crypto 'shitcoins' que vous possédez :")
-        for coin, amount in shitcoins:
-            print(f" - {coin}: {amount}")
-    else:
-        log("Aucun actif considéré comme 'shitcoin' n'a été trouvé dans votre compte.")
+    portfolio = Portfolio(client)
+    if args.watch:
+        # Soldes entretenus par le flux : get_account() seulement au démarrage et sur un trou
+        portfolio.start_stream(BINANCE_API_KEY, BINANCE_API_SECRET, testnet=True)
+        log("Flux utilisateur démarré (Ctrl+C pour arrêter)")
+    try:
+        while True:
+            print_shitcoins(*value_shitcoins(client, portfolio))
+            if not args.watch:
+                break
+            log(f"Resynchronisations REST : {portfolio.resyncs}")
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        portfolio.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Banc de mesure de bout en bout contre des serveurs Binance et Ollama locaux.
+
+Pilote TradingCrew.execute_trade_task (main.py), run_trading
+(crewai_binance_trader.py) et historic.main, et rapporte pour chaque étape
+les percentiles de latence, le débit et le pic mémoire. Les résultats sont
+enregistrés en JSON pour comparer deux commits.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import functools
+import tempfile
+import tracemalloc
+import subprocess
+import contextlib
+from collections import defaultdict
+
+import numpy as np
+
+from mock_servers import binance_server, ollama_server
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class Recorder:
+    """ Collecte les durées par étape en enveloppant des fonctions existantes. """
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._patches = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - start)
+
+    def wrap(self, owner, attr, name):
+        original = getattr(owner, attr)
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            with self.stage(name):
+                return original(*args, **kwargs)
+
+        setattr(owner, attr, timed)
+        self._patches.append((owner, attr, original))
+
+    def restore(self):
+        for owner, attr, original in reversed(self._patches):
+            setattr(owner, attr, original)
+        self._patches = []
+
+    def summary(self):
+        stats = {}
+        for name, values in self.samples.items():
+            ms = np.array(values) * 1000
+            stats[name] = {
+                "count": len(ms),
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "p99_ms": float(np.percentile(ms, 99)),
+                "max_ms": float(ms.max()),
+            }
+        return stats
+
+
+def _patch_client_stages(recorder):
+    from binance.client import Client
+
+    for method in ("get_exchange_info", "get_ticker", "get_symbol_ticker", "get_klines",
+                   "create_order", "get_my_trades", "get_account"):
+        recorder.wrap(Client, method, f"binance.{method}")
+
+
+def scenario_main(recorder):
+    """ TradingCrew complet : symboles, données de marché, prompt, LLM, validation, ordre. """
+    import main
+    from llm_cache import LLMDecisionCache
+
+    main.llm_cache = LLMDecisionCache(ttl=0)  # Chaque itération paie l'inférence
+    recorder.wrap(main, "get_usdt_tickers", "symbols")
+    recorder.wrap(main, "get_market_data", "market_data")
+    recorder.wrap(main.TradingCrew, "build_selection_prompt", "prompt_build")
+    recorder.wrap(main, "stream_decision", "llm_call")
+    _patch_client_stages(recorder)
+
+    def run():
+        crew = main.TradingCrew()
+        crew.execute_trade_task()
+    return run
+
+
+def scenario_run_trading(recorder):
+    """ Balayage complet de l'univers USDT : klines, indicateurs, validation IA par lots. """
+    import crewai_binance_trader as trader
+    from crewai import Crew
+    from llm_cache import LLMDecisionCache
+
+    trader.llm_cache = LLMDecisionCache(ttl=0)
+    recorder.wrap(trader, "get_all_usdt_pairs", "symbols")
+    recorder.wrap(trader, "fetch_all_crypto_data", "klines")
+    recorder.wrap(trader, "summarize_cryptos", "indicators")
+    recorder.wrap(trader, "ai_manager_batch", "llm_batch")
+    recorder.wrap(Crew, "kickoff", "crew_kickoff")
+    _patch_client_stages(recorder)
+    return trader.run_trading
+
+
+def scenario_historic(recorder):
+    """ Synchronisation de l'historique des transactions et requête locale. """
+    import historic
+    from trade_sync import TradeSync
+
+    recorder.wrap(TradeSync, "held_symbols", "held_symbols")
+    recorder.wrap(TradeSync, "sync", "sync")
+    recorder.wrap(historic, "list_trade_history_last_hour", "local_query")
+    _patch_client_stages(recorder)
+    return historic.main
+
+
+SCENARIOS = {"main": scenario_main, "run_trading": scenario_run_trading, "historic": scenario_historic}
+
+
+def configure_environment(binance_url, ollama_url, workdir):
+    """ Redirige les clients vers les serveurs locaux et isole les caches dans `workdir`. """
+    os.environ.update({
+        "BINANCE_API_KEY": "bench", "BINANCE_API_SECRET": "bench", "BINANCE_SECRET_KEY": "bench",
+        "BINANCE_API_URL": binance_url, "OLLAMA_URL": ollama_url,
+        "TELEGRAM_BOT_TOKEN": "", "TELEGRAM_CHAT_ID": "",
+    })
+    from binance.client import Client
+
+    Client.API_URL = f"{binance_url}/api"
+    Client.API_TESTNET_URL = f"{binance_url}/api"
+    shutil.copytree(os.path.join(ROOT, "config"), os.path.join(workdir, "config"))
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    import order_path
+
+    # Pas de flux websocket simulé : les cotations passent par le repli REST du serveur local
+    order_path.BookTickerCache.start_stream = lambda self, symbols, *args, **kwargs: None
+
+
+def run_scenario(name, iterations, quiet=True):
+    recorder = Recorder()
+    run = SCENARIOS[name](recorder)
+    output = io.StringIO() if quiet else None
+    with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+        run()  # Échauffement : imports, cache exchangeInfo, connexions
+        recorder.samples.clear()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            with recorder.stage("total"):
+                run()
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    recorder.restore()
+    return {
+        "iterations": iterations,
+        "throughput_per_s": iterations / elapsed if elapsed else 0.0,
+        "peak_memory_mb": peak / 2 ** 20,
+        "stages": recorder.summary(),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    """ Affiche l'évolution du p50 de chaque étape par rapport à un résultat précédent. """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    for name, result in current["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name, {}).get("stages", {})
+        for stage, stats in result["stages"].items():
+            if stage in previous and previous[stage]["p50_ms"]:
+                delta = (stats["p50_ms"] / previous[stage]["p50_ms"] - 1) * 100
+                print(f"{name:12} {stage:28} p50 {previous[stage]['p50_ms']:9.2f} → {stats['p50_ms']:9.2f} ms ({delta:+.1f} %)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de mesure avec serveurs Binance/Ollama simulés")
+    parser.add_argument("scenarios", nargs="*", help=f"Scénarios parmi {', '.join(SCENARIOS)} (tous par défaut)")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--symbols", type=int, default=400, help="Nombre de symboles simulés")
+    parser.add_argument("--binance-latency", type=float, default=0.005, help="Latence Binance simulée (s)")
+    parser.add_argument("--ollama-latency", type=float, default=0.2, help="Latence Ollama simulée (s)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Délai entre tokens en streaming (s)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Résultat JSON précédent à comparer")
+    parser.add_argument("--verbose", action="store_true", help="Afficher la sortie des scripts")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"scénario(s) inconnu(s) : {', '.join(sorted(unknown))}")
+    args.scenarios = args.scenarios or list(SCENARIOS)
+
+    output_path = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    with binance_server(args.binance_latency, args.symbols) as binance, \
+            ollama_server(args.ollama_latency, args.token_delay) as ollama_mock:
+        configure_environment(binance.url, ollama_mock.url, workdir)
+        results = {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": vars(args),
+            "scenarios": {},
+        }
+        for name in args.scenarios:
+            print(f"⏱️  Scénario {name}...")
+            result = run_scenario(name, args.iterations, quiet=not args.verbose)
+            results["scenarios"][name] = result
+            print(f"   {result['throughput_per_s']:.2f} exécution(s)/s, pic mémoire {result['peak_memory_mb']:.1f} Mo")
+            for stage, stats in sorted(result["stages"].items()):
+                print(f"   {stage:28} p50 {stats['p50_ms']:9.2f} ms  p95 {stats['p95_ms']:9.2f} ms  "
+                      f"p99 {stats['p99_ms']:9.2f} ms  (n={stats['count']})")
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Résultats enregistrés dans {output_path}")
+    if baseline_path:
+        compare(results, baseline_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Couche HTTP commune aux scripts pour l'API Binance.
+
+ResilientClient est un binance.client.Client qui, pour chaque requête :
+- réserve son poids dans un budget partagé avant l'envoi (limitation
+  proactive, avant d'atteindre la limite) et se recale sur l'en-tête
+  X-MBX-USED-WEIGHT-1M de la réponse ;
+- réutilise un pool de connexions keep-alive ;
+- réessaie avec un délai exponentiel aléatoire sur 5xx et erreurs réseau,
+  respecte Retry-After sur 429/418 ;
+- resynchronise le décalage d'horloge avec le serveur sur l'erreur -1021.
+
+Les requêtes d'ordre (POST/DELETE) ne sont réessayées que si Binance les a
+refusées avant traitement (429/418, -1021) : une erreur 5xx ou un délai
+dépassé laisse l'état de l'ordre inconnu et un nouvel envoi le dupliquerait.
+"""
+import time
+import random
+import threading
+from urllib.parse import urlparse
+
+import requests
+from binance.client import Client
+from binance.exceptions import BinanceAPIException
+
+import instrumentation
+from kline_fetcher import WeightBudget, DEFAULT_WEIGHT_LIMIT
+
+DEFAULT_ORDER_LIMIT = 100  # Ordres par fenêtre de 10 s
+DEFAULT_RETRIES = 4
+TIMESTAMP_ERROR = -1021  # Horodatage hors de recvWindow
+
+# Poids des points d'accès utilisés par les scripts : (avec symbole, sans symbole)
+ENDPOINT_WEIGHTS = {
+    "/api/v3/klines": (2, 2),
+    "/api/v3/ticker/24hr": (2, 80),
+    "/api/v3/ticker/price": (2, 4),
+    "/api/v3/ticker/bookTicker": (2, 4),
+    "/api/v3/exchangeInfo": (20, 20),
+    "/api/v3/account": (20, 20),
+    "/api/v3/myTrades": (20, 20),
+    "/api/v3/allOrders": (20, 20),
+    "/api/v3/openOrders": (6, 80),
+    "/api/v3/depth": (5, 5),
+    "/api/v3/order": (2, 2),
+    "/api/v3/ping": (1, 1),
+    "/api/v3/time": (1, 1),
+}
+DEFAULT_WEIGHT = 2
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_budgets():
+    """ (budget de poids, budget d'ordres) communs à tous les clients du processus. """
+    with _shared_lock:
+        if not _shared:
+            _shared["weight"] = WeightBudget(DEFAULT_WEIGHT_LIMIT, 60.0)
+            _shared["order"] = WeightBudget(DEFAULT_ORDER_LIMIT, 10.0, safety=1.0)
+        return _shared["weight"], _shared["order"]
+
+
+def use_budgets(weight_budget, order_budget, *clients):
+    """
+    Remplace les budgets communs du processus, par exemple par les SharedBudget d'un ShardPool.
+
+    :param clients: Clients déjà créés, basculés eux aussi sur ces budgets
+    """
+    with _shared_lock:
+        _shared["weight"], _shared["order"] = weight_budget, order_budget
+    for client in clients:
+        client.budget, client.order_budget = weight_budget, order_budget
+
+
+def request_weight(method, uri, data=None):
+    """ Poids estimé d'une requête, d'après son chemin et la présence d'un symbole. """
+    with_symbol, without_symbol = ENDPOINT_WEIGHTS.get(urlparse(uri).path, (DEFAULT_WEIGHT, DEFAULT_WEIGHT))
+    return with_symbol if data and (data.get("symbol") or data.get("symbols")) else without_symbol
+
+
+def is_order_request(method, uri):
+    return method in ("post", "delete") and urlparse(uri).path.endswith("/order")
+
+
+class ResilientClient(Client):
+    """
+    Client Binance limité en débit, avec reprises et synchronisation d'horloge.
+
+    :param budget: Budget de poids (WeightBudget ou SharedBudget) ; par défaut celui du processus
+    :param order_budget: Budget d'ordres par 10 s ; par défaut celui du processus
+    :param retries: Nombre de nouvelles tentatives après un échec transitoire
+    :param pool_size: Connexions keep-alive conservées par hôte
+    :param sync_time: Calcule le décalage d'horloge avec le serveur dès la création
+    Les autres arguments sont ceux de binance.client.Client.
+    """
+
+    def __init__(self, *args, budget=None, order_budget=None, retries=DEFAULT_RETRIES, pool_size=32,
+                 sync_time=True, **kwargs):
+        # Avant super().__init__ : le constructeur crée la session et appelle ping()
+        weight_budget, shared_order_budget = shared_budgets()
+        self.budget = budget or weight_budget
+        self.order_budget = order_budget or shared_order_budget
+        self.retries = retries
+        self.pool_size = pool_size
+        super().__init__(*args, **kwargs)
+        if sync_time:
+            self.sync_time()
+
+    def _init_session(self):
+        session = super()._init_session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def sync_time(self):
+        """ Aligne timestamp_offset sur l'horloge du serveur (milieu de l'aller-retour). """
+        before = time.time() * 1000
+        server_time = self.get_server_time()["serverTime"]
+        after = time.time() * 1000
+        self.timestamp_offset = int(server_time - (before + after) / 2)
+        instrumentation.metrics.set_gauge("binance_timestamp_offset_ms", self.timestamp_offset)
+        return self.timestamp_offset
+
+    def _observe(self, response):
+        headers = response.headers
+        instrumentation.metrics.observe_binance_headers(headers, response.status_code)
+        used = headers.get("X-MBX-USED-WEIGHT-1M")
+        if used is not None:
+            self.budget.sync(int(used))
+        orders = headers.get("X-MBX-ORDER-COUNT-10S")
+        if orders is not None:
+            self.order_budget.sync(int(orders))
+
+    def _backoff(self, attempt, reason):
+        instrumentation.incr("binance_retries_total", reason=reason)
+        time.sleep(min(2 ** attempt, 10) * (0.5 + random.random() / 2))
+
+    def _request(self, method, uri, signed, force_params=False, **kwargs):
+        weight = request_weight(method, uri, kwargs.get("data"))
+        is_order = is_order_request(method, uri)
+        attempt = 0
+        while True:
+            self.budget.acquire(weight)
+            if is_order:
+                self.order_budget.acquire(1)
+            # python-binance modifie `data` (timestamp, signature) : copie neuve à chaque tentative
+            attempt_kwargs = {k: dict(v) if isinstance(v, dict) else v for k, v in kwargs.items()}
+            try:
+                result = super()._request(method, uri, signed, force_params, **attempt_kwargs)
+                self._observe(self.response)
+                return result
+            except BinanceAPIException as e:
+                self._observe(self.response)
+                if attempt >= self.retries:
+                    raise
+                if e.status_code in (418, 429):
+                    # 429 : limite atteinte, 418 : IP bannie ; requête refusée, donc sans effet
+                    self.budget.pause(float(e.response.headers.get("Retry-After", 60)))
+                    instrumentation.incr("binance_retries_total", reason=str(e.status_code))
+                elif e.code == TIMESTAMP_ERROR:
+                    self.sync_time()
+                    instrumentation.incr("binance_retries_total", reason="timestamp")
+                elif e.status_code >= 500 and not is_order:
+                    self._backoff(attempt, "5xx")
+                else:
+                    raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if is_order or attempt >= self.retries:
+                    raise
+                self._backoff(attempt, "network")
+            attempt += 1
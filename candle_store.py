@@ -0,0 +1,248 @@
+"""
+Stockage en colonnes des bougies, en anneau, projeté en mémoire (memmap).
+
+Chaque colonne (open_time int64, open/high/low/close/volume float64) est un
+fichier de forme (max_symbols, capacity) : les bougies d'un symbole sont
+contiguës et un petit index JSON associe chaque symbole à sa ligne. Un seul
+processus écrit (REST ou flux websocket), les autres processus et le
+backtest lisent les mêmes pages sans copie. Les fichiers sont creux : seules
+les lignes utilisées occupent de la place.
+"""
+import os
+import json
+import threading
+
+import numpy as np
+
+COLUMNS = (("open_time", np.int64), ("open", np.float64), ("high", np.float64),
+           ("low", np.float64), ("close", np.float64), ("volume", np.float64))
+DEFAULT_CAPACITY = 1000
+DEFAULT_MAX_SYMBOLS = 2048
+INTERVAL_MS = {
+    "1m": 60000, "3m": 180000, "5m": 300000, "15m": 900000, "30m": 1800000, "1h": 3600000,
+    "2h": 7200000, "4h": 14400000, "6h": 21600000, "12h": 43200000, "1d": 86400000,
+}
+
+
+def klines_to_columns(klines):
+    """ Klines REST brutes (listes de chaînes) -> colonnes NumPy. """
+    rows = np.asarray([k[:6] for k in klines], dtype=object)
+    if not len(rows):
+        return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+    return {name: rows[:, i].astype(dtype) for i, (name, dtype) in enumerate(COLUMNS)}
+
+
+def merge_columns(stored, fresh, n):
+    """
+    Les `n` dernières bougies de `stored` complétées par `fresh`, sans écrire dans le stockage.
+
+    Les bougies de `fresh` remplacent celles de `stored` à partir de leur
+    premier open_time (la bougie en cours est toujours redemandée).
+    :param stored: Colonnes lues par CandleStore.window, ou None
+    :param fresh: Colonnes de klines_to_columns
+    """
+    if stored is None or not len(stored["open_time"]):
+        return {name: column[-n:] for name, column in fresh.items()}
+    if not len(fresh["open_time"]):
+        return {name: column[-n:] for name, column in stored.items()}
+    keep = int(np.searchsorted(stored["open_time"], fresh["open_time"][0], side="left"))
+    return {name: np.concatenate([stored[name][:keep], fresh[name]])[-n:] for name, _ in COLUMNS}
+
+
+class CandleStore:
+    """
+    Anneau de bougies par symbole, partagé entre processus.
+
+    :param path: Dossier du stockage (créé si absent)
+    :param interval: Intervalle des bougies, vérifié à la réouverture (None : celui du stockage)
+    :param capacity: Bougies conservées par symbole
+    :param max_symbols: Nombre maximum de symboles
+    :param readonly: Ouverture en lecture seule (processus lecteurs)
+    """
+
+    def __init__(self, path, interval="1h", capacity=DEFAULT_CAPACITY, max_symbols=DEFAULT_MAX_SYMBOLS, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        index_path = os.path.join(path, "index.json")
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                header = json.load(f)
+            if interval is not None and header["interval"] != interval:
+                raise ValueError(f"Stockage {path} en {header['interval']}, pas en {interval}")
+        elif readonly or interval is None:
+            raise FileNotFoundError(f"Aucun stockage de bougies dans {path}")
+        else:
+            os.makedirs(path, exist_ok=True)
+            header = {"interval": interval, "capacity": capacity, "max_symbols": max_symbols, "symbols": []}
+            self._write_index(header)
+        self.interval = header["interval"]
+        self.capacity = header["capacity"]
+        self.max_symbols = header["max_symbols"]
+        self.symbols = header["symbols"]
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._index_mtime = os.path.getmtime(index_path)
+
+        mode = "r" if readonly else ("r+" if self.symbols or os.path.exists(self._file("meta")) else "w+")
+        shape = (self.max_symbols, self.capacity)
+        self.columns = {name: np.memmap(self._file(name), dtype=dtype, mode=mode, shape=shape) for name, dtype in COLUMNS}
+        # meta[slot] = [nombre total de bougies écrites, open_time de la dernière]
+        self.meta = np.memmap(self._file("meta"), dtype=np.int64, mode=mode, shape=(self.max_symbols, 2))
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _write_index(self, header):
+        tmp_path = os.path.join(self.path, "index.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(header, f, separators=(",", ":"))
+        os.replace(tmp_path, os.path.join(self.path, "index.json"))
+
+    def _reload_index(self):
+        """ Relit l'index si un autre processus y a ajouté des symboles. """
+        index_path = os.path.join(self.path, "index.json")
+        mtime = os.path.getmtime(index_path)
+        if mtime != self._index_mtime:
+            with open(index_path, "r", encoding="utf-8") as f:
+                self.symbols = json.load(f)["symbols"]
+            self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+            self._index_mtime = mtime
+
+    def slot(self, symbol, create=False):
+        """ Ligne du symbole, créée à la demande par l'écrivain ; None si inconnu. """
+        slot = self.index.get(symbol)
+        if slot is None and not create:
+            self._reload_index()
+            return self.index.get(symbol)
+        if slot is None:
+            if len(self.symbols) >= self.max_symbols:
+                raise ValueError(f"Stockage plein ({self.max_symbols} symboles)")
+            slot = len(self.symbols)
+            self.meta[slot] = (0, 0)
+            self.symbols.append(symbol)
+            self.index[symbol] = slot
+            self._write_index({"interval": self.interval, "capacity": self.capacity,
+                               "max_symbols": self.max_symbols, "symbols": self.symbols})
+            self._index_mtime = os.path.getmtime(os.path.join(self.path, "index.json"))
+        return slot
+
+    def __contains__(self, symbol):
+        return self.slot(symbol) is not None
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def count(self, symbol):
+        """ Nombre de bougies disponibles (au plus `capacity`). """
+        slot = self.slot(symbol)
+        return 0 if slot is None else int(min(self.meta[slot, 0], self.capacity))
+
+    def last_open_time(self, symbol):
+        slot = self.slot(symbol)
+        return None if slot is None or not self.meta[slot, 0] else int(self.meta[slot, 1])
+
+    def extend(self, symbol, open_time, open, high, low, close, volume):
+        """
+        Ajoute des bougies triées par open_time.
+
+        Une bougie de même open_time que la dernière la remplace (bougie en
+        cours), les plus anciennes sont ignorées.
+        :return: Nombre de nouvelles bougies
+        """
+        if self.readonly:
+            raise PermissionError("Stockage ouvert en lecture seule")
+        open_time = np.asarray(open_time, dtype=np.int64)
+        values = [np.asarray(v, dtype=np.float64) for v in (open, high, low, close, volume)]
+        with self._lock:
+            slot = self.slot(symbol, create=True)
+            total, last = (int(v) for v in self.meta[slot])
+            if total:
+                if len(open_time) and open_time[0] <= last:
+                    same = open_time == last
+                    if same.any():
+                        # Mise à jour de la bougie en cours, à sa position dans l'anneau
+                        j = int(np.flatnonzero(same)[-1])
+                        pos = (total - 1) % self.capacity
+                        for (name, _), column in zip(COLUMNS[1:], values):
+                            self.columns[name][slot, pos] = column[j]
+                keep = open_time > last
+                open_time = open_time[keep]
+                values = [v[keep] for v in values]
+            n = len(open_time)
+            if not n:
+                return 0
+            if n > self.capacity:
+                open_time = open_time[-self.capacity:]
+                values = [v[-self.capacity:] for v in values]
+                total += n - self.capacity
+                n = self.capacity
+            positions = (total + np.arange(n)) % self.capacity
+            self.columns["open_time"][slot, positions] = open_time
+            for (name, _), column in zip(COLUMNS[1:], values):
+                self.columns[name][slot, positions] = column
+            # Métadonnées écrites en dernier : un lecteur ne voit jamais une bougie à moitié écrite
+            self.meta[slot] = (total + n, open_time[-1])
+            return n
+
+    def extend_klines(self, symbol, klines):
+        """ Ajoute des klines REST brutes (réponse de get_klines). """
+        columns = klines_to_columns(klines)
+        return self.extend(symbol, *(columns[name] for name, _ in COLUMNS))
+
+    def on_message(self, message):
+        """ Ajoute la bougie d'un événement kline du flux websocket (simple ou multiplexé). """
+        data = message.get("data", message)
+        if data.get("e") != "kline":
+            return
+        k = data["k"]
+        self.extend(data["s"], [int(k["t"])], [float(k["o"])], [float(k["h"])], [float(k["l"])],
+                    [float(k["c"])], [float(k["v"])])
+
+    def window(self, symbol, n=None):
+        """
+        Les `n` dernières bougies (toutes par défaut) par ordre chronologique.
+
+        :return: Dictionnaire {colonne: tableau} ; vues sans copie quand l'anneau n'est pas replié
+        """
+        slot = self.slot(symbol)
+        if slot is None:
+            return None
+        total = int(self.meta[slot, 0])
+        available = min(total, self.capacity)
+        n = available if n is None else min(n, available)
+        start = (total - n) % self.capacity
+        if start + n <= self.capacity:
+            return {name: column[slot, start:start + n] for name, column in self.columns.items()}
+        order = np.arange(start, start + n) % self.capacity
+        return {name: column[slot, order] for name, column in self.columns.items()}
+
+    def missing(self, symbols, limit, now_ms):
+        """
+        Nombre de bougies à redemander pour compléter les `limit` dernières de chaque symbole.
+
+        Compte la bougie en cours (toujours rafraîchie) ; vaut `limit` dès
+        qu'un symbole est absent ou trop court.
+        """
+        step = INTERVAL_MS[self.interval]
+        needed = 1
+        for symbol in symbols:
+            last = self.last_open_time(symbol)
+            if last is None or self.count(symbol) < limit:
+                return limit
+            needed = max(needed, (now_ms // step * step - last) // step + 1)
+        return int(min(needed, limit))
+
+    def range(self, symbol, start_time=None, end_time=None):
+        """ Bougies dont open_time est dans [start_time, end_time). """
+        window = self.window(symbol)
+        if window is None:
+            return None
+        times = window["open_time"]
+        lo = 0 if start_time is None else int(np.searchsorted(times, start_time, side="left"))
+        hi = len(times) if end_time is None else int(np.searchsorted(times, end_time, side="left"))
+        return {name: column[lo:hi] for name, column in window.items()}
+
+    def flush(self):
+        for column in self.columns.values():
+            column.flush()
+        self.meta.flush()
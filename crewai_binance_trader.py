@@ -1,11 +1,25 @@
 import os
+import time
+import functools
 import pandas as pd
-import requests
 from dotenv import load_dotenv
-from binance.client import Client
+from binance_http import ResilientClient, use_budgets
 from crewai import Crew, Agent, Task, Process
 from binance.enums import ORDER_TYPE_MARKET, SIDE_BUY, SIDE_SELL
 from langchain_ollama import OllamaLLM  # Utilisation correcte d'Ollama
+from kline_fetcher import KlineFetcher
+from symbol_registry import SymbolRegistry
+from llm_cache import LLMDecisionCache
+from telegram_dispatcher import TelegramDispatcher
+from decisions import build_batch_prompt, normalize_decision, parse_batch_decisions, BATCH_PROMPT
+import indicators
+from tiered import TieredEvaluator
+from kline_stream import IndicatorBook, start_kline_stream
+from candle_store import CandleStore, klines_to_columns
+from sharding import ShardPool
+from llm_stream import stream_decision, decision_matcher, json_object_matcher
+import instrumentation
+from instrumentation import span
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -13,56 +27,132 @@ API_KEY = os.getenv("BINANCE_API_KEY")
 API_SECRET = os.getenv("BINANCE_SECRET_KEY")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TRADER_PROCESSES = int(os.getenv("TRADER_PROCESSES", "1"))  # > 1 : analyse répartie sur plusieurs processus
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+LLM_CALL_BUDGET = int(os.getenv("LLM_CALL_BUDGET", "5"))  # Appels LLM (lots de 10 symboles) par cycle
+LLM_MIN_CONFIDENCE = float(os.getenv("LLM_MIN_CONFIDENCE", "1.0"))  # En dessous, le signal est soumis au LLM
 
-# Initialiser le client Binance
-client = Client(API_KEY, API_SECRET)
+OLLAMA_MODEL = "deepseek-r1:14b"  # Assure-toi que c'est bien le modèle disponible
+# Stockage memmap des bougies (optionnel, CANDLE_STORE=dossier) : les cycles suivants ne redemandent que les bougies manquantes
+CANDLE_STORE = os.getenv("CANDLE_STORE")
 
-# 🔥 Initialiser Ollama sans LiteLLM
-ollama_llm = OllamaLLM(
-    model="deepseek-r1:14b",  # Assure-toi que c'est bien le modèle disponible
-    base_url="http://localhost:11434"
-)
+# Cache des décisions LLM (clé : modèle + prompt + instantané quantifié)
+llm_cache = LLMDecisionCache(ttl=300)
+
+# ⏳ Initialisation paresseuse : rien n'est contacté ni démarré à l'import (démon, banc, processus d'analyse)
+@functools.lru_cache(maxsize=None)
+def get_client():
+    """Client Binance (budget de poids, reprises et décalage d'horloge gérés par binance_http)."""
+    return ResilientClient(API_KEY, API_SECRET)
+
+@functools.lru_cache(maxsize=None)
+def get_registry():
+    """Registre des symboles (exchangeInfo mis en cache sur disque)."""
+    return SymbolRegistry(get_client())
+
+@functools.lru_cache(maxsize=None)
+def get_kline_fetcher():
+    """Récupération concurrente des klines, sur le même budget de poids que le client."""
+    return KlineFetcher(budget=get_client().budget)
+
+@functools.lru_cache(maxsize=None)
+def get_ollama_llm():
+    """🔥 Ollama sans LiteLLM, pour les agents CrewAI."""
+    return OllamaLLM(model=OLLAMA_MODEL, base_url=OLLAMA_URL)
+
+@functools.lru_cache(maxsize=None)
+def get_candle_store():
+    """Stockage des bougies si CANDLE_STORE est défini, sinon None."""
+    return CandleStore(CANDLE_STORE, interval=os.getenv("CANDLE_INTERVAL", "1h")) if CANDLE_STORE else None
+
+@functools.lru_cache(maxsize=None)
+def get_telegram():
+    """File d'envoi Telegram en arrière-plan, jamais bloquante."""
+    return TelegramDispatcher(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
 
 # ✅ Fonction d'envoi d'alerte Telegram
 def send_telegram_alert(message):
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    data = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-    requests.post(url, data=data)
+    get_telegram().send(message)
+
+def stop_telegram():
+    """Vide et arrête la file Telegram, si elle a été créée."""
+    if get_telegram.cache_info().currsize:
+        get_telegram().stop()
 
 # ✅ Récupérer toutes les paires de trading USDT
 def get_all_usdt_pairs():
-    exchange_info = client.get_exchange_info()
-    usdt_pairs = [s['symbol'] for s in exchange_info['symbols'] if s['quoteAsset'] == 'USDT' and s['status'] == 'TRADING']
-    return usdt_pairs
+    return get_registry().symbols(quote_asset='USDT', status='TRADING')
+
+# ✅ Fonction pour récupérer les prix (colonnes numériques uniquement, sans DataFrame de chaînes)
+def columns_to_frame(columns):
+    return pd.DataFrame({'time': columns['open_time'], 'high': columns['high'],
+                         'low': columns['low'], 'close': columns['close']})
+
+def klines_to_frame(klines):
+    return columns_to_frame(klines_to_columns(klines))
+
+def uses_candle_store(interval):
+    candle_store = get_candle_store()
+    return candle_store is not None and candle_store.interval == interval
 
-# ✅ Fonction pour récupérer les prix
 def fetch_crypto_data(symbol, interval='1h', limit=50):
-    klines = client.get_klines(symbol=symbol, interval=interval, limit=limit)
-    df = pd.DataFrame(klines, columns=['time', 'open', 'high', 'low', 'close', 'volume', 
-                                       'close_time', 'quote_volume', 'trades', 
-                                       'taker_base', 'taker_quote', 'ignore'])
-    df['close'] = df['close'].astype(float)
-    return df[['time', 'close']]
+    client = get_client()
+    if not uses_candle_store(interval):
+        return klines_to_frame(client.get_klines(symbol=symbol, interval=interval, limit=limit))
+    candle_store = get_candle_store()
+    missing = candle_store.missing([symbol], limit, int(time.time() * 1000))
+    candle_store.extend_klines(symbol, client.get_klines(symbol=symbol, interval=interval, limit=missing))
+    return columns_to_frame(candle_store.window(symbol, limit))
+
+# ✅ Récupération concurrente des prix pour tout l'univers
+def fetch_all_crypto_data(symbols, interval='1h', limit=50):
+    store = uses_candle_store(interval)
+    candle_store, kline_fetcher = get_candle_store(), get_kline_fetcher()
+    # Avec le stockage, seules les bougies manquantes (et celle en cours) sont redemandées
+    fetch_limit = candle_store.missing(symbols, limit, int(time.time() * 1000)) if store else limit
+    klines_by_symbol = kline_fetcher.fetch_many(symbols, interval=interval, limit=fetch_limit)
+    for symbol, error in kline_fetcher.errors.items():
+        print(f"⚠️ Klines indisponibles pour {symbol}: {error}")
+    if not store:
+        return {symbol: klines_to_frame(klines) for symbol, klines in klines_by_symbol.items()}
+    for symbol, klines in klines_by_symbol.items():
+        candle_store.extend_klines(symbol, klines)
+    return {symbol: columns_to_frame(candle_store.window(symbol, limit)) for symbol in klines_by_symbol}
 
 # ✅ Fonction pour analyser RSI et MACD
-def analyze_crypto(symbol):
-    df = fetch_crypto_data(symbol)
-    df['rsi'] = df['close'].rolling(window=14).mean()
-    df['macd'] = df['close'].ewm(span=12, adjust=False).mean() - df['close'].ewm(span=26, adjust=False).mean()
-    
-    last_rsi = df['rsi'].iloc[-1]
-    last_macd = df['macd'].iloc[-1]
-    
-    if last_rsi < 30 and last_macd > 0:
-        return "BUY"
-    elif last_rsi > 70 and last_macd < 0:
-        return "SELL"
-    else:
-        return "HOLD"
+ACTIONS = indicators.ACTIONS
+
+def summarize_cryptos(frames):
+    """Calcule signal et indicateurs (RSI de Wilder, MACD, ATR) de tous les symboles en une passe vectorisée."""
+    return indicators.summarize(frames)
+
+def analyze_cryptos(frames):
+    """Analyse RSI (Wilder) et MACD de tous les symboles en une passe vectorisée."""
+    return {symbol: summary["action"] for symbol, summary in summarize_cryptos(frames).items()}
+
+def analyze_crypto(symbol, df=None):
+    if df is None:
+        df = fetch_crypto_data(symbol)
+    return analyze_cryptos({symbol: df})[symbol]
+
+# ✅ Mode streaming : indicateurs incrémentaux sur le flux de klines
+def on_stream_update(symbol, values, closed):
+    if closed and values['signal'] != 0:
+        print(f"📈 {symbol}: {ACTIONS[values['signal']]} (RSI={values['rsi']:.1f}, MACD={values['macd']:.6f})")
+
+def start_market_stream(symbols, interval='1h', limit=50, record_path=None):
+    """Amorce les indicateurs par REST puis les tient à jour sur le flux (record_path : enregistrement JSONL pour rejeu)."""
+    book = IndicatorBook(on_update=on_stream_update)
+    store = get_candle_store() if uses_candle_store(interval) else None
+    for symbol, klines in get_kline_fetcher().fetch_many(symbols, interval=interval, limit=limit).items():
+        book.seed(symbol, klines[:-1])  # La dernière bougie REST n'est pas encore clôturée
+        if store is not None:
+            store.extend_klines(symbol, klines)
+    manager = start_kline_stream(book, symbols, interval, API_KEY, API_SECRET, record_path=record_path, store=store)
+    return book, manager
 
 # ✅ Fonction pour valider avec l'IA via Ollama
-def ai_manager(symbol, action):
-    prompt = f"""
+AI_MANAGER_PROMPT = """
     Symbol: {symbol}
     Action suggérée: {action}
     
@@ -74,12 +164,17 @@ def ai_manager(symbol, action):
     
     Donne uniquement la réponse finale sans explication.
     """
-    decision = ollama_llm.invoke(prompt).strip().upper()
+
+def ai_manager(symbol, action):
+    prompt = AI_MANAGER_PROMPT.format(symbol=symbol, action=action)
+    # Lecture en flux : la génération est coupée dès que BUY, SELL ou HOLD apparaît après le raisonnement
+    decision = llm_cache.get_or_call(
+        OLLAMA_MODEL, AI_MANAGER_PROMPT, {"symbol": symbol, "action": action},
+        lambda: stream_decision(prompt, OLLAMA_MODEL, decision_matcher(), OLLAMA_URL, num_predict=256).decision
+    )
     
     # Vérifier et filtrer la réponse
-    valid_responses = ["BUY", "SELL", "HOLD"]
-    if decision not in valid_responses:
-        decision = action  # Sécuriser si l'IA renvoie autre chose
+    decision = normalize_decision(decision or "", action)  # Sécuriser si l'IA renvoie autre chose
     
     # Debug: Envoyer la décision AI sur Telegram
     debug_message = f"🔍 AI Decision Debug:\nSymbol: {symbol}\nAction Suggérée: {action}\nRéponse AI: {decision}"
@@ -88,35 +183,131 @@ def ai_manager(symbol, action):
     
     return decision
 
+# ✅ Validation IA groupée : un seul prompt pour plusieurs symboles, arrêt au premier objet JSON complet
+def stream_batch(prompt):
+    result = stream_decision(prompt, OLLAMA_MODEL, json_object_matcher(), OLLAMA_URL, num_predict=1024)
+    return result.decision or result.text
+
+def ai_manager_batch(candidates, batch_size=10):
+    """
+    Valide plusieurs candidats par appel LLM, avec repli sur l'action suggérée.
+
+    :param candidates: Dictionnaire {symbole: résumé de summarize_cryptos}
+    :return: Dictionnaire {symbole: BUY/SELL/HOLD}
+    """
+    symbols = list(candidates)
+    decisions = {}
+    for i in range(0, len(symbols), batch_size):
+        batch = {symbol: candidates[symbol] for symbol in symbols[i:i + batch_size]}
+        prompt = build_batch_prompt(batch)
+        response = llm_cache.get_or_call(
+            OLLAMA_MODEL, BATCH_PROMPT, batch, lambda: stream_batch(prompt)
+        )
+        batch_decisions, fallbacks = parse_batch_decisions(response, batch)
+        decisions.update(batch_decisions)
+
+        lines = [
+            f"{symbol}: {batch[symbol]['action']} → {decision}{' (repli)' if symbol in fallbacks else ''}"
+            for symbol, decision in batch_decisions.items()
+        ]
+        debug_message = "🔍 AI Decision Debug (lot):\n" + "\n".join(lines)
+        print(debug_message)
+        send_telegram_alert(debug_message)
+    return decisions
+
 # ✅ Fonction pour exécuter les trades
 def trade_crypto(symbol, action):
     final_action = ai_manager(symbol, action)
     if final_action == "BUY":
-        client.create_order(symbol=symbol, side=SIDE_BUY, type=ORDER_TYPE_MARKET, quantity=0.001)
+        with span("order", symbol=symbol, side="BUY"):
+            get_client().create_order(symbol=symbol, side=SIDE_BUY, type=ORDER_TYPE_MARKET, quantity=0.001)
         send_telegram_alert(f"✅ Achat de {symbol} exécuté après validation AI !")
     elif final_action == "SELL":
-        client.create_order(symbol=symbol, side=SIDE_SELL, type=ORDER_TYPE_MARKET, quantity=0.001)
+        with span("order", symbol=symbol, side="SELL"):
+            get_client().create_order(symbol=symbol, side=SIDE_SELL, type=ORDER_TYPE_MARKET, quantity=0.001)
         send_telegram_alert(f"❌ Vente de {symbol} exécutée après validation AI !")
     else:
         send_telegram_alert(f"⏸️ AI a annulé le trade pour {symbol}")
 
-# ✅ Création des agents CrewAI avec Ollama uniquement
-fetcher = Agent(name="DataFetcher", role="Récupérateur de données", goal="Récupérer les prix des cryptos", backstory="Expert en extraction de données", llm=ollama_llm)
-analyst = Agent(name="Analyst", role="Analyste de marché", goal="Analyser les tendances", backstory="Spécialiste en trading algorithmique", llm=ollama_llm)
-manager = Agent(name="AI Manager", role="Validateur de trades", goal="Vérifier les décisions de trading avec l'IA", backstory="IA avancée utilisant DeepSeek", llm=ollama_llm)
-trader = Agent(name="Trader", role="Exécuteur d'ordres", goal="Acheter et vendre les cryptos", backstory="Stratège financier", llm=ollama_llm)
-
-# ✅ Lancer CrewAI avec Ollama uniquement
-def run_trading():
-    symbols = get_all_usdt_pairs()
-    for symbol in symbols[:5]:  # Limiter à 5 pour éviter un trop grand nombre d'appels
-        print(f"🚀 Trading en cours pour {symbol}")
-        crew = Crew(agents=[fetcher, analyst, manager, trader], tasks=[
-            Task(description=f"Analyser et trader {symbol}", agent=manager, expected_output="BUY/SELL/HOLD"),
-        ], process=Process.sequential)
-        crew.kickoff()
+# ✅ Décision par niveaux : règles vectorisées, puis LLM pour les seuls signaux ambigus (budget d'appels par cycle)
+@functools.lru_cache(maxsize=None)
+def get_evaluator():
+    # ai_manager_batch est résolu à chaque appel : le remplacer au niveau du module suffit (banc de mesure)
+    return TieredEvaluator(lambda batch: ai_manager_batch(batch), batch_size=10, call_budget=LLM_CALL_BUDGET,
+                           min_confidence=LLM_MIN_CONFIDENCE)
+
+# ✅ Crew unique réutilisé à chaque cycle : le symbole et les signaux sont passés en entrées
+@functools.lru_cache(maxsize=None)
+def get_trading_crew():
+    """Agents CrewAI avec Ollama uniquement, créés au premier cycle."""
+    ollama_llm = get_ollama_llm()
+    fetcher = Agent(name="DataFetcher", role="Récupérateur de données", goal="Récupérer les prix des cryptos", backstory="Expert en extraction de données", llm=ollama_llm)
+    analyst = Agent(name="Analyst", role="Analyste de marché", goal="Analyser les tendances", backstory="Spécialiste en trading algorithmique", llm=ollama_llm)
+    manager = Agent(name="AI Manager", role="Validateur de trades", goal="Vérifier les décisions de trading avec l'IA", backstory="IA avancée utilisant DeepSeek", llm=ollama_llm)
+    trader = Agent(name="Trader", role="Exécuteur d'ordres", goal="Acheter et vendre les cryptos", backstory="Stratège financier", llm=ollama_llm)
+    return Crew(agents=[fetcher, analyst, manager, trader], tasks=[
+        Task(description="Analyser et trader {symbol} (signal: {action}, validation IA: {decision})", agent=manager, expected_output="BUY/SELL/HOLD"),
+    ], process=Process.sequential)
+
+# ✅ Analyse répartie : klines et indicateurs calculés par lots dans des processus séparés
+def open_shard_pool():
+    if TRADER_PROCESSES <= 1:
+        return None
+    pool = ShardPool(TRADER_PROCESSES)
+    # Le processus parent (univers, ordres, klines sans pool) puise dans les budgets de ses processus d'analyse
+    use_budgets(pool.weight_budget, pool.order_budget,
+                *([get_client()] if get_client.cache_info().currsize else []))
+    if get_kline_fetcher.cache_info().currsize:
+        get_kline_fetcher().budget = pool.weight_budget
+    return pool
+
+def analyze_sharded(pool, symbols, interval='1h', limit=50):
+    with span("market_data", symbols=len(symbols), processes=pool.processes):
+        summaries = pool.analyze(symbols, interval=interval, limit=limit,
+                                 store=get_candle_store() if uses_candle_store(interval) else None)
+    for symbol, error in pool.errors.items():
+        print(f"⚠️ Klines indisponibles pour {symbol}: {error}")
+    return summaries
+
+# ✅ Lancer CrewAI avec Ollama uniquement (un cycle, réutilisable par le démon)
+def run_trading(pool=None, interval='1h'):
+    with span("symbols"):
+        symbols = get_all_usdt_pairs()
+    print(f"📡 Récupération des klines pour {len(symbols)} paires...")
+    if pool is not None:
+        summaries = analyze_sharded(pool, symbols, interval)
+    else:
+        with span("market_data", symbols=len(symbols)):
+            market = fetch_all_crypto_data(symbols, interval)
+        with span("indicators", symbols=len(market)):
+            summaries = summarize_cryptos(market)
+    # Les règles tranchent les cas nets ; seuls les signaux proches des seuils passent par le LLM
+    evaluator = get_evaluator()
+    with span("llm_call", symbols=len(summaries)):
+        decisions = evaluator.evaluate(summaries)
+    stats = evaluator.stats
+    print(f"🧮 Décisions : {stats['rules']} par les règles, {stats['llm']} par le LLM ({stats['calls']} appel(s)), "
+          f"{stats['budget']} hors budget LLM")
+    for symbol, decision in decisions.items():
+        if decision == "HOLD":
+            continue
+        action = summaries[symbol]["action"]
+        print(f"🚀 Trading en cours pour {symbol} ({action} → {decision})")
+        with span("crew_kickoff", symbol=symbol):
+            get_trading_crew().kickoff(inputs={"symbol": symbol, "action": action, "decision": decision})
+    stats = llm_cache.stats()
+    print(f"🧠 Cache LLM : {stats['hits']} hit(s), {stats['misses']} miss(es)")
     return "✅ Trading terminé sur toutes les cryptos."
 
 if __name__ == "__main__":
-    result = run_trading()
+    instrumentation.configure_from_env()
+    pool = open_shard_pool()
+    try:
+        with span("cycle"):
+            result = run_trading(pool)
+    finally:
+        if pool is not None:
+            pool.close()
+    instrumentation.metrics.write_snapshot()
     print(result)
+    stop_telegram()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Mode démon : les agents, clients et caches restent en mémoire et un cycle de
+trading est déclenché à chaque clôture de bougie.
+
+Un cycle ne paie plus que le travail incrémental (tickers, klines,
+inférence) au lieu du démarrage complet d'une exécution cron. Si un cycle
+déborde sur la clôture suivante, la politique `skip` l'ignore et `queue` le
+rejoue dès la fin du cycle en cours (file bornée).
+"""
+import time
+import signal
+import argparse
+import threading
+
+import instrumentation
+
+INTERVAL_SECONDS = {
+    "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
+    "1h": 3600, "2h": 7200, "4h": 14400, "6h": 21600, "12h": 43200, "1d": 86400,
+}
+POLICIES = ("skip", "queue")
+
+
+def log(message):
+    print(f"\033[94m[{time.strftime('%H:%M:%S')}]\033[0m {message}", flush=True)
+
+
+def next_close(now, interval, offset=0.0):
+    """ Prochaine clôture de bougie (epoch, secondes) après `now`, décalée de `offset`. """
+    return (int(now - offset) // interval + 1) * interval + offset
+
+
+class CandleScheduler:
+    """
+    Déclenche `cycle()` à chaque clôture de bougie, dans un thread de travail unique.
+
+    :param cycle: Fonction sans argument exécutant un cycle de trading
+    :param interval: Intervalle des bougies ("1m", "1h", ...)
+    :param offset: Délai (s) après la clôture, le temps que Binance publie la bougie
+    :param policy: "skip" ou "queue" quand un cycle est encore en cours
+    :param max_queue: Nombre maximum de cycles en attente avec la politique "queue"
+    """
+
+    def __init__(self, cycle, interval="1h", offset=2.0, policy="skip", max_queue=1):
+        if policy not in POLICIES:
+            raise ValueError(f"Politique inconnue : {policy}")
+        self.cycle = cycle
+        self.interval = INTERVAL_SECONDS[interval]
+        self.offset = offset
+        self.policy = policy
+        self.max_queue = max_queue
+        self.pending = 0
+        self.completed = 0
+        self.skipped = 0
+        self.failed = 0
+        self._busy = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker = None
+
+    def trigger(self):
+        """ Lance un cycle, ou applique la politique de chevauchement si un cycle tourne. """
+        with self._lock:
+            if self._busy:
+                if self.policy == "queue" and self.pending < self.max_queue:
+                    self.pending += 1
+                    log(f"⏳ Cycle en cours, déclenchement mis en file ({self.pending} en attente)")
+                else:
+                    self.skipped += 1
+                    instrumentation.incr("daemon_cycles_skipped_total")
+                    log("⏭️ Cycle précédent toujours en cours, déclenchement ignoré")
+                return False
+            self._busy = True
+        self._worker = threading.Thread(target=self._run, name="trading-cycle", daemon=True)
+        self._worker.start()
+        return True
+
+    def _run(self):
+        while True:
+            start = time.monotonic()
+            try:
+                with instrumentation.span("cycle"):
+                    self.cycle()
+                self.completed += 1
+                log(f"✅ Cycle terminé en {time.monotonic() - start:.1f}s")
+            except Exception as e:
+                self.failed += 1
+                instrumentation.incr("daemon_cycles_failed_total")
+                log(f"\033[91m[ERREUR]\033[0m Cycle en échec : {e}")
+            instrumentation.metrics.write_snapshot()
+            with self._lock:
+                if self.pending and not self._stop.is_set():
+                    self.pending -= 1
+                    continue
+                self._busy = False
+                return
+
+    def run(self, run_now=False):
+        """ Boucle principale : attend chaque clôture jusqu'à stop(). """
+        if run_now:
+            self.trigger()
+        while not self._stop.is_set():
+            target = next_close(time.time(), self.interval, self.offset)
+            log(f"🕒 Prochain cycle à {time.strftime('%H:%M:%S', time.localtime(target))}")
+            if self._stop.wait(max(target - time.time(), 0)):
+                break
+            self.trigger()
+
+    def stop(self, timeout=None):
+        """ Arrête la boucle et attend la fin du cycle en cours (sans lancer ceux en file). """
+        self._stop.set()
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            log("🛑 Arrêt demandé, attente de la fin du cycle en cours...")
+            worker.join(timeout)
+
+    def install_signal_handlers(self):
+        """ SIGINT / SIGTERM déclenchent un arrêt propre. """
+        def handler(signum, frame):
+            log(f"🛑 Signal {signal.Signals(signum).name} reçu")
+            self._stop.set()
+
+        signal.signal(signal.SIGINT, handler)
+        signal.signal(signal.SIGTERM, handler)
+
+
+def crew_cycle(interval="1h"):
+    """
+    Cycle de main.py : un seul TradingCrew, rafraîchi à chaque bougie.
+
+    :param interval: Sans effet : main.py travaille sur les tickers 24 h, l'intervalle ne fixe que le rythme
+    """
+    import main
+
+    crew = main.TradingCrew()
+
+    def cycle():
+        crew.refresh()
+        crew.trade()
+
+    def shutdown():
+        main.get_order_preparer().book.stop()
+    return cycle, shutdown
+
+
+def trader_cycle(interval="1h"):
+    """
+    Cycle de crewai_binance_trader.py : balayage complet de l'univers USDT.
+
+    :param interval: Intervalle des klines analysées, celui des bougies du planificateur
+    """
+    import crewai_binance_trader as trader
+
+    pool = trader.open_shard_pool()  # Processus d'analyse conservés entre les cycles
+
+    def cycle():
+        print(trader.run_trading(pool, interval))
+
+    def shutdown():
+        if pool is not None:
+            pool.close()
+        trader.stop_telegram()
+    return cycle, shutdown
+
+
+MODES = {"crew": crew_cycle, "trader": trader_cycle}
+
+
+def run_stream(interval, record_path=None):
+    """
+    Mode flux : indicateurs incrémentaux sur le flux de klines de tout l'univers USDT.
+
+    Les signaux sont affichés à chaque clôture ; avec `record_path`, les
+    messages sont enregistrés pour un rejeu hors ligne (python3 kline_stream.py).
+    """
+    import crewai_binance_trader as trader
+
+    stop = threading.Event()
+
+    def handler(signum, frame):
+        log(f"🛑 Signal {signal.Signals(signum).name} reçu")
+        stop.set()
+
+    signal.signal(signal.SIGINT, handler)
+    signal.signal(signal.SIGTERM, handler)
+    symbols = trader.get_all_usdt_pairs()
+    log(f"📡 Flux de klines {interval} pour {len(symbols)} paires")
+    book, manager = trader.start_market_stream(symbols, interval, record_path=record_path)
+    try:
+        stop.wait()
+    finally:
+        manager.stop()
+        trader.stop_telegram()
+        log(f"👋 Flux arrêté ({len(book.states)} symbole(s) suivis)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Démon de trading aligné sur les clôtures de bougies")
+    parser.add_argument("mode", choices=[*MODES, "stream"],
+                        help="crew (main.py), trader (crewai_binance_trader.py) ou stream (indicateurs sur le flux de klines)")
+    parser.add_argument("--interval", default="1h", choices=list(INTERVAL_SECONDS))
+    parser.add_argument("--offset", type=float, default=2.0, help="Délai après la clôture (s)")
+    parser.add_argument("--policy", default="skip", choices=POLICIES, help="Cycle qui chevauche le précédent")
+    parser.add_argument("--max-queue", type=int, default=1)
+    parser.add_argument("--now", action="store_true", help="Lancer un premier cycle immédiatement")
+    parser.add_argument("--record", help="Mode stream : enregistre les messages du flux dans ce fichier JSONL")
+    args = parser.parse_args()
+
+    instrumentation.configure_from_env()
+    if args.mode == "stream":
+        run_stream(args.interval, args.record)
+        return
+    log(f"🎬 Démarrage du démon ({args.mode}, bougies {args.interval}, politique {args.policy})")
+    cycle, shutdown = MODES[args.mode](args.interval)
+    scheduler = CandleScheduler(cycle, args.interval, args.offset, args.policy, args.max_queue)
+    scheduler.install_signal_handlers()
+    try:
+        scheduler.run(run_now=args.now)
+    finally:
+        scheduler.stop()
+        shutdown()
+        instrumentation.metrics.close()
+        log(f"👋 Démon arrêté : {scheduler.completed} cycle(s), {scheduler.skipped} ignoré(s), {scheduler.failed} en échec")
+
+
+if __name__ == "__main__":
+    main()
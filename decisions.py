@@ -0,0 +1,88 @@
+"""
+Construction et validation des réponses LLM de trading (BUY / SELL / HOLD).
+"""
+import re
+import json
+
+VALID_DECISIONS = ("BUY", "SELL", "HOLD")
+
+_THINK_RE = re.compile(r"<think>.*?(</think>|$)", re.DOTALL | re.IGNORECASE)
+
+BATCH_PROMPT = """
+    Tu valides des signaux de trading pour plusieurs cryptos.
+    Pour chaque symbole ci-dessous, l'action suggérée et les indicateurs sont fournis.
+    Ces signaux sont proches des seuils (RSI 30/70, MACD proche de zéro) : la règle
+    seule ne tranche pas, appuie-toi aussi sur l'histogramme MACD et l'ATR.
+    - Si la tendance est haussière et RSI < 30 → BUY.
+    - Si la tendance est baissière et RSI > 70 → SELL.
+    - Sinon → HOLD.
+
+    {candidates}
+
+    Réponds uniquement avec un objet JSON {{"SYMBOLE": "BUY|SELL|HOLD", ...}}
+    contenant exactement ces symboles, sans explication.
+    """
+
+
+def strip_reasoning(text):
+    """ Supprime les blocs <think>...</think> émis par les modèles de raisonnement. """
+    return _THINK_RE.sub("", text).strip()
+
+
+def normalize_decision(text, fallback):
+    """ Retourne BUY, SELL ou HOLD si la réponse est exactement l'une d'elles, sinon `fallback`. """
+    decision = strip_reasoning(text).strip().upper()
+    return decision if decision in VALID_DECISIONS else fallback
+
+
+def format_candidates(candidates):
+    """
+    Résume les candidats, une ligne par symbole.
+
+    :param candidates: Dictionnaire {symbole: {"action": ..., "rsi": ..., ...}}
+    """
+    lines = []
+    for symbol, summary in candidates.items():
+        details = ", ".join(
+            f"{name.upper()}={value:.6g}" if isinstance(value, float) else f"{name}={value}"
+            for name, value in summary.items()
+        )
+        lines.append(f"- {symbol}: {details}")
+    return "\n    ".join(lines)
+
+
+def build_batch_prompt(candidates):
+    """ Prompt unique demandant une décision JSON pour tous les candidats. """
+    return BATCH_PROMPT.format(candidates=format_candidates(candidates))
+
+
+def parse_batch_decisions(text, candidates):
+    """
+    Valide strictement une réponse JSON de décisions groupées.
+
+    Chaque symbole absent, mal formé ou avec une valeur hors BUY/SELL/HOLD
+    retombe sur l'action suggérée par les règles.
+
+    :return: (décisions {symbole: action}, ensemble des symboles en repli)
+    """
+    parsed = {}
+    body = strip_reasoning(text)
+    start, end = body.find("{"), body.rfind("}")
+    if start != -1 and end > start:
+        try:
+            parsed = json.loads(body[start:end + 1])
+        except ValueError:
+            parsed = {}
+    if not isinstance(parsed, dict):
+        parsed = {}
+
+    decisions, fallbacks = {}, set()
+    for symbol, summary in candidates.items():
+        value = parsed.get(symbol)
+        value = value.strip().upper() if isinstance(value, str) else None
+        if value in VALID_DECISIONS:
+            decisions[symbol] = value
+        else:
+            decisions[symbol] = summary["action"]
+            fallbacks.add(symbol)
+    return decisions, fallbacks
@@ -1,79 +1,96 @@
 #!/usr/bin/env python3
 import os
-from binance.client import Client
+import sys
+from binance_http import ResilientClient, use_budgets
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from symbol_registry import SymbolRegistry
+from trade_sync import TradeStore, TradeSync
+from sharding import ShardPool
+from portfolio import PriceSnapshot
+from pnl import Fills, compute_pnl, totals
+
+DB_PATH = "trades_testnet.db"
 
 def log(message):
     """Affiche un log avec timestamp."""
     print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
 
-def list_trade_history_last_hour(client, symbol, limit=10):
+def list_trade_history_last_hour(store, symbol=None):
     """
-    Récupère l'historique des transactions depuis la dernière heure pour un symbole donné.
+    Récupère l'historique des transactions depuis la dernière heure, depuis le stockage local.
     
-    :param client: Instance du client Binance
-    :param symbol: Symbole de la crypto-monnaie (ex: 'BTCUSDT')
-    :param limit: Nombre maximum d'ordres à récupérer
+    :param store: Instance de TradeStore synchronisée
+    :param symbol: Symbole de la crypto-monnaie (ex: 'BTCUSDT'), None pour tous
     :return: Liste des transactions passées dans la dernière heure
     """
-    log(f"Récupération de l'historique des transactions pour {symbol} depuis la dernière heure...")
+    # Calcul de la limite de temps (1 heure en arrière)
+    one_hour_ago = datetime.now() - timedelta(hours=1)
+    one_hour_timestamp = int(one_hour_ago.timestamp() * 1000)  # Convertir en millisecondes
     
-    try:
-        # Calcul de la limite de temps (1 heure en arrière)
-        one_hour_ago = datetime.now() - timedelta(hours=1)
-        one_hour_timestamp = int(one_hour_ago.timestamp() * 1000)  # Convertir en millisecondes
-        
-        # Récupération de l'historique des ordres
-        trades = client.get_my_trades(symbol=symbol, limit=limit)
-        
-        if not trades:
-            log(f"Aucune transaction trouvée pour {symbol}.")
-            return []
-        
-        recent_trades = []
-        
-        # Filtrer les transactions pour n'inclure que celles qui ont eu lieu dans la dernière heure
-        for trade in trades:
-            trade_time = datetime.fromtimestamp(trade['time'] / 1000)  # Convertir timestamp en datetime
-            if trade_time >= one_hour_ago:
-                recent_trades.append(trade)
-        
-        if not recent_trades:
-            log(f"Aucune transaction trouvée dans la dernière heure pour {symbol}.")
-            return []
-
-        # Affichage de l'historique des transactions récentes
-        for trade in recent_trades:
-            print(f"Date: {datetime.fromtimestamp(trade['time'] / 1000)}")
-            print(f"Type: {trade['side']}")  # 'BUY' ou 'SELL'
-            print(f"Quantité: {trade['qty']} {symbol}")
-            print(f"Prix: {trade['price']} {symbol}")
-            print(f"Total: {float(trade['qty']) * float(trade['price'])} USDT")
-            print("-" * 50)
-        
-        return recent_trades
-    except Exception as e:
-        log(f"Erreur lors de la récupération de l'historique des transactions pour {symbol}: {e}")
+    recent_trades = store.trades(since=one_hour_timestamp, symbol=symbol)
+    
+    if not recent_trades:
+        log(f"Aucune transaction trouvée dans la dernière heure{f' pour {symbol}' if symbol else ''}.")
         return []
 
-def get_all_pairs(client):
+    # Affichage de l'historique des transactions récentes
+    for trade in recent_trades:
+        print(f"Date: {datetime.fromtimestamp(trade['time'] / 1000)}")
+        print(f"Symbole: {trade['symbol']}")
+        print(f"Type: {trade['side']}")  # 'BUY' ou 'SELL'
+        print(f"Quantité: {trade['qty']}")
+        print(f"Prix: {trade['price']}")
+        print(f"Total: {trade['quoteQty']}")
+        print("-" * 50)
+    
+    return recent_trades
+
+def report_pnl(store, client=None, registry=None, since=None):
+    """
+    Affiche le PnL FIFO réalisé (sur la fenêtre) et latent (aux prix actuels) de chaque symbole.
+    
+    :param store: Instance de TradeStore synchronisée (tout l'historique sert au coût FIFO)
+    :param client: Client Binance pour les prix de marché (dernier prix échangé si absent)
+    :param since: Début de la fenêtre en millisecondes, None pour tout l'historique
+    :return: Rapport {symbole: {...}} de pnl.compute_pnl
+    """
+    snapshot = PriceSnapshot(client.get_all_tickers()) if client is not None else None
+    report = compute_pnl(Fills.from_store(store, registry=registry), since=since, snapshot=snapshot)
+    
+    for symbol, row in report.items():
+        if not row["fills"] and not row["position"]:
+            continue
+        print(f"{symbol}: réalisé {row['realized']:.4f} {row['quote']}, latent {row['unrealized']:.4f}, "
+              f"position {row['position']} (exposition {row['exposure']:.2f}), frais {row['fees']:.4f}"
+              + (f", {row['unmatched']} vendu(s) sans achat connu" if row["unmatched"] else ""))
+    for quote, total in totals(report).items():
+        log(f"PnL {quote} : réalisé {total['realized']:.4f}, latent {total['unrealized']:.4f}, "
+            f"frais {total['fees']:.4f}, exposition {total['exposure']:.2f}")
+    return report
+
+def get_all_pairs(client, registry=None):
     """
     Récupère toutes les paires de trading disponibles sur Binance.
     
     :param client: Instance du client Binance
+    :param registry: Registre des symboles (créé à partir du client si absent)
     :return: Liste des paires de trading
     """
     try:
-        exchange_info = client.get_exchange_info()
-        symbols = exchange_info['symbols']
-        pairs = [symbol['symbol'] for symbol in symbols if symbol['status'] == 'TRADING']
-        return pairs
+        registry = registry or SymbolRegistry(client)
+        return registry.symbols(status='TRADING')
     except Exception as e:
+        # Une liste vide masquerait la panne : l'erreur est journalisée puis propagée
         log(f"Erreur lors de la récupération des paires de trading: {e}")
-        return []
+        raise
 
-def main():
+def make_client():
+    """
+    Initialise le client Binance depuis creds.env.
+    
+    Fonction de niveau module : les processus du balayage réparti l'appellent pour créer leur propre client.
+    """
     # Chargement des variables d'environnement
     load_dotenv("creds.env")
     BINANCE_API_KEY = os.environ.get("BINANCE_API_KEY")
@@ -83,19 +100,44 @@ def main():
         raise Exception("Merci de définir BINANCE_API_KEY et BINANCE_API_SECRET dans creds.env")
     
     # Initialisation du client Binance (testnet peut être désactivé si besoin)
-    client = Client(BINANCE_API_KEY, BINANCE_API_SECRET, testnet=True)
+    # Budget de poids, reprises sur 5xx/429 et décalage d'horloge gérés par binance_http
+    return ResilientClient(BINANCE_API_KEY, BINANCE_API_SECRET, testnet=True)
+
+def main(processes=None):
+    """
+    :param processes: Nombre de processus pour la synchronisation (HISTORIC_PROCESSES par défaut)
+    :return: Code de sortie (1 si au moins un symbole n'a pas pu être synchronisé)
+    """
+    client = make_client()
+    processes = processes or int(os.environ.get("HISTORIC_PROCESSES", "1"))
+    
+    registry = SymbolRegistry(client)
+    store = TradeStore(DB_PATH)
+    sync = TradeSync(client, store, registry)
     
-    log("Récupération de toutes les paires de crypto-monnaies disponibles...")
-    pairs = get_all_pairs(client)
+    # Synchronisation incrémentale des seuls symboles détenus par le compte
+    log("Synchronisation de l'historique des transactions...")
+    if processes > 1:
+        # Symboles répartis sur plusieurs processus, sous un budget de poids commun
+        with ShardPool(processes, client_factory=make_client) as pool:
+            use_budgets(pool.weight_budget, pool.order_budget, client)
+            inserted = pool.sync_trades(sync.held_symbols(), DB_PATH)
+        errors = pool.errors
+    else:
+        inserted = sync.sync()
+        errors = sync.errors
+    for pair, error in errors.items():
+        log(f"Erreur lors de la récupération de l'historique des transactions pour {pair}: {error}")
+    log(f"{inserted} nouvelle(s) transaction(s) enregistrée(s).")
     
-    if not pairs:
-        log("Aucune paire de trading trouvée.")
-        return
+    list_trade_history_last_hour(store)
     
-    # Boucle sur toutes les paires de trading
-    for pair in pairs:
-        log(f"Récupération de l'historique des transactions pour {pair}...")
-        list_trade_history_last_hour(client, pair)
+    log("PnL de la dernière heure (coût FIFO sur tout l'historique local) :")
+    report_pnl(store, client, registry, since=int((datetime.now() - timedelta(hours=1)).timestamp() * 1000))
+    if errors:
+        log(f"{len(errors)} symbole(s) non synchronisé(s), historique incomplet.")
+        return 1
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
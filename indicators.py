@@ -0,0 +1,199 @@
+"""
+Moteur d'indicateurs techniques vectorisé (NumPy).
+
+Toutes les fonctions prennent des matrices (symboles × bougies) et calculent
+l'indicateur pour tous les symboles en une seule passe. Les premières colonnes
+sans historique suffisant valent NaN, comme avec pandas.
+"""
+import numpy as np
+
+_BLOCK = 32
+
+
+def _decay_matrix(n, c):
+    """ Matrice W[j, k] = c^(k - j) pour j <= k, 0 sinon. """
+    k = np.arange(n)
+    p = k[None, :] - k[:, None]
+    return np.where(p >= 0, c ** np.maximum(p, 0), 0.0)
+
+
+def _recurrence(b, c, y0):
+    """
+    Résout y_t = c * y_{t-1} + b_t (avec y_{-1} = y0) sur l'axe des bougies.
+
+    Les blocs de _BLOCK bougies sont résolus par un produit matriciel, puis
+    la retenue entre blocs est propagée récursivement : aucune boucle Python
+    sur les bougies.
+    """
+    n_sym, n = b.shape
+    if n <= _BLOCK:
+        k = np.arange(n)
+        return b @ _decay_matrix(n, c) + y0[:, None] * c ** (k + 1)
+
+    n_blocks = -(-n // _BLOCK)
+    padded = np.pad(b, ((0, 0), (0, n_blocks * _BLOCK - n)))
+    local = (padded.reshape(-1, _BLOCK) @ _decay_matrix(_BLOCK, c)).reshape(n_sym, n_blocks, _BLOCK)
+    ends = _recurrence(local[:, :, -1], c ** _BLOCK, y0)
+    carry = np.concatenate([y0[:, None], ends[:, :-1]], axis=1)
+    k = np.arange(_BLOCK)
+    y = local + carry[:, :, None] * c ** (k + 1)
+    return y.reshape(n_sym, -1)[:, :n]
+
+
+def _wilder(values, period, first):
+    """ Lissage de Wilder amorcé par la moyenne simple des `period` premières valeurs. """
+    out = np.full(values.shape, np.nan)
+    seed_end = first + period
+    if values.shape[1] < seed_end:
+        return out
+    seed = values[:, first:seed_end].mean(axis=1)
+    out[:, seed_end - 1] = seed
+    if values.shape[1] > seed_end:
+        out[:, seed_end:] = _recurrence(values[:, seed_end:] / period, 1 - 1 / period, seed)
+    return out
+
+
+def as_matrix(values):
+    """ Convertit une série ou une liste de séries de même longueur en matrice float64. """
+    return np.atleast_2d(np.asarray(values, dtype=np.float64))
+
+
+def ema(close, span):
+    """ Moyenne mobile exponentielle (équivalent pandas ewm(span, adjust=False)). """
+    close = as_matrix(close)
+    alpha = 2 / (span + 1)
+    return _recurrence(alpha * close, 1 - alpha, close[:, 0])
+
+
+def sma(close, window):
+    """ Moyenne mobile simple. """
+    close = as_matrix(close)
+    out = np.full(close.shape, np.nan)
+    if close.shape[1] >= window:
+        csum = np.cumsum(np.pad(close, ((0, 0), (1, 0))), axis=1)
+        out[:, window - 1:] = (csum[:, window:] - csum[:, :-window]) / window
+    return out
+
+
+def rolling_std(close, window):
+    """ Écart-type glissant (population, ddof=0). """
+    close = as_matrix(close)
+    out = np.full(close.shape, np.nan)
+    if close.shape[1] >= window:
+        # Centrage par symbole pour limiter les erreurs d'arrondi de sum(x²)
+        centered = close - close.mean(axis=1, keepdims=True)
+        mean = sma(centered, window)[:, window - 1:]
+        mean_sq = sma(centered ** 2, window)[:, window - 1:]
+        out[:, window - 1:] = np.sqrt(np.maximum(mean_sq - mean ** 2, 0.0))
+    return out
+
+
+def rsi(close, period=14):
+    """ RSI de Wilder. """
+    close = as_matrix(close)
+    delta = np.diff(close, axis=1, prepend=np.nan)
+    avg_gain = _wilder(np.maximum(delta, 0.0), period, 1)
+    avg_loss = _wilder(np.maximum(-delta, 0.0), period, 1)
+    # 100 - 100 / (1 + gain / perte), sans division par zéro quand la perte est nulle
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total = avg_gain + avg_loss
+        out = 100 * avg_gain / total
+    return np.where(total == 0, 50.0, out)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """ MACD : retourne (ligne MACD, ligne de signal, histogramme). """
+    close = as_matrix(close)
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def atr(high, low, close, period=14):
+    """ Average True Range de Wilder. """
+    high, low, close = as_matrix(high), as_matrix(low), as_matrix(close)
+    prev_close = np.concatenate([close[:, :1], close[:, :-1]], axis=1)
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    true_range[:, 0] = high[:, 0] - low[:, 0]
+    return _wilder(true_range, period, 0)
+
+
+def bollinger(close, window=20, k=2.0):
+    """ Bandes de Bollinger : retourne (milieu, haute, basse). """
+    mid = sma(close, window)
+    std = rolling_std(close, window)
+    return mid, mid + k * std, mid - k * std
+
+
+def compute_indicators(close, high=None, low=None):
+    """
+    Calcule tous les indicateurs en une passe pour une matrice de clôtures.
+
+    :param close: Matrice (symboles × bougies) des prix de clôture
+    :param high: Matrice des plus hauts (optionnelle, requise pour l'ATR)
+    :param low: Matrice des plus bas (optionnelle, requise pour l'ATR)
+    :return: Dictionnaire {nom: matrice (symboles × bougies)}
+    """
+    close = as_matrix(close)
+    macd_line, macd_signal, macd_hist = macd(close)
+    bb_mid, bb_upper, bb_lower = bollinger(close)
+    result = {
+        "rsi": rsi(close),
+        "macd": macd_line,
+        "macd_signal": macd_signal,
+        "macd_hist": macd_hist,
+        "ema_12": ema(close, 12),
+        "ema_26": ema(close, 26),
+        "bb_mid": bb_mid,
+        "bb_upper": bb_upper,
+        "bb_lower": bb_lower,
+    }
+    if high is not None and low is not None:
+        result["atr"] = atr(high, low, close)
+    return result
+
+
+def signal_from_indicators(rsi_values, macd_values, oversold=30, overbought=70):
+    """ Règle RSI/MACD vectorisée : 1 = BUY, -1 = SELL, 0 = HOLD. """
+    buy = (rsi_values < oversold) & (macd_values > 0)
+    sell = (rsi_values > overbought) & (macd_values < 0)
+    return np.where(buy, 1, np.where(sell, -1, 0))
+
+
+ACTIONS = {1: "BUY", -1: "SELL", 0: "HOLD"}
+
+
+def summarize(series_by_symbol):
+    """
+    Signal et dernières valeurs (RSI, MACD, ATR) de chaque symbole.
+
+    Les symboles sont regroupés par nombre de bougies pour former des
+    matrices rectangulaires, calculées chacune en une passe.
+    :param series_by_symbol: {symbole: objet indexable par 'close', 'high', 'low'} (DataFrame ou colonnes)
+    :return: {symbole: {"action", "close", "rsi", "macd", "macd_hist", "atr"}}
+    """
+    groups = {}
+    for symbol, series in series_by_symbol.items():
+        groups.setdefault(len(series["close"]), []).append(symbol)
+
+    summaries = {}
+    for length, symbols in groups.items():
+        if length < 2:
+            summaries.update({symbol: {"action": "HOLD"} for symbol in symbols})
+            continue
+        columns = {
+            name: np.vstack([np.asarray(series_by_symbol[symbol][name], dtype=float) for symbol in symbols])
+            for name in ("close", "high", "low")
+        }
+        values = compute_indicators(columns["close"], columns["high"], columns["low"])
+        signals = signal_from_indicators(values["rsi"][:, -1], values["macd"][:, -1])
+        for i, symbol in enumerate(symbols):
+            summaries[symbol] = {
+                "action": ACTIONS[int(signals[i])],
+                "close": float(columns["close"][i, -1]),
+                "rsi": float(values["rsi"][i, -1]),
+                "macd": float(values["macd"][i, -1]),
+                "macd_hist": float(values["macd_hist"][i, -1]),
+                "atr": float(values["atr"][i, -1]),
+            }
+    return summaries
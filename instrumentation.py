@@ -0,0 +1,263 @@
+"""
+Instrumentation des cycles de trading : durées par étape, poids Binance,
+débit du LLM et cache.
+
+Désactivée par défaut : `span()` renvoie alors un contexte vide partagé et
+les compteurs sortent immédiatement, le coût est négligeable. Une fois
+activée (METRICS_JSONL et/ou METRICS_PORT), chaque étape est écrite en JSONL
+et/ou exposée au format texte Prometheus sur /metrics.
+"""
+import os
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PREFIX = "trader"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "fields", "start")
+
+    def __init__(self, metrics, name, fields):
+        self.metrics = metrics
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        fields = dict(self.fields, error=exc_type.__name__) if exc_type else self.fields
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **fields)
+        return False
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Metrics:
+    """
+    Registre de métriques en mémoire (compteurs, jauges, histogrammes d'étapes).
+
+    :param enabled: Active la collecte ; sinon toutes les méthodes sont sans effet
+    :param jsonl_path: Fichier JSONL recevant une ligne par étape terminée
+    """
+
+    def __init__(self, enabled=False, jsonl_path=None):
+        self.enabled = enabled
+        self.counters = {}
+        self.gauges = {}
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._server = None
+        if jsonl_path:
+            self.open_jsonl(jsonl_path)
+
+    def open_jsonl(self, path):
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def span(self, name, **fields):
+        """ Contexte mesurant la durée d'une étape (les champs vont dans le JSONL). """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, fields)
+
+    def observe(self, name, seconds, **fields):
+        """ Enregistre la durée d'une étape dans son histogramme. """
+        if not self.enabled:
+            return
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(BUCKETS)}
+            stage["count"] += 1
+            stage["sum"] += seconds
+            stage["max"] = max(stage["max"], seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    stage["buckets"][i] += 1
+        self._write({"type": "span", "stage": name, "duration_ms": seconds * 1000, **fields})
+
+    def incr(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.gauges[(name, _labels(labels))] = value
+
+    def observe_binance_headers(self, headers, status=None):
+        """
+        Relève les en-têtes X-MBX-USED-WEIGHT-* et X-MBX-ORDER-COUNT-* d'une réponse Binance.
+
+        :param headers: En-têtes HTTP (dictionnaire insensible ou non à la casse)
+        :param status: Code HTTP, compté par valeur s'il est fourni
+        """
+        if not self.enabled:
+            return
+        for key, value in (headers or {}).items():
+            key = key.lower()
+            if key.startswith("x-mbx-used-weight-"):
+                self.set_gauge("binance_used_weight", int(value), interval=key[18:])
+            elif key.startswith("x-mbx-order-count-"):
+                self.set_gauge("binance_order_count", int(value), interval=key[18:])
+        if status is not None:
+            self.incr("binance_requests_total", status=status)
+
+    def observe_llm(self, seconds, text=None, tokens=None, model=None):
+        """
+        Comptabilise une inférence ; sans `tokens`, ils sont estimés par les mots de `text`.
+        """
+        if not self.enabled:
+            return
+        if tokens is None:
+            tokens = len(text.split()) if text else 0
+        labels = {"model": model} if model else {}
+        self.incr("llm_calls_total", **labels)
+        self.incr("llm_tokens_total", tokens, **labels)
+        self.incr("llm_seconds_total", seconds, **labels)
+        if seconds > 0:
+            self.set_gauge("llm_tokens_per_second", tokens / seconds, **labels)
+        self._write({"type": "llm", "model": model, "tokens": tokens, "duration_ms": seconds * 1000})
+
+    def snapshot(self):
+        """ Copie des compteurs, jauges et étapes (durées en millisecondes). """
+        with self._lock:
+            return {
+                "counters": {_metric_key(k): v for k, v in self.counters.items()},
+                "gauges": {_metric_key(k): v for k, v in self.gauges.items()},
+                "stages": {
+                    name: {"count": s["count"], "total_ms": s["sum"] * 1000, "max_ms": s["max"] * 1000,
+                           "mean_ms": s["sum"] * 1000 / s["count"]}
+                    for name, s in self.stages.items()
+                },
+            }
+
+    def write_snapshot(self):
+        """ Ajoute l'état courant des métriques au JSONL (fin de cycle). """
+        if self.enabled:
+            self._write({"type": "snapshot", **self.snapshot()})
+
+    def render_prometheus(self):
+        """ Métriques au format d'exposition texte Prometheus. """
+        lines = []
+        with self._lock:
+            for kind, values in (("counter", self.counters), ("gauge", self.gauges)):
+                seen = set()
+                for (name, labels), value in sorted(values.items(), key=lambda item: str(item[0])):
+                    if name not in seen:
+                        lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+                        seen.add(name)
+                    lines.append(f"{PREFIX}_{name}{_format_labels(labels)} {value}")
+            if self.stages:
+                lines.append(f"# TYPE {PREFIX}_stage_seconds histogram")
+            for name, stage in sorted(self.stages.items()):
+                for bound, count in zip(BUCKETS, stage["buckets"]):
+                    lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {stage["count"]}')
+                lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{name}"}} {stage["sum"]}')
+                lines.append(f'{PREFIX}_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """ Expose /metrics en arrière-plan (thread démon). """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, record):
+        if self._file is None:
+            return
+        line = json.dumps({"ts": time.time(), **record}, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+
+def _metric_key(key):
+    name, labels = key
+    return name + _format_labels(labels)
+
+
+# Registre global partagé par les scripts
+metrics = Metrics()
+
+
+def configure(jsonl_path=None, port=None, enabled=True):
+    """ Active le registre global et ses sorties (JSONL, endpoint Prometheus). """
+    metrics.enabled = enabled
+    if jsonl_path and metrics._file is None:
+        metrics.open_jsonl(jsonl_path)
+    if port and metrics._server is None:
+        metrics.serve(int(port))
+    return metrics
+
+
+def configure_from_env():
+    """ Active l'instrumentation si METRICS_JSONL ou METRICS_PORT est défini. """
+    jsonl_path = os.environ.get("METRICS_JSONL")
+    port = os.environ.get("METRICS_PORT")
+    if jsonl_path or port:
+        configure(jsonl_path, port)
+    return metrics
+
+
+def span(name, **fields):
+    return metrics.span(name, **fields)
+
+
+def incr(name, value=1, **labels):
+    metrics.incr(name, value, **labels)
@@ -0,0 +1,158 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+import instrumentation
+
+BINANCE_API_URL = os.environ.get("BINANCE_API_URL", "https://api.binance.com")
+
+# Limites publiques Binance (REQUEST_WEIGHT par minute, poids de /api/v3/klines)
+DEFAULT_WEIGHT_LIMIT = 6000
+KLINES_WEIGHT = 2
+
+
+class RequestsTransport:
+    """ Transport HTTP par défaut : une session requests partagée (keep-alive). """
+
+    def __init__(self, base_url=BINANCE_API_URL, timeout=10, pool_size=32):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __call__(self, path, params):
+        """ Retourne (status, headers, body) pour une requête GET. """
+        response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return response.status_code, response.headers, body
+
+
+class WeightBudget:
+    """
+    Budget de poids glissant sur une fenêtre (1 minute par défaut).
+
+    Chaque requête réserve son poids avant d'être émise ; le budget se
+    recale sur l'en-tête X-MBX-USED-WEIGHT-1M renvoyé par Binance et peut
+    être suspendu après un 429/418.
+    """
+
+    def __init__(self, limit=DEFAULT_WEIGHT_LIMIT, window=60.0, safety=0.8):
+        self.capacity = int(limit * safety)
+        self.window = window
+        self._entries = deque()
+        self._used = 0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._entries and now - self._entries[0][0] >= self.window:
+            self._used -= self._entries.popleft()[1]
+
+    def acquire(self, weight):
+        """ Bloque jusqu'à ce que `weight` tienne dans le budget, puis le réserve. """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                if now >= self._paused_until and self._used + weight <= self.capacity:
+                    self._entries.append((now, weight))
+                    self._used += weight
+                    return
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._entries:
+                    wait = self.window - (now - self._entries[0][0])
+                else:
+                    wait = 0.05
+            time.sleep(max(wait, 0.01))
+
+    def sync(self, used_weight):
+        """ Aligne le budget local sur le poids consommé annoncé par le serveur. """
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            if used_weight > self._used:
+                self._entries.append((now, used_weight - self._used))
+                self._used = used_weight
+
+    def pause(self, seconds):
+        """ Suspend toutes les requêtes pendant `seconds` (Retry-After). """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    @property
+    def used(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return self._used
+
+
+class KlineFetcher:
+    """
+    Récupère les klines de nombreux symboles en parallèle (pool de threads borné),
+    sans dépasser le budget de poids Binance.
+
+    :param transport: Appelable (path, params) -> (status, headers, body)
+    :param budget: Instance de WeightBudget partagée entre les appels
+    :param max_workers: Nombre maximum de requêtes simultanées
+    """
+
+    def __init__(self, transport=None, budget=None, max_workers=16, retries=3):
+        self.transport = transport or RequestsTransport()
+        self.budget = budget or WeightBudget()
+        self.max_workers = max_workers
+        self.retries = retries
+        self.errors = {}
+
+    def _get(self, path, params, weight):
+        for attempt in range(self.retries + 1):
+            self.budget.acquire(weight)
+            status, headers, body = self.transport(path, params)
+            headers = {k.lower(): v for k, v in (headers or {}).items()}
+            instrumentation.metrics.observe_binance_headers(headers, status)
+            used = headers.get("x-mbx-used-weight-1m")
+            if used is not None:
+                self.budget.sync(int(used))
+            if status == 200:
+                return body
+            if status in (418, 429):
+                # 429 : limite atteinte, 418 : IP bannie ; on respecte Retry-After
+                self.budget.pause(float(headers.get("retry-after", 60)))
+            elif status < 500:
+                raise RuntimeError(f"Binance HTTP {status} sur {path}: {body}")
+            if attempt < self.retries:
+                time.sleep(min(2 ** attempt, 10) * (0.5 + random.random() / 2))
+        raise RuntimeError(f"Binance HTTP {status} sur {path} après {self.retries} tentatives")
+
+    def fetch(self, symbol, interval="1h", limit=50):
+        """ Récupère les klines d'un symbole. """
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        return self._get("/api/v3/klines", params, KLINES_WEIGHT)
+
+    def fetch_many(self, symbols, interval="1h", limit=50):
+        """
+        Récupère les klines de tous les symboles en parallèle.
+
+        :return: Dictionnaire {symbole: klines} ; les échecs sont dans self.errors
+        """
+        self.errors = {}
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.fetch, s, interval, limit): s for s in symbols}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    self.errors[symbol] = e
+        return results
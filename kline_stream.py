@@ -0,0 +1,246 @@
+"""
+Indicateurs incrémentaux alimentés par le flux de klines Binance.
+
+Chaque symbole garde un état (accumulateurs EMA, moyennes de Wilder,
+fenêtre glissante) mis à jour en temps constant à chaque kline. Une kline
+clôturée fait avancer l'état ; une kline partielle donne des valeurs
+provisoires sans le modifier. Les valeurs sont identiques à celles
+d'indicators.compute_indicators sur le même historique.
+"""
+import sys
+import json
+import math
+from collections import deque
+
+
+class IndicatorState:
+    """ État incrémental des indicateurs pour un symbole. """
+
+    def __init__(self, rsi_period=14, atr_period=14, bb_window=20, bb_k=2.0,
+                 fast=12, slow=26, signal=9):
+        self.rsi_period = rsi_period
+        self.atr_period = atr_period
+        self.bb_window = bb_window
+        self.bb_k = bb_k
+        self.alphas = (2 / (fast + 1), 2 / (slow + 1), 2 / (signal + 1))
+        self.open_time = None
+        self.window = deque()
+        self.state = {
+            "count": 0, "close": None,
+            "ema_fast": None, "ema_slow": None, "ema_signal": None,
+            "gain_sum": 0.0, "loss_sum": 0.0, "avg_gain": None, "avg_loss": None,
+            "tr_sum": 0.0, "atr": None,
+            "win_sum": 0.0, "win_sq": 0.0,
+        }
+        self.values = {}
+
+    def _next(self, high, low, close):
+        """ Calcule l'état après une nouvelle bougie, sans modifier l'état courant. """
+        s = self.state
+        n = s["count"]
+        a_fast, a_slow, a_signal = self.alphas
+        new = dict(s, count=n + 1, close=close)
+
+        if n == 0:
+            new.update(ema_fast=close, ema_slow=close, ema_signal=0.0)
+            true_range = high - low
+        else:
+            new["ema_fast"] = s["ema_fast"] + a_fast * (close - s["ema_fast"])
+            new["ema_slow"] = s["ema_slow"] + a_slow * (close - s["ema_slow"])
+            macd = new["ema_fast"] - new["ema_slow"]
+            new["ema_signal"] = s["ema_signal"] + a_signal * (macd - s["ema_signal"])
+
+            prev = s["close"]
+            delta = close - prev
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            period = self.rsi_period
+            if n < period:
+                new["gain_sum"] = s["gain_sum"] + gain
+                new["loss_sum"] = s["loss_sum"] + loss
+            elif n == period:
+                new["avg_gain"] = (s["gain_sum"] + gain) / period
+                new["avg_loss"] = (s["loss_sum"] + loss) / period
+            else:
+                new["avg_gain"] = s["avg_gain"] + (gain - s["avg_gain"]) / period
+                new["avg_loss"] = s["avg_loss"] + (loss - s["avg_loss"]) / period
+            true_range = max(high - low, abs(high - prev), abs(low - prev))
+
+        period = self.atr_period
+        if n < period - 1:
+            new["tr_sum"] = s["tr_sum"] + true_range
+        elif n == period - 1:
+            new["atr"] = (s["tr_sum"] + true_range) / period
+        else:
+            new["atr"] = s["atr"] + (true_range - s["atr"]) / period
+
+        new["win_sum"] = s["win_sum"] + close
+        new["win_sq"] = s["win_sq"] + close * close
+        if len(self.window) == self.bb_window:
+            dropped = self.window[0]
+            new["win_sum"] -= dropped
+            new["win_sq"] -= dropped * dropped
+        return new
+
+    def _values(self, s):
+        values = {"close": s["close"], "ema_12": s["ema_fast"], "ema_26": s["ema_slow"]}
+        macd = s["ema_fast"] - s["ema_slow"]
+        values.update(macd=macd, macd_signal=s["ema_signal"], macd_hist=macd - s["ema_signal"])
+
+        avg_gain, avg_loss = s["avg_gain"], s["avg_loss"]
+        if avg_gain is None:
+            values["rsi"] = math.nan
+        elif avg_loss == 0:
+            values["rsi"] = 100.0 if avg_gain > 0 else 50.0
+        else:
+            values["rsi"] = 100 - 100 / (1 + avg_gain / avg_loss)
+
+        values["atr"] = math.nan if s["atr"] is None else s["atr"]
+        if s["count"] >= self.bb_window:
+            mean = s["win_sum"] / self.bb_window
+            std = math.sqrt(max(s["win_sq"] / self.bb_window - mean * mean, 0.0))
+            values.update(bb_mid=mean, bb_upper=mean + self.bb_k * std, bb_lower=mean - self.bb_k * std)
+        else:
+            values.update(bb_mid=math.nan, bb_upper=math.nan, bb_lower=math.nan)
+        # Même règle que indicators.signal_from_indicators, en scalaire
+        rsi = values["rsi"]
+        values["signal"] = 1 if rsi < 30 and macd > 0 else -1 if rsi > 70 and macd < 0 else 0
+        return values
+
+    def update(self, open_time, high, low, close, closed):
+        """
+        Intègre une kline.
+
+        :param open_time: Heure d'ouverture de la bougie (ms)
+        :param closed: True si la bougie est clôturée
+        :return: Valeurs des indicateurs, ou None si la kline est périmée
+        """
+        if self.open_time is not None and open_time <= self.open_time:
+            return None
+        new = self._next(high, low, close)
+        values = self._values(new)
+        if closed:
+            self.state = new
+            self.open_time = open_time
+            self.window.append(close)
+            if len(self.window) > self.bb_window:
+                self.window.popleft()
+            self.values = values
+        return values
+
+
+class IndicatorBook:
+    """ Ensemble des états d'indicateurs, indexés par symbole. """
+
+    def __init__(self, on_update=None, **params):
+        self.states = {}
+        self.params = params
+        self.on_update = on_update
+
+    def state(self, symbol):
+        if symbol not in self.states:
+            self.states[symbol] = IndicatorState(**self.params)
+        return self.states[symbol]
+
+    def seed(self, symbol, klines):
+        """ Initialise l'état d'un symbole à partir de klines REST (bougies clôturées). """
+        state = self.state(symbol)
+        for kline in klines:
+            state.update(int(kline[0]), float(kline[2]), float(kline[3]), float(kline[4]), True)
+
+    def on_message(self, message):
+        """ Traite un événement kline brut (flux simple ou multiplexé). """
+        data = message.get("data", message)
+        if data.get("e") != "kline":
+            return None
+        kline = data["k"]
+        symbol = data["s"]
+        values = self.state(symbol).update(
+            int(kline["t"]), float(kline["h"]), float(kline["l"]), float(kline["c"]), kline["x"]
+        )
+        if values is not None and self.on_update:
+            self.on_update(symbol, values, kline["x"])
+        return values
+
+    def last(self, symbol):
+        """ Dernières valeurs clôturées d'un symbole. """
+        return self.states[symbol].values if symbol in self.states else {}
+
+
+class StreamRecorder:
+    """ Enregistre les messages du flux dans un fichier JSONL pour rejeu hors ligne. """
+
+    def __init__(self, path, handler=None):
+        self.file = open(path, "a", encoding="utf-8")
+        self.handler = handler
+
+    def __call__(self, message):
+        self.file.write(json.dumps(message) + "\n")
+        self.file.flush()
+        if self.handler:
+            self.handler(message)
+
+    def close(self):
+        self.file.close()
+
+
+def replay_stream(path, book):
+    """
+    Rejoue un flux enregistré dans un IndicatorBook.
+
+    :return: Nombre de messages traités
+    """
+    count = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                book.on_message(json.loads(line))
+                count += 1
+    return count
+
+
+def start_kline_stream(book, symbols, interval="1h", api_key=None, api_secret=None, record_path=None, store=None):
+    """
+    Démarre le flux websocket multiplexé des klines pour les symboles donnés.
+
+    :param store: CandleStore optionnel alimenté par le même flux
+    :return: Le ThreadedWebsocketManager démarré (appeler .stop() pour arrêter)
+    """
+    from binance import ThreadedWebsocketManager
+
+    handler = book.on_message
+    if store is not None:
+        def handler(message, update=book.on_message):
+            store.on_message(message)
+            return update(message)
+    if record_path:
+        handler = StreamRecorder(record_path, handler)
+    manager = ThreadedWebsocketManager(api_key=api_key, api_secret=api_secret)
+    manager.start()
+    streams = [f"{symbol.lower()}@kline_{interval}" for symbol in symbols]
+    # Binance limite le nombre de flux par connexion : on découpe par paquets
+    for i in range(0, len(streams), 200):
+        manager.start_multiplex_socket(callback=handler, streams=streams[i:i + 200])
+    return manager
+
+
+def main(argv=None):
+    """ Rejoue un enregistrement JSONL et affiche les derniers indicateurs clôturés de chaque symbole. """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rejeu hors ligne d'un flux de klines enregistré")
+    parser.add_argument("path", help="Fichier JSONL produit par StreamRecorder (daemon.py stream --record)")
+    args = parser.parse_args(argv)
+
+    book = IndicatorBook()
+    count = replay_stream(args.path, book)
+    print(f"{count} message(s) rejoué(s), {len(book.states)} symbole(s)")
+    for symbol in sorted(book.states):
+        values = book.last(symbol)
+        if values:
+            print(f"{symbol}: close={values['close']} RSI={values['rsi']:.2f} MACD={values['macd']:.6f} "
+                  f"signal={values['signal']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Cache des décisions LLM.
+
+La clé combine le modèle, le gabarit de prompt et une empreinte quantifiée
+de l'instantané de marché : deux cycles dont les données ne diffèrent qu'au
+bruit près réutilisent la même réponse au lieu de relancer une inférence.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import instrumentation
+
+
+def quantize(value, digits=3):
+    """ Arrondit récursivement les flottants à `digits` chiffres significatifs. """
+    if isinstance(value, float):
+        return float(f"{value:.{digits}g}")
+    if isinstance(value, dict):
+        return {str(k): quantize(v, digits) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [quantize(v, digits) for v in value]
+    return value
+
+
+def fingerprint(snapshot, digits=3):
+    """ Empreinte stable d'un instantané de marché quantifié. """
+    payload = json.dumps(quantize(snapshot, digits), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMDecisionCache:
+    """
+    Cache LRU avec expiration (TTL), optionnellement persisté sur disque.
+
+    :param max_entries: Nombre maximum d'entrées conservées
+    :param ttl: Durée de validité d'une entrée en secondes
+    :param path: Fichier JSON de persistance (None pour rester en mémoire)
+    :param digits: Chiffres significatifs conservés dans l'empreinte
+    """
+
+    def __init__(self, max_entries=256, ttl=300, path=None, digits=3):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.digits = digits
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    def key(self, model, template, snapshot):
+        """ Clé de cache pour un appel LLM. """
+        raw = json.dumps([model, template, fingerprint(snapshot, self.digits)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """ Valeur en cache, ou None si absente ou expirée. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                instrumentation.incr("llm_cache_hits_total")
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            instrumentation.incr("llm_cache_misses_total")
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self.path:
+            self.save()
+
+    def get_or_call(self, model, template, snapshot, call):
+        """
+        Retourne la réponse en cache ou exécute `call()` et mémorise son résultat.
+
+        Une réponse vide ou None (génération coupée avant toute réponse) n'est
+        pas mémorisée : le cycle suivant relance l'inférence.
+        :param call: Fonction sans argument effectuant l'appel LLM
+        """
+        key = self.key(model, template, snapshot)
+        value = self.get(key)
+        if value is None:
+            value = call()
+            if value:
+                self.put(key, value)
+        return value
+
+    def stats(self):
+        """ Compteurs de succès et d'échecs du cache. """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def save(self):
+        with self._lock:
+            entries = [[k, v, t] for k, (v, t) in self._entries.items()]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        with self._lock:
+            for key, value, stored_at in entries:
+                if value and now - stored_at <= self.ttl:
+                    self._entries[key] = (value, stored_at)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
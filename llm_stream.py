@@ -0,0 +1,165 @@
+"""
+Lecture en flux des réponses Ollama avec arrêt anticipé.
+
+Les modèles de raisonnement (deepseek-r1) émettent un long bloc <think>
+avant leur réponse. Le lecteur consomme les tokens au fil de l'eau, ignore
+ces blocs et coupe la génération dès qu'une décision valide est lisible
+(BUY/SELL/HOLD, symbole présent dans l'index des symboles, objet JSON
+complet). Le nombre de tokens et la durée sont plafonnés.
+"""
+import re
+import json
+import time
+from collections import namedtuple
+
+import requests
+import urllib3
+
+import instrumentation
+from decisions import VALID_DECISIONS
+from ollama import OLLAMA_URL
+
+DEFAULT_NUM_PREDICT = 512
+DEFAULT_TIME_BUDGET = 30.0  # secondes
+
+# Mots complets (suivis d'un séparateur) ; seuls les mots en majuscules comptent, « The » ou « buy » dans une phrase sont ignorés
+_WORD_RE = re.compile(r"(?<![A-Za-z0-9])[A-Z0-9]+(?=[^A-Za-z0-9])")
+
+StreamResult = namedtuple("StreamResult", ["decision", "text", "tokens", "elapsed", "stop_reason"])
+
+
+class VisibleText:
+    """ Accumule les fragments du flux en écartant les blocs <think>...</think>. """
+
+    def __init__(self):
+        self.raw = ""
+        self.text = ""
+        self._pos = 0
+        self._thinking = False
+
+    def feed(self, chunk):
+        self.raw += chunk
+        while True:
+            if self._thinking:
+                end = self.raw.find("</think>", self._pos)
+                if end < 0:
+                    return self.text
+                self._pos = end + len("</think>")
+                self._thinking = False
+            start = self.raw.find("<think>", self._pos)
+            if start < 0:
+                # Une balise peut être coupée entre deux fragments : on garde la fin en attente
+                cut = self.raw.rfind("<", max(self._pos, len(self.raw) - len("<think>")))
+                safe = cut if cut >= 0 else len(self.raw)
+                self.text += self.raw[self._pos:safe]
+                self._pos = safe
+                return self.text
+            self.text += self.raw[self._pos:start]
+            self._pos = start + len("<think>")
+            self._thinking = True
+
+    def close(self):
+        """ Fin du flux : le texte en attente devient visible (sauf bloc <think> non fermé). """
+        if not self._thinking:
+            self.text += self.raw[self._pos:]
+            self._pos = len(self.raw)
+        return self.text
+
+
+def decision_matcher(valid=VALID_DECISIONS):
+    """ Premier mot complet parmi `valid` (BUY/SELL/HOLD par défaut). """
+    valid = set(valid)
+
+    def match(text):
+        for word in _WORD_RE.findall(text):
+            if word in valid:
+                return word
+        return None
+    return match
+
+
+def symbol_matcher(symbols, quote="USDT"):
+    """
+    Premier mot complet qui est un symbole connu, éventuellement sans son actif de cotation.
+
+    :param symbols: Conteneur des symboles valides (ex : SymbolRegistry ou ensemble)
+    """
+    def match(text):
+        for word in _WORD_RE.findall(text):
+            for candidate in (word, word + quote):
+                if len(candidate) > len(quote) and candidate in symbols:
+                    return candidate
+        return None
+    return match
+
+
+def json_object_matcher():
+    """ Premier objet JSON complet et décodable. """
+    decoder = json.JSONDecoder()
+
+    def match(text):
+        start = text.find("{")
+        while start >= 0:
+            try:
+                value, _ = decoder.raw_decode(text, start)
+                if isinstance(value, dict):
+                    return json.dumps(value)
+            except ValueError:
+                pass
+            start = text.find("{", start + 1)
+        return None
+    return match
+
+
+def stream_decision(prompt, model, match, base_url=OLLAMA_URL, num_predict=DEFAULT_NUM_PREDICT,
+                    time_budget=DEFAULT_TIME_BUDGET, options=None, session=None):
+    """
+    Interroge Ollama en flux et s'arrête dès que `match` reconnaît une décision.
+
+    :param match: Fonction (texte visible) -> décision ou None
+    :param num_predict: Nombre maximum de tokens générés (raisonnement compris)
+    :param time_budget: Durée maximale en secondes
+    :return: StreamResult ; decision vaut None si rien de valide n'a été lu, y compris quand
+        Ollama ne répond pas à temps (stop_reason "timeout") ou coupe la connexion ("error")
+    """
+    payload = {
+        "model": model, "prompt": prompt, "stream": True,
+        "options": dict(options or {}, num_predict=num_predict),
+    }
+    http = session or requests
+    visible = VisibleText()
+    decision, tokens, reason = None, 0, "done"
+    start = time.perf_counter()
+    deadline = start + time_budget
+    try:
+        with http.post(f"{base_url}/api/generate", json=payload, stream=True, timeout=(5, time_budget)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event.get("error"):
+                    raise RuntimeError(f"Ollama : {event['error']}")
+                tokens += 1
+                decision = match(visible.feed(event.get("response", "")))
+                if decision is not None:
+                    reason = "decision"  # Fermer la connexion interrompt la génération côté Ollama
+                    break
+                if event.get("done"):
+                    decision = match(visible.close() + "\n")
+                    if event.get("done_reason") == "length":
+                        reason = "num_predict"
+                    break
+                if time.perf_counter() > deadline:
+                    reason = "timeout"
+                    break
+    except requests.Timeout:
+        reason = "timeout"  # Aucun token dans le délai (chargement du modèle, serveur saturé)
+    except requests.ConnectionError as error:
+        # Délai dépassé entre deux tokens : requests le remonte comme une erreur de connexion
+        cause = error.args[0] if error.args else None
+        reason = "timeout" if isinstance(cause, urllib3.exceptions.ReadTimeoutError) else "error"
+    elapsed = time.perf_counter() - start
+    instrumentation.metrics.observe("llm_inference", elapsed, model=model, stop_reason=reason)
+    instrumentation.metrics.observe_llm(elapsed, tokens=tokens, model=model)
+    return StreamResult(decision, visible.close(), tokens, elapsed, reason)
@@ -3,16 +3,22 @@ import os
 import json
 import yaml
 import re
-import math
+import functools
 from datetime import datetime
+from decimal import Decimal
 from dotenv import load_dotenv
 from crewai import Agent, Crew, Process, Task, LLM
 from crewai.project import CrewBase, agent, crew, task
 from binance.client import Client
+from binance_http import ResilientClient
 import ollama  # Module pour gérer Ollama
-
-# 🚀 Assurer que Ollama est lancé
-ollama.start_ollama()
+from symbol_registry import SymbolRegistry
+from llm_cache import LLMDecisionCache
+from ranking import MarketSnapshot, cache_snapshot
+from order_path import OrderPreparer
+from llm_stream import stream_decision, symbol_matcher
+import instrumentation
+from instrumentation import span
 
 # 🛠️ Chargement des variables d'environnement
 load_dotenv('creds.env')
@@ -22,28 +28,52 @@ os.environ.pop("OPENAI_API_KEY", None)
 os.environ["CREWAI_LLM_PROVIDER"] = "ollama"
 os.environ["CREWAI_EMBEDDINGS_PROVIDER"] = "ollama"
 
-# 🎯 Initialisation du modèle LLM
-llm = LLM(
-    model="ollama/deepseek-r1:1.5b",
-    base_url="http://localhost:11434",
-    api_key="ollama",
-    temperature=0.3
-)
-
-# 🔑 Vérification des clés API Binance
-BINANCE_API_KEY = os.environ.get("BINANCE_API_KEY")
-BINANCE_API_SECRET = os.environ.get("BINANCE_API_SECRET")
-if not BINANCE_API_KEY or not BINANCE_API_SECRET:
-    raise Exception("\033[91m[ERREUR]\033[0m Merci de définir BINANCE_API_KEY et BINANCE_API_SECRET dans creds.env")
-
-# 📡 Initialisation du client Binance
-client = Client(
-    BINANCE_API_KEY,
-    BINANCE_API_SECRET,
-    testnet=True,
-    tld='com',
-    requests_params={'timeout': 30}
-)
+OLLAMA_MODEL = "deepseek-r1:1.5b"
+LLM_NUM_PREDICT = 512  # Plafond de tokens (raisonnement compris)
+LLM_TIME_BUDGET = 30.0  # Secondes
+
+# 🧠 Cache des décisions LLM (persisté entre deux exécutions)
+llm_cache = LLMDecisionCache(ttl=300, path="llm_cache.json")
+
+# ⏳ Initialisation paresseuse : rien n'est démarré ni téléchargé à l'import
+@functools.lru_cache(maxsize=None)
+def get_llm():
+    """Démarre Ollama si besoin, précharge le modèle et retourne le LLM."""
+    if not ollama.start_ollama():
+        raise Exception("\033[91m[ERREUR]\033[0m Le serveur Ollama ne répond pas.")
+    ollama.preload_model(OLLAMA_MODEL)
+    return LLM(
+        model=f"ollama/{OLLAMA_MODEL}",
+        base_url=ollama.OLLAMA_URL,
+        api_key="ollama",
+        temperature=0.3
+    )
+
+@functools.lru_cache(maxsize=None)
+def get_client():
+    """Vérifie les clés API et initialise le client Binance."""
+    BINANCE_API_KEY = os.environ.get("BINANCE_API_KEY")
+    BINANCE_API_SECRET = os.environ.get("BINANCE_API_SECRET")
+    if not BINANCE_API_KEY or not BINANCE_API_SECRET:
+        raise Exception("\033[91m[ERREUR]\033[0m Merci de définir BINANCE_API_KEY et BINANCE_API_SECRET dans creds.env")
+    # 🚦 Budget de poids partagé, reprises et décalage d'horloge gérés par la couche HTTP commune
+    return ResilientClient(
+        BINANCE_API_KEY,
+        BINANCE_API_SECRET,
+        testnet=True,
+        tld='com',
+        requests_params={'timeout': 30}
+    )
+
+@functools.lru_cache(maxsize=None)
+def get_registry():
+    """Registre des symboles (exchangeInfo mis en cache sur disque)."""
+    return SymbolRegistry(get_client())
+
+@functools.lru_cache(maxsize=None)
+def get_order_preparer():
+    """Arrondis Decimal par symbole et cache des meilleurs bid/ask."""
+    return OrderPreparer(get_registry())
 
 def log_step(message):
     """Affiche un log avec timestamp."""
@@ -52,19 +82,19 @@ def log_step(message):
 def get_usdt_tickers():
     """Récupère les symboles USDT depuis Binance."""
     log_step("Récupération des symboles USDT...")
-    exchange_info = client.get_exchange_info()
-    tickers = [s['symbol'] for s in exchange_info['symbols'] if s['symbol'].endswith('USDT')]
+    with span("symbols"):
+        tickers = get_registry().symbols(quote_asset="USDT", status=None)
     log_step("\033[92m✔ Symboles USDT récupérés\033[0m")
     return tickers
 
 def get_market_data(symbols):
-    """Récupère les données de marché pour les symboles donnés."""
+    """Récupère les données de marché (instantané en colonnes) pour les symboles donnés."""
     log_step("Récupération des données de marché...")
-    tickers = client.get_ticker()
-    market_data = {
-        t['symbol']: {"price": float(t['lastPrice']), "volume": float(t['volume'])}
-        for t in tickers if t['symbol'] in symbols
-    }
+    with span("market_data"):
+        tickers = get_client().get_ticker()
+        market_data = MarketSnapshot(tickers, symbols)
+        # ⚡ Les tickers 24h contiennent déjà bid/ask : le cache de cotations est chaud sans appel de plus
+        get_order_preparer().book.warm(tickers)
     log_step("\033[92m✔ Données de marché récupérées\033[0m")
     return market_data
 
@@ -72,30 +102,31 @@ def get_market_data(symbols):
 class TradingCrew:
     def __init__(self):
         log_step("📦 Initialisation de TradingCrew...")
-        self.llm = llm
-        self.client = client
-        self.usdt_symbols = get_usdt_tickers()
-        self.market_data = get_market_data(self.usdt_symbols)
+        self.llm = get_llm()
+        self.client = get_client()
+        self.registry = get_registry()
+        self.orders = get_order_preparer()
 
         with open("config/agents.yaml", "r") as f:
             self.agents_config = yaml.safe_load(f)
         with open("config/tasks.yaml", "r") as f:
             self.tasks_config = yaml.safe_load(f)
 
-        self.selection_agent_prompt = None
+        self.refresh()
         log_step("\033[92m✔ TradingCrew initialisé\033[0m")
 
+    def refresh(self):
+        """Recharge uniquement les données de marché ; LLM, clients et caches sont conservés."""
+        self.usdt_symbols = get_usdt_tickers()
+        self.market_data = get_market_data(self.usdt_symbols)
+        self.selection_agent_prompt = None
+        self.selection_snapshot = None
+
     @agent
     def selection_agent(self) -> Agent:
         log_step("🤖 Création de l'agent de sélection...")
         config = self.agents_config.get("selection_agent")
-        prompt_template = config.get("prompt")
-        market_data_str = "\n".join(
-            f"{sym}: Prix={data['price']}, Volume={data['volume']}"
-            for sym, data in list(self.market_data.items())[:10]
-        )
-        prompt = prompt_template.replace("{market_data}", market_data_str)
-        self.selection_agent_prompt = prompt
+        prompt = self.build_selection_prompt()
         log_step("\033[92m✔ Agent de sélection prêt\033[0m")
         return Agent(
             config={
@@ -109,6 +140,31 @@ class TradingCrew:
             llm=self.llm
         )
 
+    def build_selection_prompt(self):
+        """Construit le prompt de sélection à partir de l'instantané de marché courant."""
+        prompt_template = self.agents_config["selection_agent"].get("prompt")
+        with span("prompt_build"):
+            # Les 10 meilleurs candidats (volume, variation, volatilité, spread)
+            snapshot = dict(self.market_data.top_k(10))
+            market_data_str = "\n".join(
+                f"{sym}: Prix={data['price']}, Volume={data['volume']}, Variation24h={data['change_pct']}%"
+                for sym, data in snapshot.items()
+            )
+            prompt = prompt_template.replace("{market_data}", market_data_str)
+        self.selection_agent_prompt = prompt
+        # Clé de cache : seulement ce qui oriente la réponse, par tranches, pour survivre aux rafraîchissements
+        self.selection_snapshot = cache_snapshot(snapshot)
+        self.prepare_candidates(snapshot)
+        return prompt
+
+    def prepare_candidates(self, symbols):
+        """Pré-calcule les arrondis des candidats et garde leur bid/ask à jour pendant l'inférence."""
+        self.orders.precompute(symbols)
+        try:
+            self.orders.book.start_stream(symbols, testnet=self.client.testnet)
+        except Exception as e:
+            log_step(f"\033[93m[ATTENTION]\033[0m Flux bookTicker indisponible, repli sur REST : {e}")
+
     @crew
     def crew(self) -> Crew:
         log_step("🚀 Création du Crew...")
@@ -118,16 +174,42 @@ class TradingCrew:
             verbose=True
         )
 
+    def stream_selection(self):
+        """Lit la réponse en flux et coupe la génération au premier symbole présent dans l'index."""
+        result = stream_decision(
+            self.selection_agent_prompt, OLLAMA_MODEL, symbol_matcher(self.registry), ollama.OLLAMA_URL,
+            num_predict=LLM_NUM_PREDICT, time_budget=LLM_TIME_BUDGET
+        )
+        log_step(f"🧠 {result.tokens} token(s) en {result.elapsed:.1f}s (arrêt : {result.stop_reason})")
+        # Sans symbole reconnu (délai dépassé, plafond de tokens, réponse hors index), None : trade() échoue proprement
+        return result.decision
+
     @task
     def execute_trade_task(self) -> Task:
+        return self.trade()
+
+    def trade(self) -> Task:
+        """Sélectionne un symbole via le LLM et passe l'ordre ; appelable à chaque cycle après refresh()."""
         log_step("📡 Sélection du symbole via LLM...")
         if not self.selection_agent_prompt:
-            self.selection_agent()
+            self.build_selection_prompt()
         if self.selection_agent_prompt is None:
             raise Exception("\033[91m[ERREUR]\033[0m L'agent de sélection n'a pas pu être créé.")
 
-        response = self.llm.call(messages=[{"role": "user", "content": self.selection_agent_prompt}])
-        chosen_symbol = response.strip().splitlines()[-1].strip().upper()
+        with span("llm_call", model=self.llm.model):
+            response = llm_cache.get_or_call(
+                self.llm.model,
+                self.agents_config["selection_agent"]["prompt"],
+                self.selection_snapshot,
+                self.stream_selection
+            )
+        stats = llm_cache.stats()
+        log_step(f"🧠 Cache LLM : {stats['hits']} hit(s), {stats['misses']} miss(es)")
+        lines = (response or "").strip().splitlines()
+        if not lines:
+            log_step("\033[93m[ATTENTION]\033[0m Aucun symbole sélectionné par le LLM, pas d'ordre pour ce cycle.")
+            return self.failed_trade("Aucun symbole sélectionné par le LLM")
+        chosen_symbol = lines[-1].strip().upper()
         log_step(f"🎯 Symbole sélectionné : \033[93m{chosen_symbol}\033[0m")
 
         if "USDT" not in chosen_symbol:
@@ -139,59 +221,41 @@ class TradingCrew:
 
         log_step(f"🔍 Vérification des restrictions pour {chosen_symbol}...")
         try:
-            symbol_info = self.client.get_symbol_info(chosen_symbol)
-            if not symbol_info:
-                raise ValueError(f"\033[91m[ERREUR]\033[0m Impossible de récupérer les informations pour {chosen_symbol}.")
+            with span("symbol_validation", symbol=chosen_symbol):
+                symbol_info = self.registry.get(chosen_symbol)
+                if not symbol_info:
+                    raise ValueError(f"\033[91m[ERREUR]\033[0m Impossible de récupérer les informations pour {chosen_symbol}.")
         except Exception as e:
             log_step(f"\033[91m[ERREUR]\033[0m Échec de la récupération des informations pour {chosen_symbol} : {e}")
             raise e
 
-        min_notional, min_qty, max_qty, step_size = None, None, None, None
-        for filter in symbol_info.get('filters', []):
-            if filter['filterType'] == 'NOTIONAL':
-                min_notional = float(filter['minNotional'])
-            if filter['filterType'] == 'LOT_SIZE':
-                min_qty = float(filter['minQty'])
-                max_qty = float(filter['maxQty'])
-                step_size = float(filter['stepSize'])
-
-        price = float(self.client.get_symbol_ticker(symbol=chosen_symbol)['price'])
-        min_quantity = max(min_qty, round(min_notional / price, 2))
-        total_value = min_quantity * price
-
-        if total_value < min_notional:
-            min_quantity = math.ceil(min_notional / price)
-            total_value = min_quantity * price
-            log_step(f"🔧 Ajustement de la quantité : {min_quantity} {chosen_symbol} pour respecter la contrainte NOTIONAL.")
-
-        if min_quantity > max_qty:
-            min_quantity = max_qty
-
-        if step_size:
-            min_quantity = math.floor(min_quantity / step_size) * step_size
+        # Quantité exacte (Decimal) au meilleur ask en cache ; une seule cotation REST si le cache est froid
+        try:
+            with span("price_quote", symbol=chosen_symbol):
+                prepared = self.orders.market_order(chosen_symbol, Client.SIDE_BUY)
+                if prepared is None:
+                    log_step(f"🔄 Cotation absente du cache pour {chosen_symbol}, requête REST...")
+                    price = self.client.get_symbol_ticker(symbol=chosen_symbol)['price']
+                    prepared = self.orders.market_order(chosen_symbol, Client.SIDE_BUY, price=price)
+        except ValueError as e:
+            log_step(f"\033[91m[ERREUR]\033[0m Quantité invalide pour {chosen_symbol} : {e}")
+            return self.failed_trade(e)
+        order_params, price = prepared
+        quantity = order_params["quantity"]
 
-        log_step(f"💰 Quantité ajustée : {min_quantity} {chosen_symbol} (valeur totale : {total_value} USDT)")
+        log_step(f"💰 Quantité ajustée : {quantity} {chosen_symbol} (valeur totale : {Decimal(quantity) * price} USDT)")
 
         # Log ajouté avant de passer la commande
         log_step("📤 Envoi de la commande à Binance...")
 
         try:
-            order = self.client.create_order(
-                symbol=chosen_symbol,
-                side=Client.SIDE_BUY,
-                type=Client.ORDER_TYPE_MARKET,
-                quantity=min_quantity
-            )
+            with span("order", symbol=chosen_symbol):
+                order = self.client.create_order(**order_params)
             log_step("\033[92m✔ Commande passée avec succès\033[0m")
             print(json.dumps(order, indent=2))
         except Exception as e:
             log_step(f"\033[91m[ERREUR]\033[0m Échec de la commande : {e}")
-            return Task(
-                config=self.tasks_config.get("execute_trade_task", {}),
-                output_file="trade_order.json",
-                description="Commande d'achat échouée",
-                expected_output=str(e)
-            )
+            return self.failed_trade(e)
 
         print("Commande passée :", json.dumps(order, indent=2))
         task_config = self.tasks_config.get("execute_trade_task", {})
@@ -203,10 +267,25 @@ class TradingCrew:
             expected_output=order_str
         )
 
+    def failed_trade(self, error):
+        """Tâche signalant un achat non passé, avec l'erreur en sortie attendue."""
+        return Task(
+            config=self.tasks_config.get("execute_trade_task", {}),
+            output_file="trade_order.json",
+            description="Commande d'achat échouée",
+            expected_output=str(error)
+        )
+
 def main():
+    instrumentation.configure_from_env()
     log_step("🎬 Démarrage du trading...")
-    crew_instance = TradingCrew()
-    crew_instance.execute_trade_task()
+    try:
+        with span("cycle"):
+            crew_instance = TradingCrew()
+            crew_instance.execute_trade_task()
+    finally:
+        get_order_preparer().book.stop()
+    instrumentation.metrics.write_snapshot()
     log_step("✅ Trading terminé avec succès.")
 
 if __name__ == '__main__':
@@ -0,0 +1,276 @@
+"""
+Serveurs HTTP locaux simulant Binance (REST), Ollama et l'API Telegram.
+
+Ils permettent de mesurer ou d'exercer les scripts sans testnet ni modèle
+réel. La latence de chaque serveur est configurable.
+"""
+import re
+import json
+import time
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+INTERVAL_MS = {"1m": 60000, "5m": 300000, "15m": 900000, "1h": 3600000, "4h": 14400000, "1d": 86400000}
+
+
+class MockServer:
+    """ Serveur HTTP multi-thread démarré en arrière-plan sur un port libre. """
+
+    def __init__(self, handler_class, **settings):
+        handler = type(handler_class.__name__, (handler_class,), settings)
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _params(self):
+        """ Retourne (paramètres de requête et de formulaire, corps JSON éventuel). """
+        params = {k: v[-1] for k, v in parse_qs(urlparse(self.path).query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        if body and self.headers.get("Content-Type", "").startswith("application/json"):
+            return params, json.loads(body)
+        params.update({k: v[-1] for k, v in parse_qs(body).items()})
+        return params, None
+
+    def _send_json(self, payload, status=200, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class BinanceHandler(_JSONHandler):
+    """
+    Sous-ensemble de l'API REST Binance : exchangeInfo, tickers, klines,
+    order, myTrades, account, ping et time.
+    """
+
+    n_symbols = 400
+    held_assets = 10
+    trades_per_symbol = 50
+
+    def _symbols(self):
+        return [f"SYM{i}USDT" for i in range(self.n_symbols)]
+
+    @staticmethod
+    def _price(symbol):
+        return round(random.Random(symbol).uniform(0.01, 100), 4)
+
+    def _exchange_info(self):
+        symbols = []
+        for symbol in self._symbols():
+            symbols.append({
+                "symbol": symbol, "status": "TRADING", "baseAsset": symbol[:-4], "quoteAsset": "USDT",
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "minPrice": "0.00010000", "maxPrice": "100000.00000000", "tickSize": "0.00010000"},
+                    {"filterType": "LOT_SIZE", "minQty": "0.01000000", "maxQty": "900000.00000000", "stepSize": "0.01000000"},
+                    {"filterType": "NOTIONAL", "minNotional": "5.00000000", "applyMinToMarket": True},
+                ],
+            })
+        return {"timezone": "UTC", "serverTime": int(time.time() * 1000), "rateLimits": [], "symbols": symbols}
+
+    def _ticker(self, symbol):
+        rng = random.Random(f"{symbol}-24h")
+        price = self._price(symbol)
+        return {
+            "symbol": symbol, "lastPrice": str(price), "priceChangePercent": f"{rng.uniform(-15, 15):.3f}",
+            "highPrice": str(price * 1.05), "lowPrice": str(price * 0.95), "volume": f"{rng.uniform(1e3, 1e7):.2f}",
+            "quoteVolume": f"{rng.uniform(1e4, 1e8):.2f}", "bidPrice": str(price * 0.999), "askPrice": str(price * 1.001),
+        }
+
+    def _klines(self, symbol, interval, limit):
+        step = INTERVAL_MS.get(interval, 3600000)
+        now = int(time.time() * 1000) // step * step
+        rng = random.Random(f"{symbol}-{interval}-{now}")
+        price = self._price(symbol)
+        klines = []
+        for i in range(limit):
+            open_price = price
+            price *= 1 + rng.gauss(0, 0.03)
+            t = now - (limit - 1 - i) * step
+            klines.append([t, str(open_price), str(max(open_price, price) * 1.01), str(min(open_price, price) * 0.99),
+                           str(price), "100", t + step - 1, "1000", 10, "50", "500", "0"])
+        return klines
+
+    def _my_trades(self, symbol, params):
+        asset_index = int(symbol[3:-4])
+        if asset_index >= self.held_assets:
+            return []
+        now = int(time.time() * 1000)
+        trades = [
+            {"symbol": symbol, "id": i, "orderId": i, "price": str(self._price(symbol)), "qty": "1.00000000",
+             "quoteQty": str(self._price(symbol)), "commission": "0.001", "commissionAsset": "USDT",
+             "time": now - (self.trades_per_symbol - i) * 60000, "isBuyer": i % 3 != 2, "isMaker": False}
+            for i in range(self.trades_per_symbol)
+        ]
+        if "fromId" in params:
+            trades = [t for t in trades if t["id"] >= int(params["fromId"])]
+        elif "startTime" in params:
+            trades = [t for t in trades if t["time"] >= int(params["startTime"])]
+        return trades[:int(params.get("limit", 500))]
+
+    def _route(self, method):
+        time.sleep(self.latency)
+        path = urlparse(self.path).path
+        params, _ = self._params()
+        headers = {"X-MBX-USED-WEIGHT-1M": "1", "X-MBX-ORDER-COUNT-10S": "1"}
+        if path == "/api/v3/ping":
+            return self._send_json({}, headers=headers)
+        if path == "/api/v3/time":
+            return self._send_json({"serverTime": int(time.time() * 1000)}, headers=headers)
+        if path == "/api/v3/exchangeInfo":
+            return self._send_json(self._exchange_info(), headers=headers)
+        if path in ("/api/v3/ticker/24hr", "/api/v3/ticker/price", "/api/v3/ticker/bookTicker"):
+            symbols = [params["symbol"]] if "symbol" in params else self._symbols()
+            tickers = [self._ticker(s) for s in symbols]
+            if path.endswith("/price"):
+                tickers = [{"symbol": t["symbol"], "price": t["lastPrice"]} for t in tickers]
+            elif path.endswith("/bookTicker"):
+                tickers = [{"symbol": t["symbol"], "bidPrice": t["bidPrice"], "bidQty": "100",
+                            "askPrice": t["askPrice"], "askQty": "100"} for t in tickers]
+            return self._send_json(tickers[0] if "symbol" in params else tickers, headers=headers)
+        if path == "/api/v3/klines":
+            klines = self._klines(params["symbol"], params.get("interval", "1h"), int(params.get("limit", 500)))
+            return self._send_json(klines, headers=headers)
+        if path in ("/api/v3/order", "/api/v3/order/test") and method == "POST":
+            price = self._price(params.get("symbol", ""))
+            return self._send_json({
+                "symbol": params.get("symbol"), "orderId": random.randint(1, 10 ** 9), "status": "FILLED",
+                "side": params.get("side"), "type": params.get("type"), "executedQty": params.get("quantity"),
+                "fills": [{"price": str(price), "qty": params.get("quantity"), "commission": "0", "commissionAsset": "USDT"}],
+            }, headers=headers)
+        if path == "/api/v3/myTrades":
+            return self._send_json(self._my_trades(params["symbol"], params), headers=headers)
+        if path == "/api/v3/account":
+            balances = [{"asset": "USDT", "free": "10000.0", "locked": "0.0"}]
+            balances += [{"asset": f"SYM{i}", "free": "5.0", "locked": "0.0"} for i in range(self.held_assets)]
+            return self._send_json({"balances": balances, "canTrade": True}, headers=headers)
+        return self._send_json({"code": -1100, "msg": f"Route inconnue {path}"}, status=404)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+
+class OllamaHandler(_JSONHandler):
+    """
+    API Ollama simulée (/api/version, /api/tags, /api/generate, /api/chat).
+
+    La réponse dépend du prompt : JSON de décisions pour un lot, symbole pour
+    l'agent de sélection, format « Final Answer » pour CrewAI, sinon HOLD.
+    """
+
+    think = "<think>Analyse des indicateurs en cours.</think>\n"
+    token_delay = 0.0
+
+    def _answer(self, prompt):
+        if "Final Answer" in prompt:
+            return "Thought: J'ai analysé le signal.\nFinal Answer: HOLD"
+        if "JSON" in prompt:
+            symbols = sorted(set(re.findall(r"- ([A-Z0-9]+USDT):", prompt)))
+            return self.think + json.dumps({s: "BUY" if i % 2 == 0 else "HOLD" for i, s in enumerate(symbols)})
+        symbols = re.findall(r"([A-Z0-9]+USDT):", prompt)
+        if symbols:
+            return self.think + symbols[0]
+        return self.think + "HOLD"
+
+    def _stream(self, chunks, wrap):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, chunk in enumerate(chunks):
+            line = (json.dumps(wrap(chunk, i == len(chunks) - 1)) + "\n").encode("utf-8")
+            try:
+                self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return  # Le client a interrompu la génération
+            time.sleep(self.token_delay)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/api/version":
+            return self._send_json({"version": "0.0.0-mock"})
+        if path == "/api/tags":
+            return self._send_json({"models": [{"name": "deepseek-r1:14b"}, {"name": "deepseek-r1:1.5b"}]})
+        return self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        time.sleep(self.latency)
+        path = urlparse(self.path).path
+        _, body = self._params()
+        body = body or {}
+        if path == "/api/generate":
+            text = self._answer(body.get("prompt", "")) if body.get("prompt") else ""
+            if body.get("stream", True):
+                chunks = re.findall(r"\S+\s*", text) or [""]
+                return self._stream(chunks, lambda c, last: {"model": body.get("model"), "response": c, "done": last})
+            return self._send_json({"model": body.get("model"), "response": text, "done": True,
+                                    "eval_count": len(text.split())})
+        if path == "/api/chat":
+            prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+            text = self._answer(prompt)
+            if body.get("stream", True):
+                chunks = re.findall(r"\S+\s*", text) or [""]
+                return self._stream(chunks, lambda c, last: {"model": body.get("model"),
+                                                             "message": {"role": "assistant", "content": c}, "done": last})
+            return self._send_json({"model": body.get("model"), "message": {"role": "assistant", "content": text},
+                                    "done": True, "eval_count": len(text.split())})
+        return self._send_json({"error": "not found"}, status=404)
+
+
+class TelegramHandler(_JSONHandler):
+    """ API Bot Telegram simulée (sendMessage) ; les textes reçus sont ajoutés à `received`. """
+
+    received = None
+
+    def do_POST(self):
+        time.sleep(self.latency)
+        params, body = self._params()
+        if not urlparse(self.path).path.endswith("/sendMessage"):
+            return self._send_json({"ok": False, "description": "Not Found"}, status=404)
+        self.received.append((body or params).get("text", ""))
+        return self._send_json({"ok": True, "result": {"message_id": len(self.received)}})
+
+
+def binance_server(latency=0.0, n_symbols=400, **settings):
+    return MockServer(BinanceHandler, latency=latency, n_symbols=n_symbols, **settings)
+
+
+def ollama_server(latency=0.0, token_delay=0.0, **settings):
+    return MockServer(OllamaHandler, latency=latency, token_delay=token_delay, **settings)
+
+
+def telegram_server(latency=0.0, received=None, **settings):
+    """ :param received: Liste qui recevra le texte de chaque message envoyé """
+    return MockServer(TelegramHandler, latency=latency, received=received if received is not None else [], **settings)
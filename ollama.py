@@ -1,12 +1,55 @@
 import os
+import sys
+import json
 import time
-import psutil
 import subprocess
 import shutil
 import platform
+import threading
+import urllib.request
+
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+
+def is_ollama_ready(base_url=OLLAMA_URL, timeout=0.5):
+    """ Vérifie que l'API HTTP d'Ollama répond """
+    try:
+        with urllib.request.urlopen(f"{base_url}/api/version", timeout=timeout) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+def wait_for_ollama(base_url=OLLAMA_URL, timeout=30, interval=0.1):
+    """ Attend (polling court) que l'API d'Ollama soit prête """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if is_ollama_ready(base_url, timeout=interval * 5):
+            return True
+        time.sleep(interval)
+    return False
+
+def preload_model(model, base_url=OLLAMA_URL, keep_alive="30m", background=True):
+    """ Charge le modèle en mémoire (requête vide) pour que la première inférence soit immédiate """
+    def load():
+        payload = json.dumps({"model": model, "keep_alive": keep_alive}).encode("utf-8")
+        request = urllib.request.Request(
+            f"{base_url}/api/generate", data=payload, headers={"Content-Type": "application/json"}
+        )
+        try:
+            urllib.request.urlopen(request, timeout=300).close()
+        except OSError as e:
+            print(f"\033[93m[AVERTISSEMENT]\033[0m Préchargement du modèle {model} impossible : {e}")
+
+    if not background:
+        load()
+        return None
+    thread = threading.Thread(target=load, name="ollama-preload", daemon=True)
+    thread.start()
+    return thread
 
 def is_ollama_running():
-    """ Vérifie si Ollama est déjà en cours d'exécution """
+    """ Vérifie si un processus Ollama est déjà en cours d'exécution """
+    import psutil
+
     for process in psutil.process_iter(attrs=["pid", "name"]):
         if "ollama" in process.info["name"].lower():
             return True
@@ -16,8 +59,11 @@ def is_wsl():
     """ Vérifie si l'exécution se fait dans WSL """
     return 'microsoft' in platform.uname().release.lower()
 
-def start_ollama():
-    """ Démarre Ollama dans un nouveau terminal ou en arrière-plan """
+def start_ollama(base_url=OLLAMA_URL, timeout=30):
+    """ Démarre Ollama dans un nouveau terminal ou en arrière-plan, puis attend qu'il soit prêt """
+    if is_ollama_ready(base_url):
+        return True
+
     if not is_ollama_running():
         print("\033[92m[INFO]\033[0m Démarrage du serveur Ollama...")
 
@@ -31,8 +77,7 @@ def start_ollama():
                 print("\033[93m[AVERTISSEMENT]\033[0m Impossible d'ouvrir un terminal. Démarrage en arrière-plan...")
                 subprocess.Popen(["ollama", "serve"])
             
-            time.sleep(3)
-            return
+            return wait_for_ollama(base_url, timeout)
 
         # Gestion pour Windows natif, macOS et Linux
         terminal_command = []
@@ -56,9 +101,14 @@ def start_ollama():
 
         if terminal_command:
             subprocess.Popen(terminal_command)
-            time.sleep(3)
         else:
             print("\033[91m[ERREUR]\033[0m Aucun terminal compatible trouvé.")
+            return False
+
+    return wait_for_ollama(base_url, timeout)
 
 if __name__ == "__main__":
+    if "--check" in sys.argv:
+        # Sonde de disponibilité rapide (code de sortie 0 si Ollama répond)
+        sys.exit(0 if is_ollama_ready() else 1)
     start_ollama()
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""
+Chemin d'ordre à faible latence.
+
+Les contraintes LOT_SIZE / NOTIONAL de chaque symbole sont converties une
+fois pour toutes en Decimal (quantités exactes, jamais rejetées pour un pas
+invalide) et le meilleur bid/ask est tenu à jour par le flux bookTicker : un
+ordre part alors en un seul appel REST, sans get_symbol_info ni
+get_symbol_ticker préalable.
+"""
+import time
+import threading
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+
+DEFAULT_MAX_AGE = 10.0  # secondes avant qu'une cotation soit considérée périmée
+
+
+def to_decimal(value):
+    """ Decimal exact d'un nombre issu de exchangeInfo (float ou chaîne). """
+    return None if value is None else Decimal(str(value))
+
+
+class OrderQuantizer:
+    """
+    Arrondis exacts d'un symbole, pré-calculés depuis ses filtres.
+
+    :param filters: SymbolFilters du registre des symboles
+    """
+
+    __slots__ = ("symbol", "min_qty", "max_qty", "step_size", "min_notional", "tick_size")
+
+    def __init__(self, filters):
+        self.symbol = filters.symbol
+        self.min_qty = to_decimal(filters.min_qty) or Decimal(0)
+        self.max_qty = to_decimal(filters.max_qty)
+        self.step_size = to_decimal(filters.step_size) or Decimal(0)
+        self.min_notional = to_decimal(filters.min_notional) or Decimal(0)
+        self.tick_size = to_decimal(filters.tick_size) or Decimal(0)
+
+    def _to_step(self, quantity, rounding):
+        if not self.step_size:
+            return quantity
+        steps = (quantity / self.step_size).to_integral_value(rounding=rounding)
+        return (steps * self.step_size).quantize(self.step_size)
+
+    def floor_quantity(self, quantity):
+        """ Quantité arrondie au pas inférieur. """
+        return self._to_step(Decimal(quantity), ROUND_FLOOR)
+
+    def ceil_quantity(self, quantity):
+        """ Quantité arrondie au pas supérieur. """
+        return self._to_step(Decimal(quantity), ROUND_CEILING)
+
+    def round_price(self, price):
+        """ Prix arrondi au tick inférieur (PRICE_FILTER), pour les ordres LIMIT. """
+        price = Decimal(price)
+        if not self.tick_size:
+            return price
+        ticks = (price / self.tick_size).to_integral_value(rounding=ROUND_FLOOR)
+        return (ticks * self.tick_size).quantize(self.tick_size)
+
+    def min_quantity(self, price, buffer=Decimal("0.01")):
+        """
+        Plus petite quantité valide dont la valeur couvre NOTIONAL au prix donné.
+
+        :param price: Prix de référence (ask pour un achat, bid pour une vente)
+        :param buffer: Marge relative sur le notional (glissement d'un ordre MARKET)
+        :raises ValueError: Si la quantité nécessaire dépasse maxQty
+        """
+        price = Decimal(price)
+        if price <= 0:
+            raise ValueError(f"Prix invalide pour {self.symbol} : {price}")
+        needed = self.min_notional * (1 + Decimal(buffer)) / price
+        quantity = self.ceil_quantity(max(needed, self.min_qty))
+        if self.max_qty and quantity > self.max_qty:
+            raise ValueError(f"Quantité {quantity} supérieure à maxQty {self.max_qty} pour {self.symbol}")
+        return quantity
+
+    def validate(self, quantity, price):
+        """ Vérifie qu'une quantité respecte LOT_SIZE et NOTIONAL ; lève ValueError sinon. """
+        quantity, price = Decimal(quantity), Decimal(price)
+        if quantity < self.min_qty or (self.max_qty and quantity > self.max_qty):
+            raise ValueError(f"Quantité {quantity} hors de [{self.min_qty}, {self.max_qty}] pour {self.symbol}")
+        if self.step_size and (quantity - self.min_qty) % self.step_size:
+            raise ValueError(f"Quantité {quantity} non multiple du pas {self.step_size} pour {self.symbol}")
+        if quantity * price < self.min_notional:
+            raise ValueError(f"Valeur {quantity * price} inférieure au minimum {self.min_notional} pour {self.symbol}")
+        return quantity
+
+
+def format_decimal(value):
+    """ Représentation décimale sans notation scientifique, attendue par l'API. """
+    return format(value.normalize(), "f")
+
+
+class BookTickerCache:
+    """
+    Meilleurs bid/ask par symbole, alimentés par le flux bookTicker.
+
+    :param max_age: Âge maximum (s) d'une cotation utilisable
+    """
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE):
+        self.max_age = max_age
+        self.quotes = {}
+        self.manager = None
+        self.streamed = set()
+        self.sockets = []  # Noms des sockets multiplexées ouvertes
+        self._lock = threading.Lock()
+
+    def update(self, symbol, bid, ask, timestamp=None):
+        with self._lock:
+            self.quotes[symbol] = (Decimal(str(bid)), Decimal(str(ask)), timestamp or time.time())
+
+    def on_message(self, message):
+        """ Traite un événement bookTicker brut (flux simple ou multiplexé). """
+        data = message.get("data", message)
+        if "s" not in data or "b" not in data:
+            return
+        self.update(data["s"], data["b"], data["a"])
+
+    def warm(self, tickers):
+        """
+        Pré-remplit le cache depuis une réponse REST (ticker/bookTicker ou ticker/24hr).
+
+        :param tickers: Liste de dictionnaires contenant symbol, bidPrice et askPrice
+        """
+        now = time.time()
+        with self._lock:
+            for t in tickers:
+                if t.get("bidPrice") and t.get("askPrice"):
+                    self.quotes[t["symbol"]] = (Decimal(t["bidPrice"]), Decimal(t["askPrice"]), now)
+
+    def get(self, symbol):
+        """ (bid, ask) si la cotation est fraîche, sinon None. """
+        quote = self.quotes.get(symbol)
+        if quote is None or time.time() - quote[2] > self.max_age:
+            return None
+        return quote[0], quote[1]
+
+    def start_stream(self, symbols, api_key=None, api_secret=None, testnet=False):
+        """
+        Suit le flux bookTicker des symboles donnés, et d'eux seuls.
+
+        Le flux multiplexé est fermé puis rouvert quand la liste change, au
+        lieu d'empiler une socket par nouvelle liste de candidats.
+        """
+        from binance import ThreadedWebsocketManager
+
+        symbols = set(symbols)
+        if self.manager is not None and symbols == self.streamed:
+            return self.manager
+        if self.manager is None:
+            self.manager = ThreadedWebsocketManager(api_key=api_key, api_secret=api_secret, testnet=testnet)
+            self.manager.start()
+        for name in self.sockets:
+            self.manager.stop_socket(name)
+        self.streamed = symbols
+        streams = [f"{symbol.lower()}@bookTicker" for symbol in sorted(symbols)]
+        self.sockets = [
+            self.manager.start_multiplex_socket(callback=self.on_message, streams=streams[i:i + 200])
+            for i in range(0, len(streams), 200)
+        ]
+        return self.manager
+
+    def stop(self):
+        if self.manager is not None:
+            self.manager.stop()
+            self.manager = None
+            self.streamed = set()
+            self.sockets = []
+
+
+class OrderPreparer:
+    """
+    Prépare des ordres MARKET pré-validés à partir du registre et des cotations.
+
+    :param registry: SymbolRegistry
+    :param book: BookTickerCache (None pour un cache vide)
+    """
+
+    def __init__(self, registry, book=None):
+        self.registry = registry
+        self.book = book or BookTickerCache()
+        self._quantizers = {}
+
+    def quantizer(self, symbol):
+        quantizer = self._quantizers.get(symbol)
+        if quantizer is None:
+            filters = self.registry.get(symbol)
+            if filters is None:
+                raise ValueError(f"Symbole inconnu : {symbol}")
+            quantizer = self._quantizers[symbol] = OrderQuantizer(filters)
+        return quantizer
+
+    def precompute(self, symbols):
+        """ Construit à l'avance les arrondis des symboles candidats. """
+        for symbol in symbols:
+            self.quantizer(symbol)
+
+    def market_order(self, symbol, side, price=None):
+        """
+        Paramètres de create_order pour la plus petite quantité valide.
+
+        :param side: "BUY" (valorisé à l'ask) ou "SELL" (valorisé au bid)
+        :param price: Prix de référence ; par défaut la cotation en cache
+        :return: (paramètres de create_order, prix de référence) ou None si aucune cotation fraîche
+        :raises ValueError: Si aucune quantité ne respecte LOT_SIZE / NOTIONAL à ce prix
+        """
+        if price is None:
+            quote = self.book.get(symbol)
+            if quote is None:
+                return None
+            price = quote[1] if side == "BUY" else quote[0]
+        quantizer = self.quantizer(symbol)
+        quantity = quantizer.validate(quantizer.min_quantity(price), price)
+        params = {"symbol": symbol, "side": side, "type": "MARKET", "quantity": format_decimal(quantity)}
+        return params, Decimal(str(price))
@@ -0,0 +1,216 @@
+"""
+PnL réalisé et latent de l'historique des transactions, en passes vectorisées.
+
+Les transactions sont chargées en colonnes NumPy, triées par symbole puis
+par date. Le coût FIFO découle des cumuls : la courbe (quantité achetée
+cumulée -> coût cumulé) est linéaire par morceaux, et le coût des unités
+vendues entre deux cumuls de ventes est la différence de deux
+interpolations (np.interp). Tous les symboles tiennent dans une seule
+courbe : chacun occupe son propre intervalle d'abscisses, quantités et
+coûts étant normalisés par symbole pour garder la précision quand
+BTC et SHIB se côtoient.
+
+Les commissions payées en actif de base sont intégrées aux quantités
+(reçu = qty - commission à l'achat, consommé = qty + commission à la
+vente). Les autres (cotation, BNB...) sont valorisées dans l'actif de
+cotation et déduites du PnL réalisé. Les ventes sans achat connu (dépôt,
+historique tronqué) puisent dans un stock d'ouverture sans coût connu :
+elles sont comptées dans `unmatched` et exclues du PnL.
+"""
+import numpy as np
+
+QUOTE_ASSETS = ("USDT", "FDUSD", "USDC", "BUSD", "TUSD", "DAI", "EUR", "TRY", "BRL", "BTC", "ETH", "BNB")
+
+FILL_DTYPE = np.dtype([
+    ("symbol", "U20"), ("id", np.int64), ("time", np.int64), ("price", np.float64), ("qty", np.float64),
+    ("quote_qty", np.float64), ("commission", np.float64), ("commission_asset", "U12"), ("is_buyer", bool),
+])
+_FILL_COLUMNS = ("symbol", "id", "time", "price", "qty", "quote_qty", "commission",
+                 "COALESCE(commission_asset, '')", "is_buyer")
+_ARRAYS = ("time", "price", "qty", "quote_qty", "commission", "commission_asset", "is_buyer")
+QTY_TOLERANCE = 1e-9  # Relative aux volumes du symbole : en deçà, simple bruit d'arrondi des cumuls
+
+
+def split_symbol(symbol, registry=None):
+    """ (actif de base, actif de cotation) via le registre, sinon par suffixe connu. """
+    info = registry.get(symbol) if registry is not None else None
+    if info is not None:
+        return info.base_asset, info.quote_asset
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    return symbol, ""
+
+
+class Fills:
+    """
+    Transactions en colonnes NumPy, triées par symbole, date puis identifiant.
+
+    :param records: Tableau structuré de type FILL_DTYPE, dans n'importe quel ordre
+    :param registry: SymbolRegistry optionnel pour séparer actifs de base et de cotation
+    """
+
+    def __init__(self, records, registry=None):
+        # Tri NumPy plutôt que SQL ; lignes contiguës par symbole : un segment par symbole
+        self.symbols, codes = np.unique(records["symbol"], return_inverse=True)
+        order = np.lexsort((records["id"], records["time"], codes))
+        records = records[order]
+        self.sid = codes[order]
+        self.starts = np.searchsorted(self.sid, np.arange(len(self.symbols)))
+        for name in _ARRAYS:
+            setattr(self, name, records[name])
+        # Anciennes lignes sans quoteQty : recalculé depuis prix × quantité
+        self.quote_qty = np.where(self.quote_qty > 0, self.quote_qty, self.price * self.qty)
+        pairs = [split_symbol(str(symbol), registry) for symbol in self.symbols]
+        self.base = np.array([base for base, _ in pairs], dtype=str)
+        self.quote = np.array([quote for _, quote in pairs], dtype=str)
+
+    @classmethod
+    def from_store(cls, store, until=None, symbol=None, registry=None):
+        """ Toutes les transactions d'un TradeStore antérieures à `until` (le coût FIFO exige tout l'historique). """
+        rows = store.select(_FILL_COLUMNS, until=until, symbol=symbol, ordered=False)
+        return cls(np.fromiter(rows, dtype=FILL_DTYPE, count=len(rows)), registry)
+
+    @classmethod
+    def from_trades(cls, trades, registry=None):
+        """ Transactions au format de l'API (get_my_trades ou TradeStore.trades). """
+        records = np.array([
+            (t["symbol"], t.get("id", 0), t["time"], float(t["price"]), float(t["qty"]), float(t.get("quoteQty", 0)),
+             float(t.get("commission", 0)), t.get("commissionAsset") or "", bool(t["isBuyer"]))
+            for t in trades
+        ], dtype=FILL_DTYPE)
+        return cls(records, registry)
+
+    def take(self, mask):
+        """ Sous-ensemble des transactions (masque booléen), segments recalculés. """
+        subset = object.__new__(Fills)
+        for name in _ARRAYS:
+            setattr(subset, name, getattr(self, name)[mask])
+        kept, subset.starts, subset.sid = np.unique(self.sid[mask], return_index=True, return_inverse=True)
+        subset.symbols, subset.base, subset.quote = self.symbols[kept], self.base[kept], self.quote[kept]
+        return subset
+
+    def __len__(self):
+        return len(self.time)
+
+
+def _segment_cumsum(values, sid, starts, scale):
+    """ Cumul par segment de values / scale, sans la perte de précision d'un cumul global brut. """
+    cum = np.cumsum(values / scale[sid])
+    before = (cum - values / scale[sid])[starts]
+    return cum - before[sid]
+
+
+def compute_pnl(fills, since=None, until=None, snapshot=None):
+    """
+    PnL FIFO par symbole.
+
+    Les ventes et commissions comptent si elles tombent dans [since, until) ;
+    position, coût moyen et PnL latent sont ceux à `until`.
+    :param fills: Fills chargées jusqu'à `until` au moins (tout l'historique antérieur)
+    :param snapshot: PriceSnapshot pour les prix de marché et la valorisation des commissions
+        hors base/cotation ; sans lui, le dernier prix échangé sert de prix de marché
+    :return: {symbole: {"quote", "realized", "fees", "unrealized", "position", "avg_cost",
+        "exposure", "unmatched", "fills"}}
+    """
+    if until is not None and len(fills) and fills.time.max() >= until:
+        fills = fills.take(fills.time < until)
+    n_sym = len(fills.symbols)
+    if not n_sym:
+        return {}
+    sid, starts = fills.sid, fills.starts
+    buy = fills.is_buyer
+    base_fee = fills.commission_asset == fills.base[sid]
+    quote_fee = fills.commission_asset == fills.quote[sid]
+    embedded = np.where(base_fee, fills.commission, 0.0)
+    qty_in = np.where(buy, fills.qty - embedded, 0.0)
+    qty_out = np.where(buy, 0.0, fills.qty + embedded)
+    cost_in = np.where(buy, fills.quote_qty, 0.0)
+
+    # Normalisation par symbole : quantités dans [0, 1] de max(achats, ventes), coûts dans [0, 1]
+    bought = np.add.reduceat(qty_in, starts)
+    sold = np.add.reduceat(qty_out, starts)
+    scale = np.maximum(np.maximum(bought, sold), np.finfo(float).tiny)
+    cost_total = np.add.reduceat(cost_in, starts)
+    cost_scale = np.where(cost_total > 0, cost_total, 1.0)
+    cum_in = _segment_cumsum(qty_in, sid, starts, scale)
+    cum_out = _segment_cumsum(qty_out, sid, starts, scale)
+    cum_cost = _segment_cumsum(cost_in, sid, starts, cost_scale)
+
+    # Stock d'ouverture minimal pour qu'aucune vente ne dépasse les achats connus
+    opening = np.maximum(np.maximum.reduceat(cum_out - cum_in, starts), 0.0)
+    matched_after = np.maximum(cum_out - opening[sid], 0.0)
+    matched_before = np.maximum(cum_out - qty_out / scale[sid] - opening[sid], 0.0)
+
+    # Courbe FIFO globale : le symbole s occupe [2s, 2s + 1], amorcé au point (2s, 0)
+    xp = np.concatenate([2.0 * np.arange(n_sym), 2.0 * sid + cum_in])
+    fp = np.concatenate([np.zeros(n_sym), cum_cost])
+    order = np.argsort(xp, kind="stable")
+    xp, fp = xp[order], fp[order]
+
+    def fifo_cost(matched, segment):
+        return np.interp(2.0 * segment + matched, xp, fp) * cost_scale[segment]
+
+    matched = (matched_after - matched_before) * scale[sid]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(qty_out > 0, matched / qty_out, 0.0)
+    realized = np.where(buy, 0.0, share * fills.quote_qty - (fifo_cost(matched_after, sid) - fifo_cost(matched_before, sid)))
+    unmatched = qty_out - matched
+    unmatched = np.where(np.abs(unmatched) < QTY_TOLERANCE * scale[sid], 0.0, unmatched)
+
+    # Commissions en actif de cotation : valeur directe ; autres actifs : prix de l'instantané
+    fee_value = np.where(quote_fee, fills.commission, np.where(base_fee, fills.commission * fills.price, np.nan))
+    other = ~(quote_fee | base_fee) & (fills.commission > 0)
+    if other.any():
+        fee_prices = (snapshot.lookup(np.char.add(fills.commission_asset[other], fills.quote[sid[other]]))
+                      if snapshot is not None else np.nan)
+        fee_value[other] = fills.commission[other] * fee_prices
+    fee_value = np.where(fills.commission > 0, fee_value, 0.0)
+    # Les commissions en base sont déjà dans les quantités : seules les autres s'imputent au réalisé
+    realized = realized - np.where(base_fee, 0.0, np.nan_to_num(fee_value))
+
+    window = np.ones(len(fills), dtype=bool) if since is None else fills.time >= since
+    realized_sym = np.bincount(sid[window], realized[window], minlength=n_sym)
+    fees_sym = np.bincount(sid[window], np.nan_to_num(fee_value)[window], minlength=n_sym)
+    unmatched_sym = np.bincount(sid[window], unmatched[window], minlength=n_sym)
+    unmatched_sym = np.where(np.abs(unmatched_sym) < QTY_TOLERANCE * scale, 0.0, unmatched_sym)
+    fills_sym = np.bincount(sid[window], minlength=n_sym)
+
+    # Lots restants : les derniers achats, au-delà de ce que les ventes ont consommé
+    segments = np.arange(n_sym)
+    final_matched = np.maximum(sold / scale - opening, 0.0)
+    position = np.maximum(bought / scale - final_matched, 0.0) * scale
+    position = np.where(position < QTY_TOLERANCE * scale, 0.0, position)
+    remaining_cost = cost_total - fifo_cost(final_matched, segments)
+    last_price = fills.price[np.r_[starts[1:], len(fills)] - 1]
+    marks = snapshot.lookup(fills.symbols) if snapshot is not None else last_price
+    marks = np.where(np.isnan(marks), last_price, marks)
+    exposure = position * marks
+    unrealized = np.where(position > 0, exposure - remaining_cost, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_cost = np.where(position > 0, remaining_cost / position, np.nan)
+
+    return {
+        str(symbol): {
+            "quote": str(fills.quote[i]),
+            "realized": float(realized_sym[i]),
+            "fees": float(fees_sym[i]),
+            "unrealized": float(unrealized[i]),
+            "position": float(position[i]),
+            "avg_cost": float(avg_cost[i]),
+            "exposure": float(exposure[i]),
+            "unmatched": float(unmatched_sym[i]),
+            "fills": int(fills_sym[i]),
+        }
+        for i, symbol in enumerate(fills.symbols)
+    }
+
+
+def totals(report):
+    """ Sommes par actif de cotation : {cotation: {"realized", "fees", "unrealized", "exposure"}}. """
+    result = {}
+    for row in report.values():
+        total = result.setdefault(row["quote"], dict.fromkeys(("realized", "fees", "unrealized", "exposure"), 0.0))
+        for name in total:
+            total[name] += row[name]
+    return result
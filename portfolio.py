@@ -0,0 +1,174 @@
+"""
+Portefeuille tenu à jour par le flux de données utilisateur Binance.
+
+Les soldes sont initialisés par un seul get_account(), puis entretenus par
+les événements outboundAccountPosition / balanceUpdate / executionReport :
+une requête de portefeuille devient une lecture locale. Un nouvel appel
+REST n'a lieu qu'en cas de trou dans le flux (erreur, reconnexion, exécution
+non suivie de sa mise à jour de solde). La valorisation en USDT se fait en
+une passe vectorisée contre un seul instantané de prix.
+"""
+import time
+import threading
+
+import numpy as np
+
+STABLECOINS = frozenset({"USDT", "BUSD", "USDC", "TUSD", "FDUSD", "PAX"})
+DEFAULT_GAP_TIMEOUT = 5.0  # secondes entre une exécution et sa mise à jour de solde
+
+
+class PriceSnapshot:
+    """
+    Prix de tous les symboles issus d'un seul appel get_all_tickers().
+
+    :param tickers: Liste de {"symbol": ..., "price": ...}
+    """
+
+    def __init__(self, tickers):
+        symbols = np.array([t["symbol"] for t in tickers], dtype=str)
+        prices = np.array([t["price"] for t in tickers], dtype=np.float64)
+        order = np.argsort(symbols)
+        self.symbols = symbols[order]
+        self.prices = prices[order]
+
+    def lookup(self, symbols):
+        """ Prix des symboles demandés (NaN si absents), par recherche dichotomique vectorisée. """
+        symbols = np.asarray(symbols, dtype=str)
+        if not len(self.symbols) or not len(symbols):
+            return np.full(len(symbols), np.nan)
+        index = np.searchsorted(self.symbols, symbols).clip(max=len(self.symbols) - 1)
+        found = self.symbols[index] == symbols
+        return np.where(found, self.prices[index], np.nan)
+
+    def asset_prices(self, assets, quote="USDT", bridge="BTC"):
+        """
+        Prix en `quote` de chaque actif : paire directe, sinon via `bridge`.
+
+        Les stablecoins valent 1 et les actifs sans cotation NaN.
+        """
+        assets = np.asarray(assets, dtype=str)
+        prices = self.lookup(np.char.add(assets, quote))
+        missing = np.isnan(prices)
+        if missing.any():
+            via_bridge = self.lookup(np.char.add(assets[missing], bridge)) * self.lookup([bridge + quote])[0]
+            prices[missing] = via_bridge
+        prices[np.isin(assets, list(STABLECOINS)) | (assets == quote)] = 1.0
+        return prices
+
+
+class Portfolio:
+    """
+    Soldes du compte entretenus par le flux utilisateur.
+
+    :param client: Client Binance (resynchronisation REST uniquement)
+    :param gap_timeout: Délai (s) au-delà duquel une exécution sans mise à jour de solde déclenche une resynchronisation
+    """
+
+    def __init__(self, client=None, gap_timeout=DEFAULT_GAP_TIMEOUT):
+        self.client = client
+        self.gap_timeout = gap_timeout
+        self.balances = {}
+        self.updated_at = {}
+        self.executions = {}
+        self.resyncs = 0
+        self.stale = True
+        self.manager = None
+        self._pending_fills = {}
+        self._lock = threading.Lock()
+
+    def resync(self):
+        """ Recharge tous les soldes via get_account() (seul appel signé). """
+        account = self.client.get_account()
+        update_time = account.get("updateTime", int(time.time() * 1000))
+        with self._lock:
+            self.balances = {
+                b["asset"]: (float(b["free"]), float(b["locked"]))
+                for b in account.get("balances", [])
+                if float(b["free"]) or float(b["locked"])
+            }
+            self.updated_at = dict.fromkeys(self.balances, update_time)
+            self._pending_fills.clear()
+            self.stale = False
+            self.resyncs += 1
+
+    def streaming(self):
+        """ Vrai si le flux utilisateur tourne ; sinon les soldes ne sont pas entretenus. """
+        return self.manager is not None and self.manager.is_alive()
+
+    def ensure_fresh(self):
+        """ Resynchronise si le flux est arrêté ou a pu manquer des événements. """
+        now = time.monotonic()
+        if self.stale or not self.streaming() or any(now - t > self.gap_timeout for t in self._pending_fills.values()):
+            self.resync()
+
+    def on_message(self, message):
+        """ Traite un événement brut du flux de données utilisateur. """
+        kind = message.get("e")
+        with self._lock:
+            if kind == "outboundAccountPosition":
+                update_time = message.get("u", message.get("E", 0))
+                for b in message.get("B", []):
+                    asset = b["a"]
+                    if update_time < self.updated_at.get(asset, 0):
+                        continue  # Événement plus ancien que l'état connu
+                    free, locked = float(b["f"]), float(b["l"])
+                    if free or locked:
+                        self.balances[asset] = (free, locked)
+                    else:
+                        self.balances.pop(asset, None)
+                    self.updated_at[asset] = update_time
+                self._pending_fills.clear()
+            elif kind == "balanceUpdate":
+                asset, delta, clear_time = message["a"], float(message["d"]), message.get("T", message.get("E", 0))
+                if clear_time > self.updated_at.get(asset, 0):
+                    free, locked = self.balances.get(asset, (0.0, 0.0))
+                    self.balances[asset] = (free + delta, locked)
+                    self.updated_at[asset] = clear_time
+            elif kind == "executionReport":
+                self.executions[message["i"]] = {
+                    "symbol": message["s"], "side": message["S"], "status": message["X"],
+                    "filled": float(message["z"]), "quote_filled": float(message.get("Z", 0)),
+                }
+                if message.get("x") == "TRADE":
+                    # Le solde doit suivre ; sans lui avant gap_timeout, on resynchronise
+                    self._pending_fills[message["i"]] = time.monotonic()
+            elif kind == "error":
+                self.stale = True
+
+    def totals(self):
+        """ (actifs, quantités totales libres + bloquées) en tableaux NumPy. """
+        with self._lock:
+            assets = list(self.balances)
+            totals = np.array([free + locked for free, locked in self.balances.values()], dtype=np.float64)
+        return np.array(assets, dtype=str), totals
+
+    def valuation(self, snapshot, quote="USDT"):
+        """
+        Valeur de chaque actif en `quote`, triée par valeur décroissante.
+
+        :param snapshot: PriceSnapshot
+        :return: (liste de (actif, quantité, prix, valeur), valeur totale) ; prix et valeur NaN si non coté
+        """
+        assets, totals = self.totals()
+        prices = snapshot.asset_prices(assets, quote)
+        values = totals * prices
+        order = np.argsort(-np.nan_to_num(values, nan=-1.0))
+        rows = [(str(assets[i]), float(totals[i]), float(prices[i]), float(values[i])) for i in order]
+        return rows, float(np.nansum(values))
+
+    def start_stream(self, api_key=None, api_secret=None, testnet=False):
+        """ Démarre le flux de données utilisateur ; les soldes initiaux viennent de resync(). """
+        from binance import ThreadedWebsocketManager
+
+        self.manager = ThreadedWebsocketManager(api_key=api_key, api_secret=api_secret, testnet=testnet)
+        self.manager.start()
+        self.manager.start_user_socket(callback=self.on_message)
+        # Les événements arrivés avant la fin du resync sont ignorés grâce aux horodatages
+        self.resync()
+        return self.manager
+
+    def stop(self):
+        if self.manager is not None:
+            self.manager.stop()
+            self.manager = None
+        self.stale = True
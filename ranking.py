@@ -0,0 +1,112 @@
+"""
+Classement des candidats à partir des tickers 24h.
+
+Les tickers de l'univers USDT sont stockés dans un instantané compact en
+colonnes NumPy, notés (volume en quote, variation, volatilité, spread) puis
+les K meilleurs sont extraits par un tas.
+"""
+import heapq
+
+import numpy as np
+
+DEFAULT_WEIGHTS = {"liquidity": 1.0, "momentum": 1.0, "volatility": 0.5, "spread": 1.0}
+CHANGE_BAND = 1.0  # Points de variation 24h par tranche
+VOLUME_BAND = 0.5  # Tranche de log10 du volume en quote
+
+
+def _zscore(values):
+    std = values.std()
+    return (values - values.mean()) / std if std > 0 else np.zeros_like(values)
+
+
+class MarketSnapshot:
+    """
+    Instantané des tickers 24h sous forme de colonnes.
+
+    :param tickers: Réponse brute de client.get_ticker()
+    :param symbols: Symboles à conserver (ensemble ou liste), None pour tous
+    """
+
+    def __init__(self, tickers, symbols=None):
+        wanted = set(symbols) if symbols is not None else None
+        rows = [t for t in tickers if wanted is None or t["symbol"] in wanted]
+        self.symbols = [t["symbol"] for t in rows]
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        def column(name):
+            return np.array([t.get(name) or 0 for t in rows], dtype=np.float64)
+
+        self.price = column("lastPrice")
+        self.volume = column("volume")
+        self.quote_volume = column("quoteVolume")
+        self.change_pct = column("priceChangePercent")
+        self.high = column("highPrice")
+        self.low = column("lowPrice")
+        self.bid = column("bidPrice")
+        self.ask = column("askPrice")
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def scores(self, weights=None):
+        """ Score de chaque symbole ; -inf pour les symboles sans cotation exploitable. """
+        w = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        valid = (self.price > 0) & (self.quote_volume > 0) & (self.bid > 0) & (self.ask >= self.bid)
+        scores = np.full(len(self), -np.inf)
+        if not valid.any():
+            return scores
+
+        price = self.price[valid]
+        mid = (self.bid[valid] + self.ask[valid]) / 2
+        liquidity = np.log1p(self.quote_volume[valid])
+        volatility = (self.high[valid] - self.low[valid]) / price
+        spread = (self.ask[valid] - self.bid[valid]) / mid
+        scores[valid] = (
+            w["liquidity"] * _zscore(liquidity)
+            + w["momentum"] * _zscore(self.change_pct[valid])
+            + w["volatility"] * _zscore(volatility)
+            - w["spread"] * _zscore(spread)
+        )
+        return scores
+
+    def row(self, i):
+        return {
+            "price": float(self.price[i]),
+            "volume": float(self.volume[i]),
+            "quote_volume": float(self.quote_volume[i]),
+            "change_pct": float(self.change_pct[i]),
+        }
+
+    def get(self, symbol):
+        i = self.index.get(symbol)
+        return None if i is None else self.row(i)
+
+    def top_k(self, k=10, weights=None):
+        """
+        Les K meilleurs candidats, par score décroissant.
+
+        :return: Liste de (symbole, données) avec le score dans les données
+        """
+        scores = self.scores(weights)
+        values = scores.tolist()
+        eligible = np.flatnonzero(np.isfinite(scores)).tolist()
+        best = heapq.nlargest(k, eligible, key=values.__getitem__)
+        return [(self.symbols[i], dict(self.row(i), score=values[i])) for i in best]
+
+
+def cache_snapshot(candidates, change_band=CHANGE_BAND, volume_band=VOLUME_BAND):
+    """
+    Forme stable des candidats pour la clé du cache des décisions LLM.
+
+    Le score (z-score sur tout l'univers), le prix et le volume exact
+    changent à chaque rafraîchissement : ils sont remplacés par la
+    variation 24h et l'ordre de grandeur du volume, par tranches, et les
+    symboles sont triés pour qu'une simple permutation du classement
+    retrouve la même entrée.
+    :param candidates: Dictionnaire {symbole: données} issu de top_k
+    :return: Liste de [symbole, tranche de variation, tranche de volume]
+    """
+    return [
+        [symbol, round(data["change_pct"] / change_band), round(np.log10(max(data["quote_volume"], 1.0)) / volume_band)]
+        for symbol, data in sorted(candidates.items())
+    ]
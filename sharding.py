@@ -0,0 +1,209 @@
+"""
+Répartition de l'univers de symboles sur plusieurs processus.
+
+Le calcul des indicateurs et le décodage des réponses sont limités par le
+GIL dans un seul processus. Ici, chaque processus traite un lot de
+symboles. Tous partagent un seau de jetons en mémoire partagée qui impose
+les limites globales de Binance (poids par minute, ordres par 10 s) : le
+total ne dépasse jamais la limite, quel que soit le nombre de processus.
+"""
+import os
+import math
+import time
+import multiprocessing
+
+from kline_fetcher import KlineFetcher, RequestsTransport, DEFAULT_WEIGHT_LIMIT
+
+DEFAULT_ORDER_LIMIT = 100  # Ordres par fenêtre de 10 s (limite ORDERS de Binance spot)
+
+
+class SharedBudget:
+    """
+    Budget glissant partagé entre processus, même interface que WeightBudget.
+
+    La fenêtre est découpée en tranches d'une seconde stockées dans un
+    tableau en mémoire partagée, protégé par un verrou inter-processus.
+    :param ctx: Contexte multiprocessing (celui du pool qui utilisera le budget)
+    """
+
+    def __init__(self, limit=DEFAULT_WEIGHT_LIMIT, window=60.0, safety=0.8, ctx=None):
+        ctx = ctx or multiprocessing.get_context()
+        self.capacity = int(limit * safety)
+        self.window = window
+        self.slots = int(math.ceil(window))
+        # Par tranche : [numéro de seconde, poids consommé]
+        self._buckets = ctx.Array("q", self.slots * 2, lock=False)
+        self._paused_until = ctx.Value("d", 0.0, lock=False)
+        self._lock = ctx.Lock()
+
+    def _used(self, second):
+        used = 0
+        for i in range(self.slots):
+            if second - self._buckets[2 * i] < self.slots:
+                used += self._buckets[2 * i + 1]
+        return used
+
+    def _add(self, second, weight):
+        i = (second % self.slots) * 2
+        if self._buckets[i] != second:
+            self._buckets[i] = second
+            self._buckets[i + 1] = 0
+        self._buckets[i + 1] += weight
+
+    def acquire(self, weight):
+        """ Bloque jusqu'à ce que `weight` tienne dans le budget global, puis le réserve. """
+        while True:
+            with self._lock:
+                now = time.time()
+                second = int(now)
+                if now >= self._paused_until.value and self._used(second) + weight <= self.capacity:
+                    self._add(second, weight)
+                    return
+                wait = self._paused_until.value - now if now < self._paused_until.value else 1 - (now - second)
+            time.sleep(max(wait, 0.01))
+
+    def sync(self, used_weight):
+        """ Aligne le budget sur le poids annoncé par le serveur (X-MBX-USED-WEIGHT-1M). """
+        with self._lock:
+            second = int(time.time())
+            used = self._used(second)
+            if used_weight > used:
+                self._add(second, used_weight - used)
+
+    def pause(self, seconds):
+        """ Suspend tous les processus pendant `seconds` (Retry-After). """
+        with self._lock:
+            self._paused_until.value = max(self._paused_until.value, time.time() + seconds)
+
+    @property
+    def used(self):
+        with self._lock:
+            return self._used(int(time.time()))
+
+
+def shard(symbols, n):
+    """ Découpe les symboles en `n` lots équilibrés (tri préalable pour des lots stables). """
+    symbols = sorted(symbols)
+    return [chunk for chunk in (symbols[i::n] for i in range(n)) if chunk]
+
+
+# État propre à chaque processus de travail, fixé par _init_worker
+_worker = {}
+
+
+def _init_worker(weight_budget, order_budget, client_factory):
+    _worker["weight_budget"] = weight_budget
+    _worker["order_budget"] = order_budget
+    _worker["client_factory"] = client_factory
+    _worker["fetcher"] = KlineFetcher(RequestsTransport(), weight_budget, max_workers=8)
+
+
+def worker_client():
+    """ Client Binance du processus courant, créé une seule fois. """
+    if "client" not in _worker:
+        client = _worker["client_factory"]()
+        if hasattr(client, "budget"):
+            # ResilientClient : ses requêtes puisent dans les budgets communs à tous les processus
+            client.budget = _worker["weight_budget"]
+            client.order_budget = _worker["order_budget"]
+        _worker["client"] = client
+    return _worker["client"]
+
+
+def worker_store(path, interval):
+    """ CandleStore du processus courant, en lecture seule : seul le processus parent y écrit. """
+    from candle_store import CandleStore
+
+    stores = _worker.setdefault("stores", {})
+    if path not in stores:
+        stores[path] = CandleStore(path, interval=interval, readonly=True)
+    return stores[path]
+
+
+def _analyze_shard(symbols, interval, limit, store_path=None):
+    import indicators
+    from candle_store import klines_to_columns, merge_columns
+
+    fetcher = _worker["fetcher"]
+    store = worker_store(store_path, interval) if store_path else None
+    # Avec un stockage, seules les bougies manquantes sont demandées ; le reste est lu sur place
+    fetch_limit = store.missing(symbols, limit, int(time.time() * 1000)) if store is not None else limit
+    klines_by_symbol = fetcher.fetch_many(symbols, interval=interval, limit=fetch_limit)
+    columns = {symbol: klines_to_columns(klines) for symbol, klines in klines_by_symbol.items()}
+    if store is not None:
+        columns = {symbol: merge_columns(store.window(symbol, limit), fresh, limit) for symbol, fresh in columns.items()}
+    errors = {symbol: str(error) for symbol, error in fetcher.errors.items()}
+    # Les klines reçues repartent vers le parent, qui les ajoute au stockage
+    return indicators.summarize(columns), errors, klines_by_symbol if store is not None else {}
+
+
+def _sync_shard(symbols, db_path):
+    from trade_sync import TradeStore, TradeSync
+
+    client = worker_client()
+    budget = None if hasattr(client, "budget") else _worker["weight_budget"]
+    sync = TradeSync(client, TradeStore(db_path), registry=None, budget=budget)
+    inserted = sync.sync(symbols)
+    return inserted, {symbol: str(error) for symbol, error in sync.errors.items()}
+
+
+class ShardPool:
+    """
+    Pool de processus se partageant les limites Binance.
+
+    :param processes: Nombre de processus (par défaut, le nombre de cœurs)
+    :param client_factory: Fonction de niveau module renvoyant un Client authentifié (balayage historique)
+    """
+
+    def __init__(self, processes=None, client_factory=None, weight_limit=DEFAULT_WEIGHT_LIMIT,
+                 order_limit=DEFAULT_ORDER_LIMIT):
+        ctx = multiprocessing.get_context()
+        self.processes = processes or os.cpu_count() or 1
+        self.weight_budget = SharedBudget(weight_limit, 60.0, ctx=ctx)
+        self.order_budget = SharedBudget(order_limit, 10.0, safety=1.0, ctx=ctx)
+        self.errors = {}
+        self.pool = ctx.Pool(
+            self.processes, initializer=_init_worker,
+            initargs=(self.weight_budget, self.order_budget, client_factory),
+        )
+
+    def _map(self, func, symbols, *args):
+        results = [self.pool.apply_async(func, (chunk, *args)) for chunk in shard(symbols, self.processes)]
+        return [result.get() for result in results]
+
+    def analyze(self, symbols, interval="1h", limit=50, store=None):
+        """
+        Klines et indicateurs de tous les symboles, un lot par processus.
+
+        :param store: CandleStore (en écriture) de même intervalle : les processus le lisent
+            et ne demandent que les bougies manquantes, que ce processus y ajoute ensuite
+        :return: Dictionnaire {symbole: résumé} au format de indicators.summarize ; échecs dans self.errors
+        """
+        summaries, self.errors = {}, {}
+        store_path = store.path if store is not None else None
+        if store is not None:
+            store.flush()  # Les lecteurs doivent voir les bougies du cycle précédent
+        for shard_summaries, errors, klines_by_symbol in self._map(_analyze_shard, symbols, interval, limit, store_path):
+            summaries.update(shard_summaries)
+            self.errors.update(errors)
+            for symbol, klines in klines_by_symbol.items():
+                store.extend_klines(symbol, klines)
+        return summaries
+
+    def sync_trades(self, symbols, db_path):
+        """ Synchronise l'historique des transactions dans `db_path`, un lot de symboles par processus. """
+        inserted, self.errors = 0, {}
+        for shard_inserted, errors in self._map(_sync_shard, symbols, db_path):
+            inserted += shard_inserted
+            self.errors.update(errors)
+        return inserted
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,139 @@
+"""
+Registre des symboles Binance partagé par tous les scripts.
+
+exchangeInfo est téléchargé une seule fois, réduit à un index compact
+(statut, actifs, filtres LOT_SIZE / NOTIONAL / PRICE_FILTER) et persisté sur
+disque avec une durée de validité : un démarrage à chaud ou une validation
+avant ordre ne font alors aucun appel réseau.
+"""
+import os
+import json
+import time
+import threading
+from collections import namedtuple
+
+DEFAULT_TTL = 3600  # secondes
+
+SymbolFilters = namedtuple(
+    "SymbolFilters",
+    ["symbol", "status", "base_asset", "quote_asset",
+     "min_qty", "max_qty", "step_size", "min_notional", "tick_size"],
+)
+
+
+def parse_symbol(info):
+    """ Réduit une entrée de exchangeInfo['symbols'] à un SymbolFilters. """
+    min_qty = max_qty = step_size = min_notional = tick_size = None
+    for f in info.get("filters", []):
+        kind = f["filterType"]
+        if kind == "LOT_SIZE":
+            min_qty = float(f["minQty"])
+            max_qty = float(f["maxQty"])
+            step_size = float(f["stepSize"])
+        elif kind in ("NOTIONAL", "MIN_NOTIONAL"):
+            min_notional = float(f["minNotional"])
+        elif kind == "PRICE_FILTER":
+            tick_size = float(f["tickSize"])
+    return SymbolFilters(
+        info["symbol"], info.get("status"), info.get("baseAsset"), info.get("quoteAsset"),
+        min_qty, max_qty, step_size, min_notional, tick_size,
+    )
+
+
+def default_cache_path(client=None, testnet=None):
+    """
+    Fichier de cache distinct pour le testnet et la production.
+
+    :param client: Client Binance dont l'attribut testnet choisit le fichier
+    :param testnet: Force le choix sans client (outils hors ligne)
+    """
+    if testnet is None:
+        testnet = getattr(client, "testnet", False)
+    suffix = "_testnet" if testnet else ""
+    return f"exchange_info{suffix}.json"
+
+
+class SymbolRegistry:
+    """
+    Index pré-calculé des symboles, chargé paresseusement.
+
+    :param client: Client Binance, utilisé uniquement si le cache est absent ou périmé
+    :param cache_path: Fichier de cache JSON (None pour désactiver la persistance)
+    :param ttl: Durée de validité du cache en secondes
+    """
+
+    def __init__(self, client=None, cache_path="", ttl=DEFAULT_TTL):
+        self.client = client
+        self.cache_path = default_cache_path(client) if cache_path == "" else cache_path
+        self.ttl = ttl
+        self.fetched_at = 0.0
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - payload.get("fetched_at", 0) > self.ttl:
+            return None
+        self.fetched_at = payload["fetched_at"]
+        return {row[0]: SymbolFilters(*row) for row in payload["symbols"]}
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        payload = {"fetched_at": self.fetched_at, "symbols": [list(s) for s in self._index.values()]}
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp_path, self.cache_path)
+
+    def refresh(self):
+        """ Télécharge exchangeInfo, reconstruit l'index et met à jour le cache. """
+        if self.client is None:
+            raise ValueError("Aucun client Binance pour rafraîchir le registre des symboles.")
+        exchange_info = self.client.get_exchange_info()
+        index = {}
+        for info in exchange_info["symbols"]:
+            parsed = parse_symbol(info)
+            index[parsed.symbol] = parsed
+        self._index = index
+        self.fetched_at = time.time()
+        self._save_cache()
+        return self._index
+
+    def load(self, force=False):
+        """ Retourne l'index, depuis la mémoire, le disque ou le réseau. """
+        with self._lock:
+            expired = time.time() - self.fetched_at > self.ttl
+            if force or self._index is None or expired:
+                cached = None if force else self._load_cache()
+                if cached is not None:
+                    self._index = cached
+                else:
+                    self.refresh()
+            return self._index
+
+    def get(self, symbol):
+        """ Filtres d'un symbole, ou None s'il est inconnu. """
+        return self.load().get(symbol)
+
+    def __contains__(self, symbol):
+        return symbol in self.load()
+
+    def symbols(self, quote_asset=None, status="TRADING"):
+        """
+        Liste des symboles filtrés.
+
+        :param quote_asset: Actif de cotation (ex: 'USDT'), None pour tous
+        :param status: Statut requis, None pour tous
+        """
+        return [
+            s.symbol for s in self.load().values()
+            if (quote_asset is None or s.quote_asset == quote_asset)
+            and (status is None or s.status == status)
+        ]
@@ -0,0 +1,174 @@
+"""
+Envoi des alertes Telegram en arrière-plan.
+
+Les alertes sont déposées dans une file bornée et envoyées par un thread
+dédié via une session HTTP réutilisée. Le débit respecte les limites de
+Telegram par conversation ; les rafales sont regroupées en un seul message
+récapitulatif. Le chemin critique du trading n'attend jamais le réseau.
+"""
+import time
+import queue
+import atexit
+import threading
+from collections import deque
+
+import requests
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+MAX_MESSAGE_LENGTH = 4096
+
+DROP_NEW = "drop_new"
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+
+class TelegramDispatcher:
+    """
+    Répartiteur d'alertes Telegram non bloquant.
+
+    :param token: Jeton du bot (dispatcher désactivé s'il est absent)
+    :param chat_id: Identifiant de la conversation
+    :param base_url: URL de l'API (remplaçable par un serveur local de test)
+    :param max_queue: Taille maximale de la file d'attente
+    :param policy: Politique quand la file est pleine : drop_new, drop_oldest ou block
+    :param min_interval: Délai minimal entre deux envois (1 message/s par conversation)
+    :param per_minute: Nombre maximal d'envois par minute (20 pour un groupe)
+    :param coalesce_window: Délai d'attente pour regrouper une rafale
+    """
+
+    def __init__(self, token, chat_id, base_url=TELEGRAM_API_URL, max_queue=1000, policy=DROP_OLDEST,
+                 min_interval=1.0, per_minute=20, coalesce_window=0.5, timeout=10):
+        if policy not in (DROP_NEW, DROP_OLDEST, BLOCK):
+            raise ValueError(f"Politique de file inconnue : {policy}")
+        self.enabled = bool(token and chat_id)
+        self.url = f"{base_url.rstrip('/')}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.policy = policy
+        self.min_interval = min_interval
+        self.per_minute = per_minute
+        self.coalesce_window = coalesce_window
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = deque()
+        self._history = deque()
+        self._last_sent = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="telegram-dispatcher", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def send(self, message):
+        """
+        Dépose une alerte dans la file sans attendre l'envoi.
+
+        :return: True si l'alerte a été acceptée
+        """
+        if not self.enabled:
+            return False
+        self.start()
+        if self.policy == BLOCK:
+            self._queue.put(message)
+            return True
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return True
+            except queue.Full:
+                if self.policy == DROP_NEW:
+                    self.dropped += 1
+                    return False
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def stop(self, timeout=5.0):
+        """ Vide la file (dans la limite de `timeout`) puis arrête le thread. """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _wait_for_slot(self):
+        """ Attend que les limites de débit autorisent un nouvel envoi. """
+        while True:
+            now = time.monotonic()
+            while self._history and now - self._history[0] >= 60:
+                self._history.popleft()
+            wait = self._last_sent + self.min_interval - now
+            if len(self._history) >= self.per_minute:
+                wait = max(wait, 60 - (now - self._history[0]))
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def _next_digest(self):
+        """
+        Regroupe les alertes en tête de file dans un message de taille autorisée.
+
+        Seules les alertes qui tiennent dans ce message quittent la file : le
+        reste y attend, si bien qu'une file pleine déclenche la politique
+        (drop_new, drop_oldest, block) au lieu de grossir `_pending`, qui ne
+        garde qu'une alerte reportée ou un message refusé par un 429.
+        """
+        parts, length = [], 0
+        while True:
+            if not self._pending:
+                try:
+                    self._pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            message = self._pending[0][:MAX_MESSAGE_LENGTH]
+            if parts and length + len(message) + 2 > MAX_MESSAGE_LENGTH:
+                break
+            parts.append(message)
+            length += len(message) + 2
+            self._pending.popleft()
+        return "\n\n".join(parts)
+
+    def _post(self, text):
+        try:
+            response = self.session.post(self.url, data={"chat_id": self.chat_id, "text": text}, timeout=self.timeout)
+        except requests.RequestException:
+            self.failed += 1
+            return
+        if response.status_code == 429:
+            # Telegram indique le délai à respecter dans parameters.retry_after
+            try:
+                retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+            except ValueError:
+                retry_after = 1
+            self._last_sent = time.monotonic() + retry_after - self.min_interval
+            self._pending.appendleft(text)
+            return
+        if response.ok:
+            self.sent += 1
+        else:
+            self.failed += 1
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty() and not self._pending):
+            if not self._pending:
+                try:
+                    self._pending.append(self._queue.get(timeout=0.2))
+                except queue.Empty:
+                    continue
+                if not self._stop.is_set():
+                    time.sleep(self.coalesce_window)
+            self._wait_for_slot()
+            text = self._next_digest()
+            now = time.monotonic()
+            self._last_sent = now
+            self._history.append(now)
+            self._post(text)
@@ -0,0 +1,33 @@
+"""
+Backtest par tranches de temps : le découpage ne doit pas changer le
+résultat, et les données synthétiques doivent déclencher des trades.
+"""
+import numpy as np
+
+from backtest import Grid, SyntheticGrid, run_backtest
+
+
+def test_synthetic_benchmark_trades():
+    stats = run_backtest(SyntheticGrid(4, 50000))
+    assert stats["trades"] > 0
+
+
+def test_time_chunks_match_single_pass():
+    grid = SyntheticGrid(5, 40000, seed=3)
+    whole = run_backtest(grid, time_chunk=40000)
+    chunked = run_backtest(grid, chunk_size=2, time_chunk=3000)
+    assert chunked["trades"] == whole["trades"] > 0
+    assert np.isclose(chunked["pnl"], whole["pnl"])
+    assert np.isclose(chunked["max_drawdown"], whole["max_drawdown"])
+    for symbol, pnl in whole["per_symbol_pnl"].items():
+        assert np.isclose(chunked["per_symbol_pnl"][symbol], pnl)
+
+
+def test_grid_window_fills_gaps():
+    times = np.array([2, 3, 5], dtype=np.int64)
+    close = np.array([10.0, 11.0, 12.0])
+    grid = Grid({"AUSDT": (times, (close, close, close, close)),
+                 "BUSDT": (np.arange(1, 7, dtype=np.int64), (np.ones(6),) * 4)})
+    window = grid.window(0, 1, 0, len(grid.times))
+    assert window.close[0].tolist() == [10.0, 10.0, 11.0, 11.0, 12.0, 12.0]
+    assert window.listed[0].tolist() == [False, True, True, False, True, False]
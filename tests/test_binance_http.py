@@ -0,0 +1,131 @@
+"""
+Reprises de ResilientClient._request sur une session simulée : pause
+Retry-After sur 429/418, resynchronisation d'horloge sur -1021, délai
+exponentiel sur 5xx, et jamais de nouvel envoi d'un ordre dont l'état est
+inconnu (5xx ou erreur réseau).
+"""
+import json
+
+import pytest
+import requests
+
+pytest.importorskip("binance")
+
+from binance.exceptions import BinanceAPIException
+from binance_http import ResilientClient
+
+API = "https://api.binance.com/api"
+
+
+def response(status=200, payload=None, headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r._content = json.dumps({} if payload is None else payload).encode()
+    r.headers.update(headers or {})
+    return r
+
+
+class FakeSession:
+    """ Rejoue une suite de réponses (ou d'exceptions), une par requête. """
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+        self.headers = {}
+
+    def request(self, method, uri, **kwargs):
+        self.calls.append((method, uri))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def __getattr__(self, method):
+        return lambda uri, **kwargs: self.request(method, uri, **kwargs)
+
+
+class RecordingBudget:
+    def __init__(self):
+        self.pauses = []
+
+    def acquire(self, weight):
+        pass
+
+    def sync(self, used):
+        pass
+
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(ResilientClient, "ping", lambda self: {}, raising=False)
+    monkeypatch.setattr(ResilientClient, "_backoff", lambda self, attempt, reason: sleeps.append(reason))
+    client = ResilientClient("key", "secret", budget=RecordingBudget(), order_budget=RecordingBudget(),
+                             sync_time=False)
+    client.sleeps = sleeps
+    return client
+
+
+def use(client, *outcomes):
+    client.session = FakeSession(*outcomes)
+    return client.session
+
+
+@pytest.mark.parametrize("status", [429, 418])
+def test_rate_limit_pauses_for_retry_after(client, status):
+    session = use(client, response(status, {"code": -1003, "msg": "Too many requests"}, {"Retry-After": "7"}),
+                  response(payload={"price": "1.0"}))
+    assert client._request("get", f"{API}/v3/ticker/price", False) == {"price": "1.0"}
+    assert len(session.calls) == 2
+    assert client.budget.pauses == [7.0]
+    assert client.sleeps == []
+
+
+def test_timestamp_error_resyncs_clock(client, monkeypatch):
+    synced = []
+    monkeypatch.setattr(client, "sync_time", lambda: synced.append(True))
+    session = use(client, response(400, {"code": -1021, "msg": "Timestamp outside of recvWindow"}),
+                  response(payload={"balances": []}))
+    assert client._request("get", f"{API}/v3/account", True) == {"balances": []}
+    assert len(session.calls) == 2
+    assert synced == [True]
+
+
+def test_server_error_backs_off(client):
+    session = use(client, response(503), response(502), response(payload={"serverTime": 1}))
+    assert client._request("get", f"{API}/v3/time", False) == {"serverTime": 1}
+    assert len(session.calls) == 3
+    assert client.sleeps == ["5xx", "5xx"]
+
+
+def test_server_error_gives_up_after_retries(client):
+    client.retries = 2
+    session = use(client, response(500), response(500), response(500))
+    with pytest.raises(BinanceAPIException):
+        client._request("get", f"{API}/v3/time", False)
+    assert len(session.calls) == 3
+
+
+def test_network_error_retried_for_reads(client):
+    session = use(client, requests.ConnectionError("reset"), response(payload={"serverTime": 1}))
+    assert client._request("get", f"{API}/v3/time", False) == {"serverTime": 1}
+    assert len(session.calls) == 2
+    assert client.sleeps == ["network"]
+
+
+def test_order_not_resent_on_server_error(client):
+    session = use(client, response(503), response(payload={"orderId": 1}))
+    with pytest.raises(BinanceAPIException):
+        client._request("post", f"{API}/v3/order", True, data={"symbol": "BTCUSDT", "side": "BUY"})
+    assert len(session.calls) == 1
+    assert client.sleeps == []
+
+
+def test_order_not_resent_on_network_error(client):
+    session = use(client, requests.Timeout("read timeout"), response(payload={"orderId": 1}))
+    with pytest.raises(requests.Timeout):
+        client._request("post", f"{API}/v3/order", True, data={"symbol": "BTCUSDT", "side": "BUY"})
+    assert len(session.calls) == 1
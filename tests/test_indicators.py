@@ -0,0 +1,91 @@
+"""
+Comparaison du moteur vectorisé avec des implémentations de référence
+(pandas pour EMA / moyennes glissantes, boucles naïves pour Wilder).
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+
+
+def naive_wilder_rsi(close, period=14):
+    delta = np.diff(close)
+    gains, losses = np.maximum(delta, 0), np.maximum(-delta, 0)
+    out = np.full(len(close), np.nan)
+    avg_gain, avg_loss = gains[:period].mean(), losses[:period].mean()
+    for t in range(period, len(close)):
+        if t > period:
+            avg_gain = (avg_gain * (period - 1) + gains[t - 1]) / period
+            avg_loss = (avg_loss * (period - 1) + losses[t - 1]) / period
+        out[t] = 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+    return out
+
+
+def naive_atr(high, low, close, period=14):
+    tr = np.empty(len(close))
+    tr[0] = high[0] - low[0]
+    for t in range(1, len(close)):
+        tr[t] = max(high[t] - low[t], abs(high[t] - close[t - 1]), abs(low[t] - close[t - 1]))
+    out = np.full(len(close), np.nan)
+    value = tr[:period].mean()
+    out[period - 1] = value
+    for t in range(period, len(close)):
+        value = (value * (period - 1) + tr[t]) / period
+        out[t] = value
+    return out
+
+
+@pytest.fixture
+def series():
+    # Plus long que indicators._BLOCK pour couvrir la résolution par blocs
+    rng = np.random.default_rng(42)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (3, 300)), axis=1))
+    high = close * (1 + rng.uniform(0, 0.01, close.shape))
+    low = close * (1 - rng.uniform(0, 0.01, close.shape))
+    return close, high, low
+
+
+def test_ema_matches_pandas(series):
+    close, _, _ = series
+    for span in (12, 26):
+        expected = np.vstack([pd.Series(row).ewm(span=span, adjust=False).mean().to_numpy() for row in close])
+        np.testing.assert_allclose(indicators.ema(close, span), expected, rtol=1e-12)
+
+
+def test_macd_matches_pandas(series):
+    close, _, _ = series
+    line, signal, hist = indicators.macd(close)
+    for i, row in enumerate(close):
+        s = pd.Series(row)
+        expected = s.ewm(span=12, adjust=False).mean() - s.ewm(span=26, adjust=False).mean()
+        np.testing.assert_allclose(line[i], expected.to_numpy(), rtol=1e-10, atol=1e-12)
+        np.testing.assert_allclose(signal[i], expected.ewm(span=9, adjust=False).mean().to_numpy(),
+                                   rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(hist, line - signal)
+
+
+def test_rolling_windows_match_pandas(series):
+    close, _, _ = series
+    for i, row in enumerate(close):
+        s = pd.Series(row)
+        np.testing.assert_allclose(indicators.sma(close, 20)[i], s.rolling(20).mean().to_numpy(), rtol=1e-12)
+        np.testing.assert_allclose(indicators.rolling_std(close, 20)[i], s.rolling(20).std(ddof=0).to_numpy(),
+                                   rtol=1e-8)
+
+
+def test_rsi_matches_naive_wilder(series):
+    close, _, _ = series
+    for i, row in enumerate(close):
+        np.testing.assert_allclose(indicators.rsi(close)[i], naive_wilder_rsi(row), rtol=1e-12)
+
+
+def test_atr_matches_naive_wilder(series):
+    close, high, low = series
+    for i in range(len(close)):
+        np.testing.assert_allclose(indicators.atr(high, low, close)[i], naive_atr(high[i], low[i], close[i]),
+                                   rtol=1e-12)
+
+
+def test_rsi_flat_series_is_neutral():
+    assert indicators.rsi(np.full(30, 5.0))[0, -1] == 50.0
@@ -0,0 +1,60 @@
+"""
+Rejeu d'un flux enregistré : les indicateurs incrémentaux doivent égaler
+ceux d'indicators.compute_indicators sur les mêmes bougies clôturées.
+"""
+import json
+
+import numpy as np
+import pytest
+
+import indicators
+from kline_stream import IndicatorBook, StreamRecorder, replay_stream, main
+
+
+def kline_message(symbol, open_time, high, low, close, closed):
+    return {"stream": f"{symbol.lower()}@kline_1m", "data": {
+        "e": "kline", "s": symbol,
+        "k": {"t": open_time, "h": str(high), "l": str(low), "c": str(close), "x": closed},
+    }}
+
+
+@pytest.fixture
+def recording(tmp_path):
+    rng = np.random.default_rng(7)
+    candles = {}
+    path = tmp_path / "flux.jsonl"
+    recorder = StreamRecorder(str(path))
+    for symbol in ("BTCUSDT", "ETHUSDT"):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 120)))
+        high, low = close * 1.005, close * 0.995
+        candles[symbol] = (close, high, low)
+        for t in range(len(close)):
+            # Mises à jour partielles (bougie en cours) avant la clôture
+            recorder(kline_message(symbol, t * 60000, high[t], low[t], close[t] * 1.01, False))
+            recorder(kline_message(symbol, t * 60000, high[t], low[t], close[t], True))
+    # Message hors sujet et kline périmée : ignorés
+    recorder({"e": "24hrTicker", "s": "BTCUSDT"})
+    recorder(kline_message("BTCUSDT", 0, 1.0, 1.0, 1.0, True))
+    recorder.close()
+    return path, candles
+
+
+def test_replay_matches_compute_indicators(recording):
+    path, candles = recording
+    book = IndicatorBook()
+    assert replay_stream(str(path), book) == 2 * 2 * 120 + 2
+    for symbol, (close, high, low) in candles.items():
+        expected = indicators.compute_indicators(close, high, low)
+        last = book.last(symbol)
+        for name in ("rsi", "macd", "macd_signal", "macd_hist", "ema_12", "ema_26",
+                     "bb_mid", "bb_upper", "bb_lower", "atr"):
+            assert last[name] == pytest.approx(expected[name][0, -1], rel=1e-9), name
+        signal = indicators.signal_from_indicators(expected["rsi"][:, -1], expected["macd"][:, -1])[0]
+        assert last["signal"] == signal
+
+
+def test_replay_cli(recording, capsys):
+    path, _ = recording
+    assert main([str(path)]) == 0
+    out = capsys.readouterr().out
+    assert "BTCUSDT" in out and "ETHUSDT" in out
@@ -0,0 +1,34 @@
+"""
+Une génération coupée avant toute réponse ne doit pas être mise en cache.
+"""
+import json
+
+from llm_cache import LLMDecisionCache
+
+
+def test_empty_results_are_not_cached():
+    cache = LLMDecisionCache(ttl=300)
+    calls = []
+
+    def call(result):
+        calls.append(result)
+        return result
+
+    for result in (None, "", "BTCUSDT"):
+        assert cache.get_or_call("model", "template", {"BTCUSDT": 1.0}, lambda: call(result)) == result
+    assert calls == [None, "", "BTCUSDT"]
+    assert cache.get_or_call("model", "template", {"BTCUSDT": 1.0}, lambda: call("ETHUSDT")) == "BTCUSDT"
+    assert len(calls) == 3
+
+
+def test_persisted_empty_entries_are_ignored(tmp_path):
+    path = tmp_path / "cache.json"
+    cache = LLMDecisionCache(ttl=300, path=str(path))
+    cache.put("ok", "ETHUSDT")
+    entries = json.loads(path.read_text())
+    stored_at = entries[0][2]
+    path.write_text(json.dumps(entries + [["empty", "", stored_at], ["none", None, stored_at]]))
+    reloaded = LLMDecisionCache(ttl=300, path=str(path))
+    assert reloaded.get("ok") == "ETHUSDT"
+    assert reloaded.get("empty") is None and reloaded.get("none") is None
+    assert reloaded.stats()["size"] == 1
@@ -0,0 +1,27 @@
+"""
+Lecture en flux d'Ollama : un serveur qui ne répond pas dans le budget de
+temps donne un StreamResult sans décision, sans interrompre le cycle.
+"""
+import time
+
+from llm_stream import decision_matcher, stream_decision
+from mock_servers import ollama_server
+
+
+def test_stream_decision():
+    with ollama_server() as server:
+        result = stream_decision("Réponds BUY, SELL ou HOLD.", "deepseek-r1:14b", decision_matcher(), server.url)
+    assert result.decision == "HOLD"
+    assert result.tokens > 0
+
+
+def test_first_token_timeout():
+    with ollama_server(latency=2.0) as server:
+        start = time.perf_counter()
+        result = stream_decision("Réponds BUY, SELL ou HOLD.", "deepseek-r1:14b", decision_matcher(), server.url,
+                                 time_budget=1.0)
+        elapsed = time.perf_counter() - start
+    assert result.decision is None
+    assert result.stop_reason == "timeout"
+    assert result.tokens == 0
+    assert elapsed < 2.0
@@ -0,0 +1,51 @@
+"""
+Arrondis d'OrderQuantizer sur des filtres exchangeInfo figés : pas
+LOT_SIZE, tick PRICE_FILTER, rejet NOTIONAL et marge de 1 % des ordres
+MARKET.
+"""
+from decimal import Decimal
+
+import pytest
+
+from order_path import OrderQuantizer
+from symbol_registry import parse_symbol
+
+EXCHANGE_INFO = {
+    "symbol": "ETHUSDT", "status": "TRADING", "baseAsset": "ETH", "quoteAsset": "USDT",
+    "filters": [
+        {"filterType": "PRICE_FILTER", "minPrice": "0.01", "maxPrice": "1000000.00", "tickSize": "0.01"},
+        {"filterType": "LOT_SIZE", "minQty": "0.00010000", "maxQty": "9000.00000000", "stepSize": "0.00010000"},
+        {"filterType": "NOTIONAL", "minNotional": "5.00000000", "applyMinToMarket": True},
+    ],
+}
+
+
+@pytest.fixture
+def quantizer():
+    return OrderQuantizer(parse_symbol(EXCHANGE_INFO))
+
+
+def test_lot_size_floors_to_step(quantizer):
+    assert quantizer.floor_quantity("0.123456") == Decimal("0.1234")
+    assert quantizer.floor_quantity("0.1234") == Decimal("0.1234")
+    assert quantizer.ceil_quantity("0.12341") == Decimal("0.1235")
+
+
+def test_price_filter_rounds_down_to_tick(quantizer):
+    assert quantizer.round_price("2512.3456") == Decimal("2512.34")
+    assert quantizer.round_price("2512.3") == Decimal("2512.30")
+
+
+def test_min_notional_rejected(quantizer):
+    with pytest.raises(ValueError, match="minimum"):
+        quantizer.validate("0.0019", "2500")  # 4,75 USDT < 5
+    assert quantizer.validate("0.0020", "2500") == Decimal("0.0020")
+
+
+def test_min_quantity_includes_buffer(quantizer):
+    # 5 * 1,01 / 2500 = 0.00202 -> arrondi au pas supérieur
+    quantity = quantizer.min_quantity("2500")
+    assert quantity == Decimal("0.0021")
+    assert quantity * Decimal("2500") >= Decimal("5.05")
+    assert quantizer.min_quantity("2500", buffer=0) == Decimal("0.0020")
+    quantizer.validate(quantity, "2500")
@@ -0,0 +1,40 @@
+"""
+PnL FIFO : positions soldées sans résidu d'arrondi, ventes sans achat
+connu comptées dans `unmatched`.
+"""
+import numpy as np
+import pytest
+
+from pnl import Fills, compute_pnl
+
+
+def trade(symbol, i, price, qty, is_buyer):
+    return {"symbol": symbol, "id": i, "time": 1000 * i, "price": str(price), "qty": str(qty),
+            "quoteQty": str(price * qty), "commission": "0", "commissionAsset": "BNB", "isBuyer": is_buyer}
+
+
+def test_closed_positions_leave_no_noise():
+    rng = np.random.default_rng(5)
+    trades, i = [], 0
+    for symbol, size in (("BTCUSDT", 0.001), ("SHIBUSDT", 1e6)):
+        for _ in range(200):
+            qty = round(float(rng.uniform(1, 10)) * size, 8)
+            trades.append(trade(symbol, i, float(rng.uniform(1, 2)), qty, True))
+            trades.append(trade(symbol, i + 1, float(rng.uniform(1, 2)), qty / 3, False))
+            trades.append(trade(symbol, i + 2, float(rng.uniform(1, 2)), qty - qty / 3, False))
+            i += 3
+    report = compute_pnl(Fills.from_trades(trades))
+    for row in report.values():
+        assert row["unmatched"] == 0.0
+        assert row["position"] == 0.0
+
+
+def test_sales_without_purchase_are_unmatched():
+    report = compute_pnl(Fills.from_trades([
+        trade("ETHUSDT", 1, 100.0, 1.0, True),
+        trade("ETHUSDT", 2, 110.0, 1.5, False),
+    ]))
+    row = report["ETHUSDT"]
+    assert row["unmatched"] == pytest.approx(0.5)
+    assert row["realized"] == pytest.approx(1.5 * 110 * (1.0 / 1.5) - 100.0)
+    assert row["position"] == 0.0
@@ -0,0 +1,42 @@
+"""
+Clé de cache de la sélection : deux rafraîchissements rapprochés doivent
+retrouver la même décision malgré le bruit des tickers.
+"""
+import numpy as np
+
+from llm_cache import LLMDecisionCache
+from ranking import MarketSnapshot, cache_snapshot
+
+
+def tickers(rng, noise):
+    rows = []
+    for i in range(40):
+        price = 1.0 + i
+        jitter = 1 + noise * rng.uniform(-1, 1)
+        rows.append({
+            "symbol": f"C{i}USDT", "lastPrice": price * jitter, "volume": 1e6 * jitter,
+            "quoteVolume": 10 ** (5 + i * 0.1) * jitter, "priceChangePercent": i * 0.7 + 0.3 + noise * rng.uniform(-1, 1),
+            "highPrice": price * (1.02 + i * 0.002), "lowPrice": price * 0.98,
+            "bidPrice": price * jitter, "askPrice": price * (1 + 1e-3 / (1 + i)) * jitter,
+        })
+    return rows
+
+
+def test_consecutive_refreshes_hit_the_cache():
+    rng = np.random.default_rng(0)
+    cache = LLMDecisionCache(ttl=300)
+    calls = []
+    for _ in range(2):
+        candidates = dict(MarketSnapshot(tickers(rng, noise=0.002)).top_k(10))
+        cache.get_or_call("model", "template", cache_snapshot(candidates), lambda: calls.append(1) or "C39USDT")
+    assert len(calls) == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_raw_snapshot_misses():
+    rng = np.random.default_rng(0)
+    cache = LLMDecisionCache(ttl=300)
+    for _ in range(2):
+        candidates = dict(MarketSnapshot(tickers(rng, noise=0.002)).top_k(10))
+        cache.get_or_call("model", "template", candidates, lambda: "C39USDT")
+    assert cache.stats()["hits"] == 0
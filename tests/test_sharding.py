@@ -0,0 +1,51 @@
+"""
+Analyse par lots avec un CandleStore : les processus lisent le stockage,
+ne demandent que les bougies manquantes et laissent l'écriture au parent.
+"""
+import time
+
+import numpy as np
+
+import indicators
+import sharding
+from candle_store import CandleStore, klines_to_columns
+
+HOUR = 3600000
+
+
+def make_klines(start, n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return [[start + i * HOUR, str(c), str(c * 1.01), str(c * 0.99), str(c), "10"] for i, c in enumerate(close)]
+
+
+class FakeFetcher:
+    def __init__(self, klines):
+        self.klines = klines
+        self.limits = []
+        self.errors = {}
+
+    def fetch_many(self, symbols, interval="1h", limit=50):
+        self.limits.append(limit)
+        return {symbol: self.klines[symbol][-limit:] for symbol in symbols}
+
+
+def test_analyze_shard_reads_store_and_fetches_missing(tmp_path, monkeypatch):
+    now = int(time.time() * 1000) // HOUR * HOUR
+    history = {symbol: make_klines(now - 79 * HOUR, 80, seed) for seed, symbol in enumerate(("AUSDT", "BUSDT"))}
+    store = CandleStore(str(tmp_path), interval="1h")
+    for symbol, klines in history.items():
+        store.extend_klines(symbol, klines[:-3])  # Trois bougies de retard
+    store.flush()
+    fetcher = FakeFetcher(history)
+    monkeypatch.setattr(sharding, "_worker", {"fetcher": fetcher})
+
+    summaries, errors, fresh = sharding._analyze_shard(list(history), "1h", 50, str(tmp_path))
+
+    assert fetcher.limits == [4] and not errors  # Trois manquantes, plus la dernière connue, peut-être en cours
+    expected = indicators.summarize({s: klines_to_columns(k[-50:]) for s, k in history.items()})
+    for symbol in history:
+        assert summaries[symbol]["close"] == expected[symbol]["close"]
+        assert np.isclose(summaries[symbol]["rsi"], expected[symbol]["rsi"])
+        assert len(fresh[symbol]) == 4
+    assert store.last_open_time("AUSDT") == history["AUSDT"][-4][0]  # Le processus n'écrit pas
@@ -0,0 +1,82 @@
+"""
+Contre-pression du répartiteur Telegram face à un serveur lent : la file
+reste bornée et la politique choisie s'applique.
+"""
+import threading
+import time
+
+import pytest
+
+from mock_servers import telegram_server
+from telegram_dispatcher import TelegramDispatcher, DROP_NEW, DROP_OLDEST, BLOCK, MAX_MESSAGE_LENGTH
+
+MESSAGE_SIZE = 1000  # 4 alertes par message récapitulatif
+
+
+def dispatcher(url, policy, max_queue=5):
+    return TelegramDispatcher("token", "chat", base_url=url, max_queue=max_queue, policy=policy,
+                              min_interval=0.0, per_minute=10000, coalesce_window=0.0)
+
+
+def delivered(received):
+    return [alert for text in received for alert in text.split("\n\n")]
+
+
+def flood(d, count, pace=0.002):
+    """ Envoie `count` alertes plus vite que le serveur ne les absorbe (4 par 50 ms). """
+    accepted = []
+    for i in range(count):
+        time.sleep(pace)
+        if d.send(f"{i:06d}".ljust(MESSAGE_SIZE, ".")):
+            accepted.append(i)
+        assert len(d._pending) <= 1
+        assert d._queue.qsize() <= d._queue.maxsize
+    return accepted
+
+
+@pytest.fixture
+def slow_server():
+    received = []
+    with telegram_server(latency=0.05, received=received) as server:
+        yield server.url, received
+
+
+def test_drop_new_bounds_backlog(slow_server):
+    url, received = slow_server
+    d = dispatcher(url, DROP_NEW)
+    accepted = flood(d, 200)
+    d.stop(timeout=10)
+    assert d.dropped == 200 - len(accepted) > 0
+    alerts = delivered(received)
+    assert [int(a[:6]) for a in alerts] == accepted
+    assert all(len(text) <= MAX_MESSAGE_LENGTH for text in received)
+
+
+def test_drop_oldest_keeps_latest(slow_server):
+    url, received = slow_server
+    d = dispatcher(url, DROP_OLDEST)
+    flood(d, 200)
+    d.stop(timeout=10)
+    assert d.dropped > 0
+    alerts = delivered(received)
+    assert int(alerts[-1][:6]) == 199
+    assert len(alerts) + d.dropped == 200
+
+
+def test_block_waits_for_room(slow_server):
+    url, received = slow_server
+    d = dispatcher(url, BLOCK, max_queue=2)
+    done = threading.Event()
+
+    def producer():
+        flood(d, 40, pace=0)
+        done.set()
+
+    start = time.monotonic()
+    threading.Thread(target=producer, daemon=True).start()
+    assert done.wait(10)
+    # 40 alertes, 4 par envoi à 50 ms : le producteur a forcément attendu le serveur
+    assert time.monotonic() - start >= 0.2
+    d.stop(timeout=10)
+    assert d.dropped == 0
+    assert len(delivered(received)) == 40
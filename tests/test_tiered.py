@@ -0,0 +1,71 @@
+"""
+Confiance de la règle RSI/MACD en unités de bande, et répartition des
+symboles entre règles, LLM et dépassement de budget.
+"""
+import numpy as np
+import pytest
+
+from tiered import TieredEvaluator, confidence
+
+
+def summary(rsi, macd, atr=1.0, close=100.0, action="HOLD"):
+    return {"rsi": rsi, "macd": macd, "atr": atr, "close": close, "action": action}
+
+
+@pytest.mark.parametrize("rsi, macd, atr, expected", [
+    (50, 0.0, 1.0, 1.0),  # Loin des deux seuils
+    (10, 1.0, 1.0, 1.0),  # BUY net : 4 bandes de RSI, 10 bandes de MACD
+    (29, 1.0, 1.0, 0.2),  # 1 point sous oversold = 0,2 bande
+    (30, 1.0, 1.0, 0.0),  # Sur le seuil
+    (20, 0.02, 1.0, 0.2),  # MACD à 0,2 bande (0,1 ATR) de zéro
+    (72, -1.0, 1.0, 0.4),  # SELL à 2 points d'overbought
+    (10, 0.05, 0.0, 0.5),  # Sans ATR, la bande de MACD est 0,1 % du prix
+])
+def test_confidence_margin_in_band_units(rsi, macd, atr, expected):
+    assert confidence([summary(rsi, macd, atr)])[0] == pytest.approx(expected)
+
+
+def test_nan_is_confident():
+    scores = confidence([summary(np.nan, 0.5), summary(25, np.nan), {"close": 10.0}])
+    assert scores.tolist() == [1.0, 1.0, 1.0]
+
+
+def test_budget_covers_most_ambiguous_first():
+    summaries = {
+        "AUSDT": summary(50, 0.0),  # 1,0
+        "BUSDT": summary(29, 1.0, action="BUY"),  # 0,2
+        "CUSDT": summary(30, 1.0),  # 0,0
+        "DUSDT": summary(72, -1.0, action="SELL"),  # 0,4
+        "EUSDT": summary(27, 1.0, action="BUY"),  # 0,6
+        "FUSDT": summary(np.nan, np.nan),  # 1,0
+    }
+    batches = []
+
+    def llm_batch(batch):
+        batches.append(list(batch))
+        return dict.fromkeys(batch, "HOLD")
+
+    evaluator = TieredEvaluator(llm_batch, batch_size=1, call_budget=2)
+    decisions = evaluator.evaluate(summaries)
+
+    assert batches == [["CUSDT"], ["BUSDT"]]
+    assert evaluator.tiers == {"AUSDT": "rules", "BUSDT": "llm", "CUSDT": "llm",
+                               "DUSDT": "budget", "EUSDT": "budget", "FUSDT": "rules"}
+    # Hors budget, la règle s'applique
+    assert decisions == {"AUSDT": "HOLD", "BUSDT": "HOLD", "CUSDT": "HOLD",
+                         "DUSDT": "SELL", "EUSDT": "BUY", "FUSDT": "HOLD"}
+    assert evaluator.stats["calls"] == 2
+    assert evaluator.stats["budget"] == 2
+
+
+def test_min_confidence_and_zero_budget():
+    summaries = {"BUSDT": summary(29, 1.0, action="BUY"), "EUSDT": summary(27, 1.0, action="BUY")}
+    calls = []
+    evaluator = TieredEvaluator(lambda batch: calls.append(batch) or {}, call_budget=5, min_confidence=0.5)
+    assert evaluator.evaluate(summaries) == {"BUSDT": "BUY", "EUSDT": "BUY"}
+    assert evaluator.tiers == {"BUSDT": "llm", "EUSDT": "rules"}  # 0,6 >= 0,5 : la règle tranche
+
+    evaluator = TieredEvaluator(lambda batch: calls.append(batch) or {}, call_budget=0)
+    evaluator.evaluate(summaries)
+    assert evaluator.tiers == {"BUSDT": "budget", "EUSDT": "budget"}
+    assert len(calls) == 1
@@ -0,0 +1,59 @@
+"""
+Synchronisation de l'historique : remontée complète depuis fromId=0,
+curseur écrit même sans transaction, symboles soldés toujours suivis.
+"""
+from types import SimpleNamespace
+
+import trade_sync
+from trade_sync import TradeStore, TradeSync
+
+
+class FakeClient:
+    budget = None  # Comme un ResilientClient : pas de second budget
+
+    def __init__(self, trades, balances):
+        self.trades = trades
+        self.balances = balances
+        self.calls = []
+
+    def get_account(self):
+        return {"balances": [{"asset": a, "free": str(q), "locked": "0"} for a, q in self.balances.items()]}
+
+    def get_my_trades(self, symbol, limit, fromId):
+        self.calls.append((symbol, fromId))
+        return [t for t in self.trades.get(symbol, []) if t["id"] >= fromId][:limit]
+
+
+def make_trade(i, is_buyer=True):
+    return {"id": i, "orderId": i, "price": "1.0", "qty": "2.0", "quoteQty": "2.0", "commission": "0",
+            "commissionAsset": "BNB", "time": 1000 + i, "isBuyer": is_buyer, "isMaker": False}
+
+
+def registry(*symbols):
+    infos = {s: SimpleNamespace(symbol=s, base_asset=s[:-4], status="TRADING") for s in symbols}
+    return SimpleNamespace(load=lambda: infos)
+
+
+def test_first_sync_backfills_whole_history(tmp_path, monkeypatch):
+    monkeypatch.setattr(trade_sync, "MY_TRADES_LIMIT", 2)
+    client = FakeClient({"AAAUSDT": [make_trade(i) for i in range(5)]}, {"AAA": 1})
+    sync = TradeSync(client, TradeStore(str(tmp_path / "t.db")), registry("AAAUSDT", "BBBUSDT"))
+
+    assert sync.sync() == 5
+    assert client.calls == [("AAAUSDT", 0), ("AAAUSDT", 2), ("AAAUSDT", 4)]
+    client.calls.clear()
+    assert sync.sync() == 0
+    assert client.calls == [("AAAUSDT", 5)]
+
+
+def test_cursor_kept_without_trades_and_sold_symbols_followed(tmp_path):
+    store = TradeStore(str(tmp_path / "t.db"))
+    client = FakeClient({"AAAUSDT": [make_trade(1), make_trade(2, is_buyer=False)]}, {"AAA": 1, "BBB": 1})
+    sync = TradeSync(client, store, registry("AAAUSDT", "BBBUSDT"))
+    sync.sync()
+    assert store.cursor("AAAUSDT") == 2 and store.cursor("BBBUSDT") == -1
+
+    client.balances = {}  # Tout vendu : les symboles restent synchronisés
+    client.calls.clear()
+    sync.sync()
+    assert sorted(client.calls) == [("AAAUSDT", 3), ("BBBUSDT", 0)]
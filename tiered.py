@@ -0,0 +1,107 @@
+"""
+Évaluation des signaux en trois niveaux, le LLM n'étant consulté que pour les cas limites.
+
+1. Règles : le signal RSI/MACD de indicators.summarize, déjà vectorisé.
+2. Confiance : distance normalisée de chaque symbole aux frontières de la
+   règle (RSI à ±`rsi_band` points des seuils, MACD à ±`macd_band` ATR de
+   zéro), calculée pour tout l'univers en une passe NumPy. Loin des
+   frontières, la règle tranche seule : le LLM, à qui l'on donne les mêmes
+   règles, ne pourrait que la confirmer.
+3. LLM : seuls les symboles ambigus, du moins confiant au plus confiant,
+   lui sont soumis par lots, dans la limite d'un budget d'appels par cycle.
+   Au-delà du budget, la règle s'applique.
+"""
+from collections import Counter
+
+import numpy as np
+
+import instrumentation
+
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_CALL_BUDGET = 5  # Appels LLM (lots) par cycle
+DEFAULT_RSI_BAND = 5.0  # Points de RSI
+DEFAULT_MACD_BAND = 0.1  # Fraction de l'ATR
+
+TIERS = ("rules", "llm", "budget")
+
+
+def _column(summaries, name):
+    return np.array([s.get(name, np.nan) for s in summaries], dtype=np.float64)
+
+
+def confidence(summaries, oversold=30, overbought=70, rsi_band=DEFAULT_RSI_BAND, macd_band=DEFAULT_MACD_BAND):
+    """
+    Confiance de la règle RSI/MACD pour chaque résumé, entre 0 (sur une frontière) et 1.
+
+    La règle est BUY si RSI < oversold et MACD > 0, SELL si RSI > overbought
+    et MACD < 0. Chaque condition est mesurée en unités de bande ; la marge
+    d'une règle est celle de sa condition la plus faible, et la confiance
+    celle de la règle la plus proche de basculer. Sans historique suffisant
+    (RSI ou MACD NaN), la règle donne HOLD sans ambiguïté.
+
+    :param summaries: Liste de résumés au format de indicators.summarize
+    :return: Tableau NumPy de confiances
+    """
+    rsi = _column(summaries, "rsi")
+    macd = _column(summaries, "macd")
+    atr = _column(summaries, "atr")
+    close = _column(summaries, "close")
+    # L'ATR rend le MACD comparable d'un actif à l'autre ; à défaut, 1 % du prix
+    scale = np.where(atr > 0, atr, np.abs(close) * 0.01) * macd_band
+    with np.errstate(divide="ignore", invalid="ignore"):
+        trend = macd / scale
+    buy_margin = np.minimum((oversold - rsi) / rsi_band, trend)
+    sell_margin = np.minimum((rsi - overbought) / rsi_band, -trend)
+    score = np.minimum(np.abs(buy_margin), np.abs(sell_margin))
+    return np.clip(np.nan_to_num(score, nan=1.0, posinf=1.0), 0.0, 1.0)
+
+
+class TieredEvaluator:
+    """
+    Décide BUY/SELL/HOLD pour tout l'univers en réservant le LLM aux cas ambigus.
+
+    :param llm_batch: Fonction {symbole: résumé} -> {symbole: décision}, un appel LLM par lot
+    :param batch_size: Symboles par appel LLM
+    :param call_budget: Nombre maximum d'appels LLM par cycle (0 : règles seules)
+    :param min_confidence: En dessous, le symbole est soumis au LLM
+    """
+
+    def __init__(self, llm_batch, batch_size=DEFAULT_BATCH_SIZE, call_budget=DEFAULT_CALL_BUDGET,
+                 min_confidence=1.0, oversold=30, overbought=70, rsi_band=DEFAULT_RSI_BAND,
+                 macd_band=DEFAULT_MACD_BAND):
+        self.llm_batch = llm_batch
+        self.batch_size = batch_size
+        self.call_budget = call_budget
+        self.min_confidence = min_confidence
+        self.thresholds = dict(oversold=oversold, overbought=overbought, rsi_band=rsi_band, macd_band=macd_band)
+        self.tiers = {}
+        self.stats = Counter()
+
+    def evaluate(self, summaries):
+        """
+        Décision finale de chaque symbole ; le niveau qui l'a prise est dans self.tiers.
+
+        :param summaries: Dictionnaire {symbole: résumé de indicators.summarize}
+        :return: Dictionnaire {symbole: BUY/SELL/HOLD}
+        """
+        symbols = list(summaries)
+        scores = confidence([summaries[s] for s in symbols], **self.thresholds)
+        decisions = {symbol: summaries[symbol]["action"] for symbol in symbols}
+        self.tiers = dict.fromkeys(symbols, "rules")
+        self.stats = Counter(calls=0)
+
+        # Les plus ambigus d'abord : ce sont eux que le budget doit couvrir
+        ambiguous = [symbols[i] for i in np.argsort(scores, kind="stable") if scores[i] < self.min_confidence]
+        covered = ambiguous[:self.call_budget * self.batch_size]
+        for start in range(0, len(covered), self.batch_size):
+            batch = {symbol: summaries[symbol] for symbol in covered[start:start + self.batch_size]}
+            decisions.update(self.llm_batch(batch))
+            self.stats["calls"] += 1
+            self.tiers.update(dict.fromkeys(batch, "llm"))
+        self.tiers.update(dict.fromkeys(ambiguous[len(covered):], "budget"))
+
+        self.stats.update(self.tiers.values())
+        for tier in TIERS:
+            instrumentation.incr("decisions_total", self.stats[tier], tier=tier)
+        instrumentation.incr("llm_batch_calls_total", self.stats["calls"])
+        return decisions
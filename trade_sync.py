@@ -0,0 +1,198 @@
+"""
+Synchronisation incrémentale de l'historique des transactions dans SQLite.
+
+Chaque symbole garde un curseur `fromId` : le premier passage remonte tout
+l'historique depuis fromId=0, les suivants ne demandent que les nouvelles
+transactions, en parallèle, et uniquement pour les symboles que le compte
+détient ou a déjà échangés. Les requêtes d'historique deviennent des
+lectures locales indexées.
+"""
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from kline_fetcher import WeightBudget
+
+MY_TRADES_WEIGHT = 20
+MY_TRADES_LIMIT = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    symbol TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    order_id INTEGER,
+    price REAL,
+    qty REAL,
+    quote_qty REAL,
+    commission REAL,
+    commission_asset TEXT,
+    time INTEGER NOT NULL,
+    is_buyer INTEGER,
+    is_maker INTEGER,
+    PRIMARY KEY (symbol, id)
+);
+CREATE INDEX IF NOT EXISTS trades_time ON trades (time);
+CREATE INDEX IF NOT EXISTS trades_symbol_time ON trades (symbol, time);
+CREATE TABLE IF NOT EXISTS cursors (
+    symbol TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL,
+    synced_at INTEGER NOT NULL
+);
+"""
+
+_COLUMNS = ("symbol", "id", "order_id", "price", "qty", "quote_qty", "commission",
+            "commission_asset", "time", "is_buyer", "is_maker")
+
+
+def _row_to_trade(row):
+    """ Reconstruit une transaction au format de l'API Binance (plus 'side'). """
+    trade = dict(zip(_COLUMNS, row))
+    return {
+        "symbol": trade["symbol"],
+        "id": trade["id"],
+        "orderId": trade["order_id"],
+        "price": trade["price"],
+        "qty": trade["qty"],
+        "quoteQty": trade["quote_qty"],
+        "commission": trade["commission"],
+        "commissionAsset": trade["commission_asset"],
+        "time": trade["time"],
+        "isBuyer": bool(trade["is_buyer"]),
+        "isMaker": bool(trade["is_maker"]),
+        "side": "BUY" if trade["is_buyer"] else "SELL",
+    }
+
+
+class TradeStore:
+    """ Stockage local SQLite des transactions et des curseurs de synchronisation. """
+
+    def __init__(self, path="trades.db", timeout=30.0):
+        # Plusieurs processus (ShardPool.sync_trades) écrivent dans la même base : WAL pour que
+        # les lecteurs ne bloquent pas l'écrivain, et attente du verrou plutôt que "database is locked"
+        self.conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def cursor(self, symbol):
+        """ Dernier identifiant de transaction connu (-1 si aucune), ou None si jamais synchronisé. """
+        row = self.conn.execute("SELECT last_id FROM cursors WHERE symbol = ?", (symbol,)).fetchone()
+        return row[0] if row else None
+
+    def known_symbols(self):
+        return [row[0] for row in self.conn.execute("SELECT symbol FROM cursors")]
+
+    def insert_trades(self, symbol, trades):
+        """ Ajoute des transactions brutes de l'API et avance le curseur du symbole, même sans transaction. """
+        rows = [
+            (symbol, t["id"], t.get("orderId"), float(t["price"]), float(t["qty"]),
+             float(t.get("quoteQty", 0)), float(t.get("commission", 0)), t.get("commissionAsset"),
+             t["time"], int(t.get("isBuyer", False)), int(t.get("isMaker", False)))
+            for t in trades
+        ]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO trades ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                rows,
+            )
+            # Un symbole sans transaction garde un curseur à -1 : il reste suivi sans tout reparcourir
+            self.conn.execute(
+                "INSERT INTO cursors (symbol, last_id, synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(symbol) DO UPDATE SET last_id = MAX(last_id, excluded.last_id), "
+                "synced_at = excluded.synced_at",
+                (symbol, max((r[1] for r in rows), default=-1), int(time.time() * 1000)),
+            )
+        return len(rows)
+
+    def select(self, columns=_COLUMNS, since=None, until=None, symbol=None, ordered=True):
+        """
+        Lignes brutes (tuples) des colonnes demandées, triées par symbole puis par date.
+
+        :param since: Timestamp minimal en millisecondes (inclus)
+        :param until: Timestamp maximal en millisecondes (exclu)
+        :param symbol: Restreindre à un symbole
+        :param ordered: False laisse le tri à l'appelant (plus rapide pour un tri NumPy)
+        """
+        clauses, params = [], []
+        if symbol is not None:
+            clauses.append("symbol = ?")
+            params.append(symbol)
+        if since is not None:
+            clauses.append("time >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("time < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = " ORDER BY symbol, time, id" if ordered else ""
+        query = f"SELECT {', '.join(columns)} FROM trades {where}{order}"
+        return self.conn.execute(query, params).fetchall()
+
+    def trades(self, since=None, until=None, symbol=None):
+        """ Transactions locales au format de l'API, triées par symbole puis par date (voir select). """
+        return [_row_to_trade(row) for row in self.select(_COLUMNS, since, until, symbol)]
+
+
+class TradeSync:
+    """
+    Synchronise l'historique des transactions du compte vers un TradeStore.
+
+    :param client: Client Binance authentifié
+    :param store: TradeStore de destination
+    :param registry: SymbolRegistry pour relier actifs détenus et symboles
+    :param max_workers: Nombre de symboles synchronisés en parallèle
+    """
+
+    def __init__(self, client, store, registry, max_workers=8, budget=None):
+        self.client = client
+        self.store = store
+        self.registry = registry
+        self.max_workers = max_workers
+        # Un client qui réserve lui-même le poids de ses requêtes (ResilientClient) n'a pas besoin d'un second budget
+        self.budget = budget or (None if hasattr(client, "budget") else WeightBudget())
+        self.errors = {}
+
+    def held_symbols(self):
+        """ Symboles dont l'actif de base est détenu, plus ceux déjà synchronisés (même soldés depuis). """
+        balances = self.client.get_account().get("balances", [])
+        held = {b["asset"] for b in balances if float(b["free"]) + float(b["locked"]) > 0}
+        symbols = {
+            s.symbol for s in self.registry.load().values()
+            if s.base_asset in held and s.status == "TRADING"
+        }
+        return sorted(symbols.union(self.store.known_symbols()))
+
+    def _get_my_trades(self, **params):
+        if self.budget is not None:
+            self.budget.acquire(MY_TRADES_WEIGHT)
+        return self.client.get_my_trades(limit=MY_TRADES_LIMIT, **params)
+
+    def fetch_new_trades(self, symbol):
+        """ Récupère les transactions postérieures au curseur ; sans curseur, tout l'historique. """
+        last_id = self.store.cursor(symbol)
+        page = self._get_my_trades(symbol=symbol, fromId=0 if last_id is None else last_id + 1)
+        trades = list(page)
+        while len(page) == MY_TRADES_LIMIT:
+            page = self._get_my_trades(symbol=symbol, fromId=page[-1]["id"] + 1)
+            trades.extend(page)
+        return trades
+
+    def sync(self, symbols=None):
+        """
+        Synchronise les symboles donnés (par défaut, les symboles détenus).
+
+        :return: Nombre de nouvelles transactions enregistrées
+        """
+        symbols = self.held_symbols() if symbols is None else symbols
+        self.errors = {}
+        inserted = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.fetch_new_trades, s): s for s in symbols}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    inserted += self.store.insert_trades(symbol, future.result())
+                except Exception as e:
+                    self.errors[symbol] = e
+        return inserted